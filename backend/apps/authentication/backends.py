@@ -0,0 +1,55 @@
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+from .models import User
+
+
+def user_cache_key(user_id):
+    return f'auth_user_fields:{user_id}'
+
+
+def forget_cached_users(user_ids):
+    """Drop cached request users written without signals (bulk imports, queryset updates)"""
+    cache.delete_many([user_cache_key(user_id) for user_id in user_ids])
+
+
+class CachedModelBackend(ModelBackend):
+    """
+    ModelBackend whose get_user() is served from a short-lived cache.
+
+    get_user() runs on every authenticated HTTP request (AuthenticationMiddleware)
+    and every WebSocket connect (channels AuthMiddlewareStack). The cached entry
+    holds the user's field values minus the password hash, plus the session
+    auth hash that login sessions are checked against. It is dropped whenever
+    the user is saved (signals.invalidate_cached_user); writes that bypass
+    signals must call forget_cached_users(), or are seen once
+    AUTH_USER_CACHE_TTL expires.
+    """
+
+    def get_user(self, user_id):
+        key = user_cache_key(user_id)
+        cached = cache.get(key)
+        if cached is None:
+            user = super().get_user(user_id)
+            if user is None:
+                return None
+            cache.set(key, self._to_cache(user), timeout=settings.APP_SETTINGS.get('AUTH_USER_CACHE_TTL', 60))
+        else:
+            user = self._from_cache(cached)
+        return user if self.user_can_authenticate(user) else None
+
+    @staticmethod
+    def _to_cache(user):
+        values = {
+            field.attname: getattr(user, field.attname)
+            for field in User._meta.concrete_fields if field.attname != 'password'
+        }
+        return {'fields': values, 'session_auth_hash': user.get_session_auth_hash()}
+
+    @staticmethod
+    def _from_cache(cached):
+        values = cached['fields']
+        # password is left deferred: it is loaded from the database only if read
+        user = User.from_db('default', list(values), list(values.values()))
+        user._session_auth_hash = cached['session_auth_hash']
+        return user
@@ -2,8 +2,7 @@ from django.contrib.auth.models import AbstractUser
 from django.db import models
 from django.utils import timezone
 from datetime import timedelta
-import random
-import string
+import secrets
 
 class User(AbstractUser):
     ROLE_CHOICES = [
@@ -24,6 +23,20 @@ class User(AbstractUser):
     def __str__(self):
         return f"{self.mobile_number} - {self.get_role_display()}"
 
+    def get_session_auth_hash(self):
+        # Users restored by CachedModelBackend carry the hash instead of the password
+        cached = self.__dict__.get('_session_auth_hash')
+        return cached if cached is not None else super().get_session_auth_hash()
+
+    def set_password(self, raw_password):
+        # The carried hash belongs to the old password
+        self.__dict__.pop('_session_auth_hash', None)
+        super().set_password(raw_password)
+
+    def set_unusable_password(self):
+        self.__dict__.pop('_session_auth_hash', None)
+        super().set_unusable_password()
+
 class OTP(models.Model):
     mobile_number = models.CharField(max_length=15)
     otp_code = models.CharField(max_length=6)
@@ -32,6 +45,9 @@ class OTP(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['mobile_number', 'created_at']),
+        ]
 
     def is_expired(self):
         expiry_time = self.created_at + timedelta(minutes=10)
@@ -39,8 +55,12 @@ class OTP(models.Model):
 
     @staticmethod
     def generate_otp():
-        # Static OTP as per requirements
-        return '1234'
+        """OTP_STATIC_CODE when set (demo logins use 1234), otherwise a random 4-digit code"""
+        from django.conf import settings
+        static_code = settings.APP_SETTINGS.get('OTP_STATIC_CODE')
+        if static_code:
+            return static_code
+        return f'{secrets.randbelow(10 ** 4):04d}'
 
     def __str__(self):
         return f"OTP for {self.mobile_number}: {self.otp_code}"
@@ -0,0 +1,28 @@
+from django.contrib.sessions.backends.base import VALID_KEY_CHARS
+from django.contrib.sessions.backends.cached_db import SessionStore as CachedDBStore
+from django.utils.crypto import get_random_string
+
+
+class SessionStore(CachedDBStore):
+    """
+    cached_db sessions that defer creation to the end of the request.
+
+    On login, Django's cycle_key() inserts a new session row immediately and
+    SessionMiddleware then updates the same row when the response goes out.
+    Here cycle_key() only drops the old key, so the single INSERT happens in
+    SessionMiddleware after the view has finished.
+    """
+
+    def _get_new_session_key(self):
+        # A 32-char random key does not need an existence check up front; a
+        # collision fails the must_create INSERT and create() picks a new key
+        return get_random_string(32, VALID_KEY_CHARS)
+
+    def cycle_key(self):
+        data = self._session
+        key = self.session_key
+        self._session_key = None
+        self._session_cache = data
+        self.modified = True
+        if key:
+            self.delete(key)
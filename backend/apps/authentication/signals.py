@@ -0,0 +1,38 @@
+from django.contrib.auth.models import update_last_login
+from django.contrib.auth.signals import user_logged_in
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.core.cache import cache
+from apps.common.user_lookup import UserLookup
+from .backends import user_cache_key
+from .models import User
+
+
+@receiver(post_save, sender=User)
+def refresh_user_lookup(sender, instance, **kwargs):
+    """Keep check_user's cached lookups in step with signups and role changes"""
+    transaction.on_commit(lambda: UserLookup.user_saved(instance))
+
+
+@receiver(post_delete, sender=User)
+def forget_user_lookup(sender, instance, **kwargs):
+    transaction.on_commit(lambda: UserLookup.user_deleted(instance))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    """Drop the cached request user so the next request reloads it"""
+    cache.delete(user_cache_key(instance.pk))
+    transaction.on_commit(lambda: cache.delete(user_cache_key(instance.pk)))
+
+
+def update_last_login_once(sender, user, **kwargs):
+    """Skip the extra UPDATE when the login upsert already wrote last_login"""
+    if not getattr(user, '_last_login_recorded', False):
+        update_last_login(sender, user, **kwargs)
+
+
+user_logged_in.disconnect(dispatch_uid='update_last_login')
+user_logged_in.connect(update_last_login_once, dispatch_uid='update_last_login')
@@ -3,8 +3,10 @@
 from django.shortcuts import render, redirect
 from django.contrib.auth import login, logout
 from django.contrib.auth.decorators import login_required
-from apps.common.decorators import api_endpoint, handle_service_errors
+from django.db import transaction
+from apps.common.decorators import api_endpoint, handle_service_errors, query_budget, rate_limit
 from apps.common.services import AuthenticationService
+from apps.common.user_lookup import UserLookup
 from apps.common.utils import ResponseHandler, parse_json_safely
 
 def login_page(request):
@@ -14,7 +16,9 @@ def login_page(request):
     return render(request, 'login.html')
 
 @api_endpoint(allowed_methods=['POST'], require_auth=False)
+@rate_limit(name='check_user')
 @handle_service_errors
+@query_budget(3)
 def check_user(request):
     """Check if user exists and return appropriate response"""
     data = parse_json_safely(request)
@@ -23,25 +27,9 @@ def check_user(request):
     if not mobile_number:
         return ResponseHandler.error("Mobile number is required")
 
-    # Check if user exists
-    from apps.authentication.models import User
-    try:
-        user = User.objects.get(mobile_number=mobile_number)
-        # User exists, send OTP directly
-        result = AuthenticationService.send_otp(
-            mobile_number=mobile_number,
-            role=user.role
-        )
-        return ResponseHandler.success(
-            message="OTP sent successfully",
-            data={
-                'user_exists': True,
-                'user_role': user.role,
-                'otp_sent': True,
-                **result
-            }
-        )
-    except User.DoesNotExist:
+    # Check if user exists (cache and Bloom filter answer most misses)
+    user = UserLookup.get(mobile_number)
+    if user is None:
         # User doesn't exist, show role selection
         return ResponseHandler.success(
             message="User not found. Please select your role.",
@@ -51,8 +39,25 @@ def check_user(request):
             }
         )
 
+    # User exists, send OTP directly
+    result = AuthenticationService.send_otp(
+        mobile_number=mobile_number,
+        role=user['role']
+    )
+    return ResponseHandler.success(
+        message="OTP sent successfully",
+        data={
+            'user_exists': True,
+            'user_role': user['role'],
+            'otp_sent': True,
+            **result
+        }
+    )
+
 @api_endpoint(allowed_methods=['POST'], require_auth=False)
+@rate_limit(name='send_otp')
 @handle_service_errors
+@query_budget(2)
 def send_otp(request):
     """Send OTP to mobile number"""
     data = parse_json_safely(request)
@@ -67,8 +72,11 @@ def send_otp(request):
         data=result
     )
 
+@transaction.non_atomic_requests
 @api_endpoint(allowed_methods=['POST'], require_auth=False)
+@rate_limit(name='verify_otp')
 @handle_service_errors
+@query_budget(4)
 def verify_otp(request):
     """Verify OTP and login user"""
     data = parse_json_safely(request)
@@ -80,7 +88,7 @@ def verify_otp(request):
     )
 
     # Login user
-    login(request, result['user'])
+    login(request, result['user'], backend='apps.authentication.backends.CachedModelBackend')
 
     return ResponseHandler.success(
         message="Login successful",
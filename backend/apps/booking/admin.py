@@ -1,5 +1,23 @@
 from django.contrib import admin
-from .models import Booking
+from apps.common.streaming import stream_csv
+from .models import Booking, BookingStatusHistory, PartnerLocation
+
+BOOKING_EXPORT_FIELDS = [
+    'id', 'customer__mobile_number', 'delivery_partner__mobile_number', 'status', 'food_items',
+    'pickup_address', 'delivery_address', 'phone_number', 'total_amount', 'created_at', 'assigned_at', 'updated_at',
+    'delivered_at', 'assign_seconds', 'fulfil_seconds', 'total_seconds',
+]
+
+
+class BookingStatusHistoryInline(admin.TabularInline):
+    model = BookingStatusHistory
+    fields = ['status', 'updated_by', 'notes', 'created_at']
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
 
 
 @admin.register(Booking)
@@ -7,5 +25,20 @@ class BookingAdmin(admin.ModelAdmin):
     list_display = ['id', 'customer', 'delivery_partner', 'status', 'total_amount', 'created_at']
     list_filter = ['status', 'created_at']
     search_fields = ['customer__mobile_number', 'delivery_partner__mobile_number', 'food_items']
-    readonly_fields = ['created_at', 'updated_at']
+    readonly_fields = ['created_at', 'updated_at', *Booking.STAGE_DURATIONS]
     raw_id_fields = ['customer', 'delivery_partner']
+    inlines = [BookingStatusHistoryInline]
+    actions = ['export_csv']
+
+    @admin.action(description='Export selected bookings as CSV')
+    def export_csv(self, request, queryset):
+        rows = queryset.order_by('id').values_list(*BOOKING_EXPORT_FIELDS)
+        return stream_csv(rows, BOOKING_EXPORT_FIELDS, 'bookings.csv', request=request)
+
+
+@admin.register(PartnerLocation)
+class PartnerLocationAdmin(admin.ModelAdmin):
+    list_display = ['id', 'partner', 'latitude', 'longitude', 'recorded_at']
+    list_filter = ['recorded_at']
+    search_fields = ['partner__mobile_number']
+    raw_id_fields = ['partner']
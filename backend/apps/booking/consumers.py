@@ -0,0 +1,173 @@
+import json
+import time
+from channels.generic.websocket import AsyncWebsocketConsumer
+from channels.db import database_sync_to_async
+from asgiref.sync import sync_to_async
+from apps.common.location import LocationTracker
+from apps.common.presence import PresenceRegistry
+from apps.common.services import ETAService
+from apps.common.utils import PermissionUtils
+from .models import Booking
+
+ACTIVE_BOOKING_STATUSES = ['assigned', 'started', 'reached', 'collected']
+
+
+class PartnerPresenceConsumer(AsyncWebsocketConsumer):
+    """Keeps a delivery partner online in the presence registry while connected"""
+
+    async def connect(self):
+        user = self.scope['user']
+        if not user.is_authenticated or user.role != 'delivery_partner':
+            await self.close()
+            return
+
+        self.partner_id = user.id
+        await self.accept()
+        await sync_to_async(PresenceRegistry.connect)(self.partner_id)
+
+    async def disconnect(self, close_code):
+        if getattr(self, 'partner_id', None):
+            await sync_to_async(PresenceRegistry.disconnect)(self.partner_id)
+
+    async def receive(self, text_data):
+        try:
+            data = json.loads(text_data)
+        except json.JSONDecodeError:
+            return
+
+        if data.get('type') == 'heartbeat':
+            await self.heartbeat()
+            await self.send(text_data=json.dumps({
+                'type': 'heartbeat_ack',
+                'ttl': PresenceRegistry.ttl(),
+            }))
+
+    async def heartbeat(self):
+        await sync_to_async(PresenceRegistry.heartbeat)(self.partner_id)
+
+
+class PartnerLocationConsumer(AsyncWebsocketConsumer):
+    """Ingests GPS pings from a delivery partner and fans them out to their active bookings"""
+
+    # How often the list of active bookings is reloaded from the database
+    BOOKING_REFRESH_SECONDS = 30
+
+    async def connect(self):
+        user = self.scope['user']
+        if not user.is_authenticated or user.role != 'delivery_partner':
+            await self.close()
+            return
+
+        self.partner_id = user.id
+        self.group_name = ETAService.partner_group(self.partner_id)
+        self.active_bookings = []
+        self.bookings_loaded_at = 0
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.accept()
+        LocationTracker.connect(self.partner_id)
+
+    async def disconnect(self, close_code):
+        if getattr(self, 'partner_id', None):
+            await self.channel_layer.group_discard(self.group_name, self.channel_name)
+            # Other sockets of the same partner keep using the in-memory state
+            LocationTracker.disconnect(self.partner_id)
+            await database_sync_to_async(LocationTracker.flush)()
+
+    async def receive(self, text_data):
+        try:
+            data = json.loads(text_data)
+            latitude = float(data['lat'])
+            longitude = float(data['lng'])
+        except (json.JSONDecodeError, KeyError, TypeError, ValueError):
+            return
+
+        if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+            return
+
+        now = time.time()
+        batch = await sync_to_async(LocationTracker.record)(self.partner_id, latitude, longitude, now)
+        if batch:
+            await database_sync_to_async(LocationTracker.persist)(batch)
+
+        if now - self.bookings_loaded_at >= self.BOOKING_REFRESH_SECONDS:
+            self.active_bookings = await self.get_active_bookings()
+            self.bookings_loaded_at = now
+
+        for booking in self.active_bookings:
+            await self.channel_layer.group_send(
+                f'tracking_{booking.id}',
+                {
+                    'type': 'partner_location',
+                    'booking_id': booking.id,
+                    'lat': latitude,
+                    'lng': longitude,
+                    'timestamp': now,
+                }
+            )
+
+            # ETA is only recomputed once the partner moved past the threshold
+            entry, recomputed = await sync_to_async(ETAService.refresh)(booking, (now, latitude, longitude))
+            if recomputed:
+                await self.channel_layer.group_send(*ETAService.eta_event(entry))
+
+    async def bookings_changed(self, event):
+        # A status or assignment changed elsewhere; recomputing with the cached
+        # status would overwrite the fresher ETA, so reload on the next ping
+        self.bookings_loaded_at = 0
+
+    @database_sync_to_async
+    def get_active_bookings(self):
+        """Bookings this partner is currently delivering"""
+        return list(Booking.objects.filter(
+            delivery_partner_id=self.partner_id,
+            status__in=ACTIVE_BOOKING_STATUSES
+        ).only(
+            'id', 'status', 'delivery_partner_id',
+            'pickup_latitude', 'pickup_longitude', 'delivery_latitude', 'delivery_longitude',
+        ))
+
+
+class BookingTrackingConsumer(AsyncWebsocketConsumer):
+    """Streams live partner positions for one booking to its participants"""
+
+    async def connect(self):
+        self.booking_id = self.scope['url_route']['kwargs']['booking_id']
+        self.group_name = f'tracking_{self.booking_id}'
+
+        if await self.check_permission():
+            await self.channel_layer.group_add(self.group_name, self.channel_name)
+            await self.accept()
+        else:
+            await self.close()
+
+    async def disconnect(self, close_code):
+        await self.channel_layer.group_discard(self.group_name, self.channel_name)
+
+    async def partner_location(self, event):
+        await self.send(text_data=json.dumps({
+            'type': 'partner_location',
+            'booking_id': event['booking_id'],
+            'lat': event['lat'],
+            'lng': event['lng'],
+            'timestamp': event['timestamp'],
+        }))
+
+    async def booking_eta(self, event):
+        await self.send(text_data=json.dumps({
+            'type': 'booking_eta',
+            'booking_id': event['booking_id'],
+            'arrival_at': event['arrival_at'],
+        }))
+
+    @database_sync_to_async
+    def check_permission(self):
+        """Check if user can follow this booking"""
+        user = self.scope['user']
+        if not user.is_authenticated:
+            return False
+
+        try:
+            booking = Booking.objects.get(id=self.booking_id)
+        except (Booking.DoesNotExist, ValueError):
+            return False
+        return PermissionUtils.check_booking_access(user, booking)
@@ -1,6 +1,7 @@
 from django import forms
 from .models import Booking
 from django.contrib.auth import get_user_model
+from apps.common.mixins import QueryUtils
 
 User = get_user_model()
 
@@ -8,8 +9,15 @@ User = get_user_model()
 class BookingForm(forms.ModelForm):
     class Meta:
         model = Booking
-        fields = ['food_items', 'pickup_address', 'delivery_address', 'phone_number', 'total_amount', 'special_instructions']
+        fields = [
+            'food_items', 'pickup_address', 'delivery_address', 'phone_number', 'total_amount', 'special_instructions',
+            'pickup_latitude', 'pickup_longitude', 'delivery_latitude', 'delivery_longitude',
+        ]
         widgets = {
+            'pickup_latitude': forms.HiddenInput(),
+            'pickup_longitude': forms.HiddenInput(),
+            'delivery_latitude': forms.HiddenInput(),
+            'delivery_longitude': forms.HiddenInput(),
             'food_items': forms.Textarea(attrs={'rows': 3, 'placeholder': 'Describe the food items you want to order'}),
             'pickup_address': forms.Textarea(attrs={'rows': 2, 'placeholder': 'Restaurant pickup address'}),
             'delivery_address': forms.Textarea(attrs={'rows': 2, 'placeholder': 'Your delivery address'}),
@@ -50,5 +58,5 @@ class AssignBookingForm(forms.ModelForm):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.fields['delivery_partner'].queryset = User.objects.filter(role='delivery_partner')
+        self.fields['delivery_partner'].queryset = QueryUtils.get_available_delivery_partners()
         self.fields['delivery_partner'].empty_label = "Select a delivery partner"
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.7 on 2026-10-19 02:30
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('booking', '0002_booking_cancelled_at_booking_cancelled_by'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PartnerLocation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('latitude', models.FloatField()),
+                ('longitude', models.FloatField()),
+                ('recorded_at', models.DateTimeField()),
+                ('partner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='location_points', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-recorded_at'],
+                'indexes': [models.Index(fields=['partner', '-recorded_at'], name='booking_par_partner_7346e2_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,175 @@
+# Generated by Django 4.2.7 on 2026-10-19 03:07
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+BATCH_SIZE = 2000
+
+STAGE_TIMESTAMPS = {
+    'assigned': 'assigned_at', 'started': 'started_at', 'reached': 'reached_at',
+    'collected': 'collected_at', 'delivered': 'delivered_at', 'cancelled': 'cancelled_at',
+}
+STAGE_DURATIONS = {
+    'assign_seconds': ('created_at', 'assigned_at'),
+    'start_seconds': ('assigned_at', 'started_at'),
+    'reach_seconds': ('started_at', 'reached_at'),
+    'collect_seconds': ('reached_at', 'collected_at'),
+    'deliver_seconds': ('collected_at', 'delivered_at'),
+    'fulfil_seconds': ('assigned_at', 'delivered_at'),
+    'total_seconds': ('created_at', 'delivered_at'),
+}
+
+
+def backfill_history(apps, schema_editor):
+    """
+    Seed history and durations from the timestamps that already exist.
+
+    Intermediate stages were never stamped; the current stage takes
+    updated_at, the best record of when the booking entered it.
+    """
+    Booking = apps.get_model('booking', 'Booking')
+    BookingStatusHistory = apps.get_model('booking', 'BookingStatusHistory')
+    connection = schema_editor.connection
+    adapt = connection.ops.adapt_datetimefield_value
+    stamped = list(STAGE_TIMESTAMPS.values())
+    columns = stamped + list(STAGE_DURATIONS)
+    # Plain executemany: bulk_update's CASE expressions cost milliseconds per row
+    update_sql = 'UPDATE {} SET {} WHERE id = %s'.format(
+        connection.ops.quote_name(Booking._meta.db_table),
+        ', '.join(f'{connection.ops.quote_name(column)} = %s' for column in columns),
+    )
+
+    bookings = Booking.objects.order_by('pk')
+    last_pk = 0
+    while True:
+        batch = list(bookings.filter(pk__gt=last_pk)[:BATCH_SIZE])
+        if not batch:
+            break
+        last_pk = batch[-1].pk
+        history, updates = [], []
+        for booking in batch:
+            stamp = STAGE_TIMESTAMPS.get(booking.status)
+            if stamp and getattr(booking, stamp) is None:
+                setattr(booking, stamp, booking.updated_at)
+            for field, (opened, closed) in STAGE_DURATIONS.items():
+                began, ended = getattr(booking, opened), getattr(booking, closed)
+                seconds = int((ended - began).total_seconds()) if began and ended and ended >= began else None
+                setattr(booking, field, seconds)
+            updates.append([adapt(getattr(booking, field)) for field in stamped]
+                           + [getattr(booking, field) for field in STAGE_DURATIONS] + [booking.pk])
+
+            history.append(BookingStatusHistory(booking_id=booking.pk, status='pending', created_at=booking.created_at))
+            for status, field in STAGE_TIMESTAMPS.items():
+                at = getattr(booking, field)
+                if at is not None:
+                    updated_by = booking.cancelled_by_id if status == 'cancelled' else None
+                    history.append(BookingStatusHistory(
+                        booking_id=booking.pk, status=status, updated_by_id=updated_by, created_at=at,
+                    ))
+        with connection.cursor() as cursor:
+            cursor.executemany(update_sql, updates)
+        BookingStatusHistory.objects.bulk_create(history)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('booking', '0005_booking_updated_at_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookingStatusHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('assigned', 'Assigned'), ('started', 'Started'), ('reached', 'Reached'), ('collected', 'Collected'), ('delivered', 'Delivered'), ('cancelled', 'Cancelled')], max_length=20)),
+                ('notes', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name_plural': 'booking status history',
+                'ordering': ['created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='assign_seconds',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='collect_seconds',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='collected_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='deliver_seconds',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='delivered_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='fulfil_seconds',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='reach_seconds',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='reached_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='start_seconds',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='started_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='total_seconds',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['assigned_at'], name='booking_boo_assigne_7b4e7d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['delivered_at'], name='booking_boo_deliver_5f0807_idx'),
+        ),
+        migrations.AddField(
+            model_name='bookingstatushistory',
+            name='booking',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='status_history', to='booking.booking'),
+        ),
+        migrations.AddField(
+            model_name='bookingstatushistory',
+            name='updated_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='bookingstatushistory',
+            index=models.Index(fields=['booking', 'created_at'], name='booking_boo_booking_63e22a_idx'),
+        ),
+        migrations.RunPython(backfill_history, migrations.RunPython.noop),
+    ]
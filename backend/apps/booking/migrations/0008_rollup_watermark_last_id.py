@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 03:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0007_daily_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rollupwatermark',
+            name='last_id',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -22,6 +22,10 @@ class Booking(models.Model):
     food_items = models.TextField(help_text="Description of food items ordered")
     pickup_address = models.TextField()
     delivery_address = models.TextField()
+    pickup_latitude = models.FloatField(null=True, blank=True)
+    pickup_longitude = models.FloatField(null=True, blank=True)
+    delivery_latitude = models.FloatField(null=True, blank=True)
+    delivery_longitude = models.FloatField(null=True, blank=True)
     phone_number = models.CharField(max_length=15)
     total_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
@@ -29,11 +33,55 @@ class Booking(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     assigned_at = models.DateTimeField(null=True, blank=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    reached_at = models.DateTimeField(null=True, blank=True)
+    collected_at = models.DateTimeField(null=True, blank=True)
+    delivered_at = models.DateTimeField(null=True, blank=True)
     cancelled_at = models.DateTimeField(null=True, blank=True)
     cancelled_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='cancelled_bookings')
 
+    # Stage durations in seconds, kept in step with the stage timestamps by transition()
+    assign_seconds = models.PositiveIntegerField(null=True, blank=True)
+    start_seconds = models.PositiveIntegerField(null=True, blank=True)
+    reach_seconds = models.PositiveIntegerField(null=True, blank=True)
+    collect_seconds = models.PositiveIntegerField(null=True, blank=True)
+    deliver_seconds = models.PositiveIntegerField(null=True, blank=True)
+    fulfil_seconds = models.PositiveIntegerField(null=True, blank=True)
+    total_seconds = models.PositiveIntegerField(null=True, blank=True)
+
+    # Timestamp stamped when a booking enters each status
+    STAGE_TIMESTAMPS = {
+        'assigned': 'assigned_at',
+        'started': 'started_at',
+        'reached': 'reached_at',
+        'collected': 'collected_at',
+        'delivered': 'delivered_at',
+        'cancelled': 'cancelled_at',
+    }
+    # Duration field -> (timestamp opening the stage, timestamp closing it)
+    STAGE_DURATIONS = {
+        'assign_seconds': ('created_at', 'assigned_at'),
+        'start_seconds': ('assigned_at', 'started_at'),
+        'reach_seconds': ('started_at', 'reached_at'),
+        'collect_seconds': ('reached_at', 'collected_at'),
+        'deliver_seconds': ('collected_at', 'delivered_at'),
+        'fulfil_seconds': ('assigned_at', 'delivered_at'),
+        'total_seconds': ('created_at', 'delivered_at'),
+    }
+
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Conditional GET validators: latest updated_at per user scope
+            models.Index(fields=['customer', 'updated_at']),
+            models.Index(fields=['delivery_partner', 'updated_at']),
+            models.Index(fields=['updated_at']),
+            # Daily rollups rebuild whole days of bookings by creation time
+            models.Index(fields=['created_at']),
+            # SLA cohorts: bookings assigned or delivered within a period
+            models.Index(fields=['assigned_at']),
+            models.Index(fields=['delivered_at']),
+        ]
 
     def __str__(self):
         return f"Booking #{self.id} - {self.customer.mobile_number}"
@@ -48,3 +96,135 @@ class Booking(models.Model):
     @property
     def can_chat(self):
         return self.status in ['assigned', 'started', 'reached', 'collected']
+
+    @property
+    def has_coordinates(self):
+        return None not in (
+            self.pickup_latitude, self.pickup_longitude,
+            self.delivery_latitude, self.delivery_longitude,
+        )
+
+    def compute_stage_durations(self):
+        """Derive the *_seconds columns from the stage timestamps"""
+        for field, (opened, closed) in self.STAGE_DURATIONS.items():
+            began, ended = getattr(self, opened), getattr(self, closed)
+            seconds = None
+            if began is not None and ended is not None and ended >= began:
+                seconds = int((ended - began).total_seconds())
+            setattr(self, field, seconds)
+
+    def transition(self, status, by=None, notes='', at=None):
+        """
+        Move to ``status``, stamping its stage timestamp and the stage durations.
+
+        Returns the unsaved BookingStatusHistory entry; save it with the
+        booking, or bulk_create entries for many transitions at once.
+        """
+        at = at or timezone.now()
+        self.status = status
+        stamp = self.STAGE_TIMESTAMPS.get(status)
+        if stamp:
+            setattr(self, stamp, at)
+        if status == 'cancelled':
+            self.cancelled_by = by
+        self.compute_stage_durations()
+        return BookingStatusHistory(booking=self, status=status, updated_by=by, notes=notes, created_at=at)
+
+    def stamped_history(self):
+        """History entries implied by the stage timestamps, for bookings created in bulk"""
+        entries = [BookingStatusHistory(booking=self, status='pending', created_at=self.created_at)]
+        for status, field in self.STAGE_TIMESTAMPS.items():
+            at = getattr(self, field)
+            if at is not None:
+                updated_by_id = self.cancelled_by_id if status == 'cancelled' else None
+                entries.append(BookingStatusHistory(booking=self, status=status, updated_by_id=updated_by_id, created_at=at))
+        return entries
+
+
+class BookingStatusHistory(models.Model):
+    """Append-only log of booking status changes"""
+    # The (booking, created_at) index serves booking lookups, so no separate FK index
+    booking = models.ForeignKey(Booking, on_delete=models.CASCADE, related_name='status_history', db_index=False)
+    status = models.CharField(max_length=20, choices=Booking.STATUS_CHOICES)
+    updated_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    notes = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['created_at']
+        verbose_name_plural = 'booking status history'
+        indexes = [
+            models.Index(fields=['booking', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"Booking #{self.booking_id} -> {self.status}"
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError('Booking status history is append-only')
+        super().save(*args, **kwargs)
+
+
+class PartnerLocation(models.Model):
+    """Downsampled GPS track of a delivery partner"""
+    partner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='location_points')
+    latitude = models.FloatField()
+    longitude = models.FloatField()
+    recorded_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-recorded_at']
+        indexes = [
+            models.Index(fields=['partner', '-recorded_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.partner.mobile_number} @ ({self.latitude}, {self.longitude})"
+
+
+class DailyBookingStats(models.Model):
+    """Rollup: bookings created per local day by current status, with their total_amount"""
+    day = models.DateField()
+    status = models.CharField(max_length=20, choices=Booking.STATUS_CHOICES)
+    bookings = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        ordering = ['-day', 'status']
+        verbose_name_plural = 'daily booking stats'
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'status'], name='unique_daily_booking_stats'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.status}: {self.bookings}"
+
+
+class DailyPartnerStats(models.Model):
+    """Rollup: deliveries completed per local day by partner"""
+    day = models.DateField()
+    partner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    deliveries = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        ordering = ['-day', '-deliveries']
+        verbose_name_plural = 'daily partner stats'
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'partner'], name='unique_daily_partner_stats'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} partner #{self.partner_id}: {self.deliveries}"
+
+
+class RollupWatermark(models.Model):
+    """Highest Booking.updated_at and id already folded into a rollup"""
+    name = models.CharField(max_length=50, unique=True)
+    updated_at = models.DateTimeField(null=True, blank=True)
+    last_id = models.BigIntegerField(null=True, blank=True)
+    refreshed_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} @ {self.updated_at}"
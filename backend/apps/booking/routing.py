@@ -0,0 +1,8 @@
+from django.urls import re_path
+from . import consumers
+
+websocket_urlpatterns = [
+    re_path(r'ws/presence/$', consumers.PartnerPresenceConsumer.as_asgi()),
+    re_path(r'ws/location/$', consumers.PartnerLocationConsumer.as_asgi()),
+    re_path(r'ws/tracking/(?P<booking_id>\d+)/$', consumers.BookingTrackingConsumer.as_asgi()),
+]
@@ -10,4 +10,5 @@ urlpatterns = [
     path('<int:pk>/cancel/', views.BookingCancelView.as_view(), name='cancel'),
     path('<int:pk>/update-status/', views.BookingStatusUpdateView.as_view(), name='update_status'),
     path('assign/<int:pk>/', views.AssignBookingView.as_view(), name='assign'),
+    path('stats/', views.BookingStatsView.as_view(), name='stats'),
 ]
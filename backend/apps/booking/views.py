@@ -1,5 +1,8 @@
+import hashlib
+import time
+from datetime import timedelta
 from django.shortcuts import render, redirect
-from django.views.generic import ListView, CreateView, DetailView, UpdateView
+from django.views.generic import ListView, CreateView, DetailView, UpdateView, TemplateView
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse
@@ -7,25 +10,48 @@ from django.views.decorators.http import require_http_methods
 from django.contrib import messages
 from django.urls import reverse_lazy
 from django.utils import timezone
-from .models import Booking
+from django.db import transaction
+from django.db.models import Count, Max
+from apps.common.geocoding import BookingGeocoder
+from apps.common.mixins import ConditionalGetMixin, RoleRequiredMixin
+from apps.common.rollups import BookingRollups
+from apps.common.services import ETAService
+from apps.common.template_cache import template_version
+from .models import Booking, RollupWatermark
 from .forms import BookingForm, BookingStatusForm, AssignBookingForm
 
 
-class BookingListView(LoginRequiredMixin, ListView):
+def visible_bookings(user):
+    """Bookings a user may list and view"""
+    if user.role == 'customer':
+        return Booking.objects.filter(customer=user)
+    elif user.role == 'delivery_partner':
+        return Booking.objects.filter(delivery_partner=user)
+    elif user.role == 'admin':
+        return Booking.objects.all()
+    return Booking.objects.none()
+
+
+def make_etag(*parts):
+    # The template version makes a deploy invalidate every page the browser holds
+    return hashlib.md5(repr((template_version(), *parts)).encode(), usedforsecurity=False).hexdigest()
+
+
+class BookingListView(LoginRequiredMixin, ConditionalGetMixin, ListView):
     model = Booking
     template_name = 'booking/booking_list.html'
     context_object_name = 'bookings'
     paginate_by = 10
+    query_budget = 6
 
     def get_queryset(self):
-        user = self.request.user
-        if user.role == 'customer':
-            return Booking.objects.filter(customer=user)
-        elif user.role == 'delivery_partner':
-            return Booking.objects.filter(delivery_partner=user)
-        elif user.role == 'admin':
-            return Booking.objects.all()
-        return Booking.objects.none()
+        return visible_bookings(self.request.user).select_related('delivery_partner')
+
+    def get_validators(self):
+        # Any save bumps the latest updated_at; deletions change the count
+        stats = self.get_queryset().aggregate(latest=Max('updated_at'), count=Count('id'))
+        etag = make_etag(self.request.user.pk, stats['latest'], stats['count'])
+        return etag, stats['latest']
 
 
 class BookingCreateView(LoginRequiredMixin, CreateView):
@@ -37,23 +63,34 @@ class BookingCreateView(LoginRequiredMixin, CreateView):
     def form_valid(self, form):
         form.instance.customer = self.request.user
         messages.success(self.request, 'Booking created successfully!')
-        return super().form_valid(form)
+        response = super().form_valid(form)
+        self.object.transition('pending', by=self.request.user, notes='Booking created',
+                               at=self.object.created_at).save()
+        # ETAs need both ends; look up the missing ones after commit, off the request
+        if BookingGeocoder.needs_coordinates(self.object):
+            booking_id = self.object.pk
+            transaction.on_commit(lambda: BookingGeocoder.submit(booking_id))
+        return response
 
 
-class BookingDetailView(LoginRequiredMixin, DetailView):
+class BookingDetailView(LoginRequiredMixin, ConditionalGetMixin, DetailView):
     model = Booking
     template_name = 'booking/booking_detail.html'
     context_object_name = 'booking'
+    query_budget = 5
 
     def get_queryset(self):
-        user = self.request.user
-        if user.role == 'customer':
-            return Booking.objects.filter(customer=user)
-        elif user.role == 'delivery_partner':
-            return Booking.objects.filter(delivery_partner=user)
-        elif user.role == 'admin':
-            return Booking.objects.all()
-        return Booking.objects.none()
+        return visible_bookings(self.request.user)
+
+    def get_validators(self):
+        row = self.get_queryset().filter(pk=self.kwargs['pk']).values_list('updated_at', 'status').first()
+        if row is None:
+            return None, None
+        updated_at, status = row
+        if status in ETAService.ETA_STATUSES:
+            # The page shows an ETA in minutes that moves without a save
+            return make_etag(self.request.user.pk, updated_at, int(time.time() // 60)), None
+        return make_etag(self.request.user.pk, updated_at), updated_at
 
 
 class BookingCancelView(LoginRequiredMixin, UpdateView):
@@ -71,10 +108,9 @@ class BookingCancelView(LoginRequiredMixin, UpdateView):
     def post(self, request, *args, **kwargs):
         booking = self.get_object()
         if booking.can_be_cancelled:
-            booking.status = 'cancelled'
-            booking.cancelled_at = timezone.now()
-            booking.cancelled_by = request.user
+            history = booking.transition('cancelled', by=request.user)
             booking.save()
+            history.save()
             messages.success(request, 'Booking cancelled successfully!')
             return redirect('booking:list')
         messages.error(request, 'Cannot cancel this booking!')
@@ -95,7 +131,20 @@ class BookingStatusUpdateView(LoginRequiredMixin, UpdateView):
 
     def form_valid(self, form):
         messages.success(self.request, 'Status updated successfully!')
-        return super().form_valid(form)
+        history = None
+        if 'status' in form.changed_data:
+            history = form.instance.transition(form.cleaned_data['status'], by=self.request.user)
+        response = super().form_valid(form)
+        if history:
+            history.save()
+
+        # Status changes move the ETA to a different leg; push it right away
+        entry, recomputed = ETAService.refresh(self.object)
+        if recomputed:
+            ETAService.notify_eta(entry)
+        partner_id = self.object.delivery_partner_id
+        transaction.on_commit(lambda: ETAService.notify_bookings_changed(partner_id))
+        return response
     
     def get_success_url(self):
         # Redirect to the booking detail page after update
@@ -113,10 +162,63 @@ class AssignBookingView(LoginRequiredMixin, UpdateView):
             return Booking.objects.filter(status='pending')
         return Booking.objects.none()
 
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        # Reuse the form's queryset so only connected partners are offered
+        context['delivery_partners'] = context['form'].fields['delivery_partner'].queryset
+        return context
+
     def form_valid(self, form):
         booking = form.save(commit=False)
-        booking.status = 'assigned'
-        booking.assigned_at = timezone.now()
+        history = booking.transition('assigned', by=self.request.user,
+                                     notes=f'Assigned to {booking.delivery_partner.mobile_number}')
         booking.save()
+        history.save()
+        transaction.on_commit(lambda: ETAService.notify_bookings_changed(booking.delivery_partner_id))
         messages.success(self.request, 'Booking assigned successfully!')
         return redirect('booking:detail', pk=booking.pk)
+
+
+class BookingStatsView(LoginRequiredMixin, RoleRequiredMixin, TemplateView):
+    """Admin stats: reads only the daily rollup tables, never Booking"""
+    template_name = 'booking/booking_stats.html'
+    required_roles = ['admin']
+    query_budget = 6
+    MAX_DAYS = 90
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        try:
+            days = min(max(int(self.request.GET.get('days', 14)), 1), self.MAX_DAYS)
+        except ValueError:
+            days = 14
+        last = timezone.localdate()
+        first = last - timedelta(days=days - 1)
+
+        statuses = [status for status, _ in Booking.STATUS_CHOICES]
+        report = BookingRollups.status_report(first, last)
+        rows = []
+        for offset in range(days):
+            day = last - timedelta(days=offset)
+            by_status = report.get(day, {})
+            counts = [by_status.get(status, (0, 0))[0] for status in statuses]
+            rows.append({
+                'day': day,
+                'counts': counts,
+                'total': sum(counts),
+                'booked': sum(revenue for status, (_, revenue) in by_status.items() if status != 'cancelled'),
+                'delivered': by_status.get('delivered', (0, 0))[1],
+            })
+
+        context.update({
+            'days': days,
+            'statuses': Booking.STATUS_CHOICES,
+            'rows': rows,
+            'status_totals': [sum(row['counts'][i] for row in rows) for i in range(len(statuses))],
+            'booked_total': sum(row['booked'] for row in rows),
+            'delivered_total': sum(row['delivered'] for row in rows),
+            'partners': BookingRollups.partner_report(first, last),
+            'refreshed_at': RollupWatermark.objects.filter(name=BookingRollups.WATERMARK)
+                                                  .values_list('refreshed_at', flat=True).first(),
+        })
+        return context
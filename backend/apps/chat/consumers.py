@@ -33,10 +33,13 @@ class ChatConsumer(AsyncWebsocketConsumer):
     async def receive(self, text_data):
         text_data_json = json.loads(text_data)
         message = text_data_json['message']
-        sender_id = text_data_json['sender_id']
+
+        # The sender is always the authenticated user of this connection,
+        # already resolved by AuthMiddlewareStack
+        sender = self.scope['user']
         
         # Save message to database
-        await self.save_message(message, sender_id)
+        await self.save_message(message, sender)
         
         # Send message to room group
         await self.channel_layer.group_send(
@@ -44,9 +47,9 @@ class ChatConsumer(AsyncWebsocketConsumer):
             {
                 'type': 'chat_message',
                 'message': message,
-                'sender_id': sender_id,
-                'sender_name': await self.get_sender_name(sender_id),
-                'timestamp': await self.get_current_timestamp(),
+                'sender_id': sender.id,
+                'sender_name': self.get_sender_name(sender),
+                'timestamp': timezone.now().isoformat(),
             }
         )
 
@@ -68,43 +71,29 @@ class ChatConsumer(AsyncWebsocketConsumer):
     def check_permission(self):
         """Check if user has permission to access this chat room"""
         try:
-            booking = Booking.objects.get(id=self.booking_id)
+            booking = Booking.objects.only('id', 'customer_id', 'delivery_partner_id').get(id=self.booking_id)
             user = self.scope['user']
             
             if user.is_authenticated:
-                # Check if user is either customer or assigned delivery partner
-                return (user == booking.customer or 
-                       (user == booking.delivery_partner and booking.delivery_partner))
+                # Compare ids so neither participant has to be loaded
+                return user.id in (booking.customer_id, booking.delivery_partner_id)
             return False
         except Booking.DoesNotExist:
             return False
 
     @database_sync_to_async
-    def save_message(self, message, sender_id):
+    def save_message(self, message, sender):
         """Save message to database"""
-        try:
-            booking = Booking.objects.get(id=self.booking_id)
-            chat_room, created = ChatRoom.objects.get_or_create(booking=booking)
-            sender = User.objects.get(id=sender_id)
-            
-            ChatMessage.objects.create(
-                chat_room=chat_room,
-                sender=sender,
-                message=message
-            )
-        except (Booking.DoesNotExist, User.DoesNotExist):
-            pass
+        if not getattr(self, 'chat_room_id', None):
+            chat_room, created = ChatRoom.objects.get_or_create(booking_id=self.booking_id)
+            self.chat_room_id = chat_room.id
 
-    @database_sync_to_async
-    def get_sender_name(self, sender_id):
-        """Get sender's display name"""
-        try:
-            user = User.objects.get(id=sender_id)
-            return f"{user.get_role_display()} - {user.mobile_number}"
-        except User.DoesNotExist:
-            return "Unknown"
+        ChatMessage.objects.create(
+            chat_room_id=self.chat_room_id,
+            sender=sender,
+            message=message
+        )
 
-    @database_sync_to_async
-    def get_current_timestamp(self):
-        """Get current timestamp"""
-        return timezone.now().isoformat()
+    def get_sender_name(self, user):
+        """Get sender's display name"""
+        return f"{user.get_role_display()} - {user.mobile_number}"
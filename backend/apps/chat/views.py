@@ -1,4 +1,5 @@
 import json
+from django.conf import settings
 from django.shortcuts import render, get_object_or_404, redirect
 from django.views.generic import TemplateView
 from django.contrib.auth.mixins import LoginRequiredMixin
@@ -8,7 +9,10 @@ from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
 from django.contrib import messages
 from .models import ChatRoom, ChatMessage
+from apps.authentication.models import User
 from apps.booking.models import Booking
+from apps.common.encoders import FastJsonResponse
+from apps.common.streaming import stream_json_list
 
 
 class ChatRoomView(LoginRequiredMixin, TemplateView):
@@ -36,6 +40,9 @@ class ChatRoomView(LoginRequiredMixin, TemplateView):
 
 @method_decorator(csrf_exempt, name='dispatch')
 class ChatMessagesAPIView(LoginRequiredMixin, TemplateView):
+    # Messages stream after the view returns, so this covers the lookups before it
+    query_budget = 4
+
     def get(self, request, booking_id):
         booking = get_object_or_404(Booking, id=booking_id)
         
@@ -46,22 +53,30 @@ class ChatMessagesAPIView(LoginRequiredMixin, TemplateView):
         
         try:
             chat_room = ChatRoom.objects.get(booking=booking)
-            messages = ChatMessage.objects.filter(chat_room=chat_room).order_by('created_at')
-            
-            messages_data = []
-            for message in messages:
-                messages_data.append({
-                    'id': message.id,
-                    'message': message.message,
-                    'sender_id': message.sender.id,
-                    'sender_name': f"{message.sender.get_role_display()} - {message.sender.mobile_number}",
-                    'timestamp': message.created_at.isoformat(),
-                    'is_read': message.is_read,
-                })
-            
-            return JsonResponse({'messages': messages_data})
+            # One query with the sender columns joined in, no model instances
+            messages = ChatMessage.objects.filter(chat_room=chat_room).order_by('created_at').values_list(
+                'id', 'message', 'sender_id', 'sender__role', 'sender__mobile_number', 'created_at', 'is_read'
+            )
+            role_labels = dict(User.ROLE_CHOICES)
+
+            def message_data(row):
+                message_id, text, sender_id, role, mobile_number, created_at, is_read = row
+                return {
+                    'id': message_id,
+                    'message': text,
+                    'sender_id': sender_id,
+                    'sender_name': f"{role_labels.get(role, role)} - {mobile_number}",
+                    'timestamp': created_at,
+                    'is_read': is_read,
+                }
+
+            # Long histories are streamed in chunks instead of built in memory
+            return stream_json_list(
+                messages, 'messages', transform=message_data,
+                chunk_size=settings.APP_SETTINGS.get('STREAMING_CHUNK_SIZE', 500), request=request
+            )
         except ChatRoom.DoesNotExist:
-            return JsonResponse({'messages': []})
+            return FastJsonResponse({'messages': []})
 
     @method_decorator(csrf_exempt, name='dispatch')
     def post(self, request, booking_id):
@@ -0,0 +1,80 @@
+# Structured user activity logging through a queue-backed handler
+
+import atexit
+import json
+import logging
+import queue
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+activity_logger = logging.getLogger('apps.activity')
+
+
+def activity_event(record):
+    """Turn an activity LogRecord into the event dict that is logged and stored"""
+    event = {
+        'ts': datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+        'level': record.levelname,
+    }
+    event.update(getattr(record, 'activity', None) or {'message': record.getMessage()})
+    return event
+
+
+class JSONActivityFormatter(logging.Formatter):
+    """Renders an activity record as one JSON object per line"""
+
+    def format(self, record):
+        return json.dumps(activity_event(record), default=str)
+
+
+class AsyncActivityHandler(QueueHandler):
+    """
+    Puts records on a bounded in-memory queue; a QueueListener thread formats
+    them as JSON and writes them to a file (``filename``) or stdout.
+
+    Formatting is left to the listener, so the caller only pays for building
+    the LogRecord and a queue put. When the queue is full, records are dropped
+    and counted in ``dropped`` rather than blocking the request. With
+    ``store=True`` the listener also feeds the segment event store.
+    """
+
+    def __init__(self, filename=None, maxBytes=0, backupCount=0, queue_size=10000, store=False):
+        super().__init__(queue.Queue(maxsize=queue_size))
+        if filename:
+            target = RotatingFileHandler(filename, maxBytes=maxBytes, backupCount=backupCount, delay=True)
+        else:
+            target = logging.StreamHandler(sys.stdout)
+        target.setFormatter(JSONActivityFormatter())
+        targets = [target]
+        if store:
+            from .activity_store import ActivityStoreHandler
+            targets.append(ActivityStoreHandler())
+
+        self.dropped = 0
+        self.stopped = False
+        self.listener = QueueListener(self.queue, *targets)
+        self.listener.start()
+        atexit.register(self.stop)
+
+    def prepare(self, record):
+        # QueueHandler.prepare would format the message here, on the caller's thread
+        return record
+
+    def stop(self):
+        """Drain the queue, stop the listener thread and close its handlers"""
+        if self.stopped:
+            return
+        self.stopped = True
+        try:
+            self.listener.stop()
+        except queue.Full:
+            pass
+        for handler in self.listener.handlers:
+            handler.close()
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
@@ -0,0 +1,289 @@
+# Append-only storage of user activity events in compressed segment files
+
+import gzip
+import heapq
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ActivityEventStore:
+    """
+    Activity events on disk as immutable, gzip-compressed JSONL segments.
+
+    Inside a segment, each user's events are written as a separate gzip
+    member, so the file is still one valid ``.jsonl.gz``. The segment's
+    ``.idx.json`` sidecar records the time range of the segment and, per
+    user, the byte offset, length and time range of that user's member.
+    Reading one user's history opens only the segments whose index lists
+    them and decompresses only their slice of each file.
+
+    Parsed indexes are kept in a per-process manifest. Segments this process
+    cuts are added to it directly; the directory is listed again only when
+    its mtime changes (another process cut or pruned a segment), and only
+    indexes not seen before are read. Segments older than
+    ``ACTIVITY_RETENTION_DAYS`` are deleted by ``prune``.
+    """
+
+    # The directory mtime may not change again for writes within its timestamp granularity
+    MTIME_SETTLE_NS = 2 * 10 ** 9
+
+    _lock = threading.Lock()
+    _sequence = 0
+    _manifests = {}
+
+    @staticmethod
+    def directory():
+        return str(settings.APP_SETTINGS.get('ACTIVITY_STORE_DIR', settings.BASE_DIR / 'logs' / 'activity'))
+
+    @classmethod
+    def write_segment(cls, events):
+        """Write (created, event) pairs as one segment; return the segment path"""
+        if not events:
+            return None
+
+        directory = cls.directory()
+        os.makedirs(directory, exist_ok=True)
+
+        by_user = {}
+        for created, event in events:
+            by_user.setdefault(event.get('user'), []).append((created, event))
+
+        chunks = []
+        users = {}
+        offset = 0
+        for user, user_events in by_user.items():
+            # Readers merge segments on the timestamp, which needs each member in time order
+            user_events.sort(key=lambda item: item[0])
+            lines = ''.join(json.dumps(event, default=str) + '\n' for _, event in user_events)
+            member = gzip.compress(lines.encode(), compresslevel=6)
+            chunks.append(member)
+            users[user] = {
+                'offset': offset,
+                'length': len(member),
+                'count': len(user_events),
+                'start': user_events[0][0],
+                'end': user_events[-1][0],
+            }
+            offset += len(member)
+
+        start = min(created for created, _ in events)
+        with cls._lock:
+            cls._sequence += 1
+            sequence = cls._sequence
+        name = f"{time.strftime('%Y%m%dT%H%M%S', time.gmtime(start))}-{os.getpid()}-{sequence:06d}"
+        path = os.path.join(directory, f'{name}.jsonl.gz')
+
+        # Write the data before the index; a segment only becomes visible once its index exists
+        cls._write_atomic(path, b''.join(chunks))
+        index = {
+            'segment': os.path.basename(path),
+            'start': start,
+            'end': max(created for created, _ in events),
+            'count': len(events),
+            'users': users,
+        }
+        cls._write_atomic(os.path.join(directory, f'{name}.idx.json'), json.dumps(index).encode())
+        cls._update_manifest(directory, add={f'{name}.idx.json': index})
+        return path
+
+    @staticmethod
+    def _write_atomic(path, data):
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'wb') as handle:
+            handle.write(data)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _load_index(index_path):
+        with open(index_path, 'rb') as handle:
+            return json.load(handle)
+
+    @classmethod
+    def _update_manifest(cls, directory, add=(), remove=()):
+        with cls._lock:
+            manifest = cls._manifests.get(directory)
+            if manifest is None:
+                return
+            indexes = dict(manifest['indexes'])
+            indexes.update(add)
+            for name in remove:
+                indexes.pop(name, None)
+            manifest['indexes'] = indexes
+            manifest['sorted'] = sorted(indexes.values(), key=lambda index: index['start'])
+
+    @classmethod
+    def segments(cls):
+        """Return every segment index, oldest first"""
+        directory = cls.directory()
+        try:
+            mtime = os.stat(directory).st_mtime_ns
+        except FileNotFoundError:
+            return []
+
+        with cls._lock:
+            manifest = cls._manifests.get(directory)
+            if manifest is not None and manifest['mtime'] == mtime and time.time_ns() - mtime > cls.MTIME_SETTLE_NS:
+                return manifest['sorted']
+            known = manifest['indexes'] if manifest is not None else {}
+
+        indexes = {}
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if not entry.name.endswith('.idx.json'):
+                    continue
+                index = known.get(entry.name)
+                if index is None:
+                    try:
+                        index = cls._load_index(entry.path)
+                    except FileNotFoundError:  # pruned meanwhile
+                        continue
+                indexes[entry.name] = index
+
+        ordered = sorted(indexes.values(), key=lambda index: index['start'])
+        with cls._lock:
+            cls._manifests[directory] = {'mtime': mtime, 'indexes': indexes, 'sorted': ordered}
+        return ordered
+
+    @classmethod
+    def prune(cls, retention_days=None):
+        """Delete segments whose newest event is older than the retention period; return how many"""
+        if retention_days is None:
+            retention_days = settings.APP_SETTINGS.get('ACTIVITY_RETENTION_DAYS', 90)
+        if not retention_days:
+            return 0
+
+        cutoff = time.time() - retention_days * 86400
+        directory = cls.directory()
+        removed = []
+        for index in cls.segments():
+            if index['end'] >= cutoff:
+                continue
+            name = index['segment'][:-len('.jsonl.gz')] + '.idx.json'
+            # Index first, so readers stop seeing the segment before its data goes
+            for filename in (name, index['segment']):
+                try:
+                    os.remove(os.path.join(directory, filename))
+                except FileNotFoundError:  # another process pruned it
+                    pass
+            removed.append(name)
+
+        cls._update_manifest(directory, remove=removed)
+        if removed:
+            logger.info('Pruned %d activity segments older than %s days', len(removed), retention_days)
+        return len(removed)
+
+    @classmethod
+    def read_user(cls, mobile_number, since=None, until=None, limit=None):
+        """Yield one user's events in time order, optionally between two datetimes"""
+        since_ts = since.timestamp() if since else None
+        until_ts = until.timestamp() if until else None
+        directory = cls.directory()
+
+        members = []
+        for index in cls.segments():
+            entry = index['users'].get(mobile_number)
+            if entry is None:
+                continue
+            if (since_ts is not None and entry['end'] < since_ts) or (until_ts is not None and entry['start'] > until_ts):
+                continue
+            members.append(cls._read_member(os.path.join(directory, index['segment']), entry, since_ts, until_ts))
+
+        # Segments written by different processes overlap in time, so merge them on the timestamp
+        returned = 0
+        for _, event in heapq.merge(*members, key=lambda item: item[0]):
+            yield event
+            returned += 1
+            if limit is not None and returned >= limit:
+                return
+
+    @staticmethod
+    def _read_member(path, entry, since_ts, until_ts):
+        """Yield (timestamp, event) for one user's slice of a segment"""
+        with open(path, 'rb') as handle:
+            handle.seek(entry['offset'])
+            member = handle.read(entry['length'])
+
+        for line in gzip.decompress(member).splitlines():
+            event = json.loads(line)
+            created = datetime.fromisoformat(event['ts']).timestamp()
+            if (since_ts is not None and created < since_ts) or (until_ts is not None and created > until_ts):
+                continue
+            yield created, event
+
+
+class ActivityStoreHandler(logging.Handler):
+    """
+    Buffers activity records and writes them to the event store in segments.
+
+    A segment is cut when ``ACTIVITY_SEGMENT_MAX_EVENTS`` events are buffered
+    or the oldest buffered event is ``ACTIVITY_SEGMENT_MAX_SECONDS`` old; a
+    background timer cuts idle buffers too, and prunes expired segments
+    every ``ACTIVITY_PRUNE_INTERVAL_SECONDS``. Whatever is left is written on
+    shutdown. It runs behind AsyncActivityHandler's listener, off the
+    request thread.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.buffer = []
+        self.opened_at = None
+        self.timer = None
+
+    def emit(self, record):
+        from .activity import activity_event
+
+        try:
+            if not self.buffer:
+                self.opened_at = time.monotonic()
+            self.buffer.append((record.created, activity_event(record)))
+
+            config = settings.APP_SETTINGS
+            if (len(self.buffer) >= config.get('ACTIVITY_SEGMENT_MAX_EVENTS', 5000) or
+                    time.monotonic() - self.opened_at >= config.get('ACTIVITY_SEGMENT_MAX_SECONDS', 300)):
+                self.flush()
+
+            if self.timer is None or not self.timer.is_alive():
+                self.timer = threading.Thread(target=self._run_timer, name='activity-segment-timer', daemon=True)
+                self.timer.start()
+        except Exception:
+            self.handleError(record)
+
+    def _run_timer(self):
+        config = settings.APP_SETTINGS
+        pruned_at = None
+        while True:
+            max_seconds = config.get('ACTIVITY_SEGMENT_MAX_SECONDS', 300)
+            prune_interval = config.get('ACTIVITY_PRUNE_INTERVAL_SECONDS', 3600)
+            try:
+                if pruned_at is None or time.monotonic() - pruned_at >= prune_interval:
+                    pruned_at = time.monotonic()
+                    ActivityEventStore.prune()
+
+                with self.lock:
+                    opened_at = self.opened_at if self.buffer else None
+                if opened_at is not None and time.monotonic() - opened_at >= max_seconds:
+                    self.flush()
+                    opened_at = None
+            except Exception:
+                logger.exception('Activity segment timer failed')
+                opened_at = None
+
+            wait = max_seconds if opened_at is None else opened_at + max_seconds - time.monotonic()
+            time.sleep(max(1, min(wait, prune_interval)))
+
+    def flush(self):
+        with self.lock:
+            batch, self.buffer = self.buffer, []
+        if batch:
+            ActivityEventStore.write_segment(batch)
+
+    def close(self):
+        self.flush()
+        super().close()
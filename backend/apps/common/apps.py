@@ -3,3 +3,12 @@ from django.apps import AppConfig
 class CommonConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.common'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from django.utils.autoreload import file_changed
+        from . import metrics, queries, template_cache
+
+        connection_created.connect(metrics.install_execute_wrapper, dispatch_uid='metrics_execute_wrapper')
+        connection_created.connect(queries.install_execute_wrapper, dispatch_uid='queries_execute_wrapper')
+        file_changed.connect(template_cache.template_changed, dispatch_uid='template_fragment_cache')
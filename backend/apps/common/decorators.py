@@ -118,46 +118,53 @@ def log_api_call(view_func):
             log_user_activity(
                 request.user, 
                 f"API call: {request.method} {request.path}",
-                f"IP: {get_client_ip(request)}"
+                f"IP: {get_client_ip(request)}",
+                event='api_call'
             )
 
         return view_func(request, *args, **kwargs)
 
     return wrapper
 
-def rate_limit(max_requests=60, window=60):
-    """Simple rate limiting decorator (basic implementation)"""
-    # This is a basic implementation - in production use Redis-based rate limiting
-    request_counts = {}
+def rate_limit(max_requests=60, window=60, scope='ip', name=None):
+    """
+    Rate limiting decorator backed by the shared cache
 
+    Args:
+        max_requests: Requests allowed per window
+        window: Window length in seconds
+        scope: What the limit is keyed on: 'ip', 'mobile' or 'user'
+        name: Limit name; settings.RATE_LIMITS[name] overrides the arguments
+    """
     def decorator(view_func):
+        from .ratelimit import get_rules, check_request
+
+        rules = get_rules(name or view_func.__name__, max_requests, window, scope)
+
         @wraps(view_func)
         def wrapper(request, *args, **kwargs):
-            import time
-            from .utils import get_client_ip
-
-            client_ip = get_client_ip(request)
-            now = time.time()
-
-            # Clean old entries
-            cutoff = now - window
-            request_counts[client_ip] = [
-                timestamp for timestamp in request_counts.get(client_ip, [])
-                if timestamp > cutoff
-            ]
-
-            # Check rate limit
-            if len(request_counts[client_ip]) >= max_requests:
-                return ResponseHandler.error(
+            retry_after = check_request(request, rules)
+            if retry_after:
+                response = ResponseHandler.error(
                     "Rate limit exceeded. Try again later.", 
                     status=429
                 )
-
-            # Add current request
-            request_counts[client_ip].append(now)
+                response['Retry-After'] = str(max(1, round(retry_after)))
+                return response
 
             return view_func(request, *args, **kwargs)
 
         return wrapper
 
     return decorator
+
+def query_budget(max_queries):
+    """
+    Declare the most SQL statements a view may run (transaction statements
+    excluded); enforced by QueryInspectionMiddleware. Apply it below
+    ``api_endpoint`` so the attribute is copied onto the wrapper.
+    """
+    def decorator(view_func):
+        view_func.query_budget = max_queries
+        return view_func
+    return decorator
@@ -0,0 +1,63 @@
+# JSON encoding for API responses: orjson when installed, stdlib otherwise
+
+import datetime
+import json
+import uuid
+from decimal import Decimal
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.functional import Promise
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+
+def _orjson_default(value):
+    # orjson handles datetime, date, time and UUID natively; these are the Django extras
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, Promise):
+        return str(value)
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+def _dumps_orjson(data):
+    return orjson.dumps(data, default=_orjson_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+class IsoJSONEncoder(json.JSONEncoder):
+    """Stdlib encoder producing the same output as the orjson path (full isoformat(), no 'Z')"""
+
+    def default(self, value):
+        if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+            return value.isoformat()
+        if isinstance(value, uuid.UUID):
+            return str(value)
+        return _orjson_default(value)
+
+
+def _dumps_stdlib(data):
+    return json.dumps(data, cls=IsoJSONEncoder, separators=(',', ':'), ensure_ascii=False).encode()
+
+
+def get_encoder():
+    """Return the bytes encoder chosen by APP_SETTINGS['JSON_ENCODER'] ('auto', 'orjson' or 'stdlib')"""
+    choice = settings.APP_SETTINGS.get('JSON_ENCODER', 'auto')
+    if choice == 'stdlib' or orjson is None:
+        return _dumps_stdlib
+    return _dumps_orjson
+
+
+def dumps(data):
+    """Encode data straight to JSON bytes (datetimes, Decimals and lazy strings included)"""
+    return get_encoder()(data)
+
+
+class FastJsonResponse(HttpResponse):
+    """JsonResponse equivalent that encodes with the fast encoder"""
+
+    def __init__(self, data, **kwargs):
+        kwargs.setdefault('content_type', 'application/json')
+        super().__init__(content=dumps(data), **kwargs)
@@ -40,3 +40,7 @@ class BookingError(ServiceError):
 class ChatError(ServiceError):
     """Chat specific errors"""
     pass
+
+class QueryBudgetExceeded(Exception):
+    """A request exceeded its query budget or repeated a query shape (N+1)"""
+    pass
@@ -0,0 +1,187 @@
+# Address to coordinates lookup through pluggable, cached geocoders
+
+import hashlib
+import json
+import logging
+import queue
+import threading
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+_geocoder = None
+
+
+class GeocodingUnavailable(Exception):
+    """The provider could not be reached; unlike "no result", this is not cached"""
+
+
+class BaseGeocoder:
+    """Interface for geocoding providers"""
+
+    def geocode(self, address):
+        """
+        Return (latitude, longitude) for an address, or None when the provider
+        has no match. Raise GeocodingUnavailable on transport failures.
+        """
+        raise NotImplementedError
+
+
+class NullGeocoder(BaseGeocoder):
+    """Resolves nothing (the default; clients or a map picker send coordinates)"""
+
+    def geocode(self, address):
+        return None
+
+
+class NominatimGeocoder(BaseGeocoder):
+    """
+    Looks addresses up with a Nominatim search endpoint (``GEOCODER_URL``).
+
+    Addresses leave the deployment, so this is opt-in. Public OpenStreetMap
+    servers require an identifying ``GEOCODER_USER_AGENT`` and at most one
+    request per second, which ``GEOCODER_MIN_INTERVAL_SECONDS`` enforces.
+    """
+
+    def __init__(self):
+        config = settings.APP_SETTINGS
+        self.url = config.get('GEOCODER_URL', 'https://nominatim.openstreetmap.org/search')
+        self.user_agent = config.get('GEOCODER_USER_AGENT', 'food-delivery-lite')
+        self.timeout = config.get('GEOCODER_TIMEOUT_SECONDS', 3)
+        self.min_interval = config.get('GEOCODER_MIN_INTERVAL_SECONDS', 1)
+        self._lock = threading.Lock()
+        self._last_request = 0
+
+    def _throttle(self):
+        with self._lock:
+            wait = self._last_request + self.min_interval - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            self._last_request = time.monotonic()
+
+    def geocode(self, address):
+        from urllib.parse import urlencode
+        from urllib.request import Request, urlopen
+
+        self._throttle()
+        query = urlencode({'q': address, 'format': 'json', 'limit': 1})
+        request = Request(f'{self.url}?{query}', headers={'User-Agent': self.user_agent})
+        try:
+            with urlopen(request, timeout=self.timeout) as response:
+                results = json.load(response)
+        except (OSError, ValueError) as e:
+            raise GeocodingUnavailable(str(e)) from e
+
+        if not results:
+            return None
+        return float(results[0]['lat']), float(results[0]['lon'])
+
+
+def get_geocoder():
+    global _geocoder
+    if _geocoder is None:
+        backend = settings.APP_SETTINGS.get('GEOCODER_BACKEND', 'apps.common.geocoding.NullGeocoder')
+        _geocoder = import_string(backend)()
+    return _geocoder
+
+
+def geocode(address):
+    """Cached (latitude, longitude) for an address, or None; may raise GeocodingUnavailable"""
+    normalized = ' '.join(str(address or '').lower().split())
+    if not normalized:
+        return None
+
+    key = f'geocode:{hashlib.md5(normalized.encode(), usedforsecurity=False).hexdigest()}'
+    cached = cache.get(key)
+    if cached is not None:
+        return tuple(cached) or None
+
+    point = get_geocoder().geocode(normalized)
+    # Genuine misses are cached as () too, so an unknown address is not looked up on every booking
+    cache.set(key, point or (), timeout=settings.APP_SETTINGS.get('GEOCODER_CACHE_TTL', 86400))
+    return point
+
+
+class BookingGeocoder:
+    """
+    Fills missing booking coordinates from a background thread.
+
+    Views call ``submit`` from ``transaction.on_commit``, so neither the
+    request nor its transaction waits on the provider. Only ends that are
+    still empty are written, so coordinates sent later by a client win.
+    """
+
+    ENDS = ('pickup', 'delivery')
+
+    _lock = threading.Lock()
+    _queue = None
+    _worker = None
+
+    @staticmethod
+    def needs_coordinates(booking):
+        return any(
+            getattr(booking, f'{end}_latitude') is None or getattr(booking, f'{end}_longitude') is None
+            for end in BookingGeocoder.ENDS
+        )
+
+    @classmethod
+    def submit(cls, booking_id):
+        if isinstance(get_geocoder(), NullGeocoder):
+            return
+        with cls._lock:
+            if cls._worker is None or not cls._worker.is_alive():
+                if cls._queue is None:
+                    cls._queue = queue.Queue(maxsize=settings.APP_SETTINGS.get('GEOCODER_QUEUE_SIZE', 1000))
+                cls._worker = threading.Thread(target=cls._run, name='booking-geocoder', daemon=True)
+                cls._worker.start()
+        try:
+            cls._queue.put_nowait(booking_id)
+        except queue.Full:
+            logger.warning('Geocoding queue full; booking %s keeps its missing coordinates', booking_id)
+
+    @classmethod
+    def _run(cls):
+        from django.db import close_old_connections
+
+        while True:
+            booking_id = cls._queue.get()
+            close_old_connections()
+            try:
+                cls.fill(booking_id)
+            except Exception:
+                logger.exception('Geocoding booking %s failed', booking_id)
+            finally:
+                cls._queue.task_done()
+
+    @classmethod
+    def fill(cls, booking_id):
+        """Geocode the booking's empty ends and store them; returns the number of ends filled"""
+        from apps.booking.models import Booking
+
+        booking = Booking.objects.filter(pk=booking_id).only(
+            'pickup_address', 'delivery_address', 'pickup_latitude', 'pickup_longitude',
+            'delivery_latitude', 'delivery_longitude',
+        ).first()
+        if booking is None:
+            return 0
+
+        filled = 0
+        for end in cls.ENDS:
+            latitude, longitude = f'{end}_latitude', f'{end}_longitude'
+            if getattr(booking, latitude) is not None and getattr(booking, longitude) is not None:
+                continue
+            try:
+                point = geocode(getattr(booking, f'{end}_address'))
+            except GeocodingUnavailable as e:
+                logger.warning('Geocoder unavailable for booking %s: %s', booking_id, e)
+                return filled
+            if point:
+                # update() skips auto_now; bump updated_at so page ETags change too
+                filled += Booking.objects.filter(
+                    pk=booking_id, **{f'{latitude}__isnull': True}
+                ).update(**{latitude: point[0], longitude: point[1]}, updated_at=timezone.now())
+        return filled
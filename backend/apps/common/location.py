@@ -0,0 +1,196 @@
+# Partner location ingestion: ring buffers, downsampling and batched persistence
+
+import atexit
+import logging
+import math
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone as dt_timezone
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_M = 6371000
+
+
+def haversine_m(lat1, lng1, lat2, lng2):
+    """Great-circle distance between two points in metres"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lng2 - lng1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+
+class LocationTracker:
+    """
+    Process-wide ingest buffer for partner GPS pings.
+
+    Every ping lands in a bounded per-partner ring buffer and refreshes the
+    partner's latest position in the shared cache. A point is only queued for
+    the database when the partner moved far enough or enough time passed since
+    the last persisted point, and queued points are written with a single
+    ``bulk_create`` once the batch is full or the flush interval elapsed.
+    A background thread also flushes on that interval, so the last points
+    before a partner goes quiet are not held back until their next ping.
+    """
+
+    _lock = threading.Lock()
+    _recent = {}
+    _last_persisted = {}
+    _connections = {}
+    _pending = []
+    _last_flush = time.monotonic()
+    _flusher = None
+
+    @staticmethod
+    def _setting(name, default):
+        return settings.APP_SETTINGS.get(name, default)
+
+    @staticmethod
+    def latest_key(partner_id):
+        return f'location:latest:{partner_id}'
+
+    @classmethod
+    def record(cls, partner_id, latitude, longitude, timestamp=None):
+        """
+        Ingest one ping.
+
+        Returns the list of points to persist when a flush is due, otherwise
+        an empty list. Callers hand that list to ``persist`` (off the event loop).
+        """
+        timestamp = timestamp or time.time()
+        point = (timestamp, latitude, longitude)
+        buffer_size = cls._setting('LOCATION_BUFFER_SIZE', 20)
+
+        with cls._lock:
+            recent = cls._recent.get(partner_id)
+            if recent is None:
+                recent = cls._recent[partner_id] = deque(maxlen=buffer_size)
+            recent.append(point)
+
+            if cls._should_persist(partner_id, point):
+                cls._last_persisted[partner_id] = point
+                cls._pending.append((partner_id, point))
+
+            batch = cls._take_batch_if_due()
+            if cls._pending and (cls._flusher is None or not cls._flusher.is_alive()):
+                cls._flusher = threading.Thread(target=cls._run_flusher, name='location-flusher', daemon=True)
+                cls._flusher.start()
+
+        cache.set(cls.latest_key(partner_id), point, timeout=cls._setting('LOCATION_LATEST_TTL_SECONDS', 300))
+        return batch
+
+    @classmethod
+    def _should_persist(cls, partner_id, point):
+        last = cls._last_persisted.get(partner_id)
+        if last is None:
+            return True
+
+        if point[0] - last[0] >= cls._setting('LOCATION_PERSIST_INTERVAL_SECONDS', 30):
+            return True
+
+        return haversine_m(last[1], last[2], point[1], point[2]) >= cls._setting('LOCATION_PERSIST_DISTANCE_M', 50)
+
+    @classmethod
+    def _take_batch_if_due(cls, force=False):
+        """Detach pending points when the batch is full or stale (lock must be held)"""
+        if not cls._pending:
+            return []
+
+        now = time.monotonic()
+        batch_full = len(cls._pending) >= cls._setting('LOCATION_FLUSH_BATCH_SIZE', 500)
+        stale = now - cls._last_flush >= cls._setting('LOCATION_FLUSH_INTERVAL_SECONDS', 5)
+        if not (force or batch_full or stale):
+            return []
+
+        batch, cls._pending = cls._pending, []
+        cls._last_flush = now
+        return batch
+
+    @classmethod
+    def _run_flusher(cls):
+        from django.db import close_old_connections
+
+        while True:
+            time.sleep(cls._setting('LOCATION_FLUSH_INTERVAL_SECONDS', 5))
+            with cls._lock:
+                batch = cls._take_batch_if_due()
+            if not batch:
+                continue
+            close_old_connections()
+            try:
+                cls.persist(batch)
+            except Exception:
+                logger.exception('Persisting %d partner locations failed', len(batch))
+
+    @classmethod
+    def flush(cls):
+        """Persist whatever is pending, e.g. on disconnect or shutdown"""
+        with cls._lock:
+            batch = cls._take_batch_if_due(force=True)
+        cls.persist(batch)
+
+    @classmethod
+    def persist(cls, batch):
+        """Write a batch of (partner_id, point) tuples with one bulk insert"""
+        if not batch:
+            return 0
+
+        from apps.booking.models import PartnerLocation
+
+        PartnerLocation.objects.bulk_create([
+            PartnerLocation(
+                partner_id=partner_id,
+                latitude=latitude,
+                longitude=longitude,
+                recorded_at=datetime.fromtimestamp(timestamp, tz=dt_timezone.utc),
+            )
+            for partner_id, (timestamp, latitude, longitude) in batch
+        ], batch_size=cls._setting('LOCATION_FLUSH_BATCH_SIZE', 500))
+        return len(batch)
+
+    @classmethod
+    def connect(cls, partner_id):
+        """Count one more location socket for the partner in this process"""
+        with cls._lock:
+            cls._connections[partner_id] = cls._connections.get(partner_id, 0) + 1
+
+    @classmethod
+    def disconnect(cls, partner_id):
+        """Count a closed socket; forget the partner once none are left. Returns True if forgotten"""
+        with cls._lock:
+            remaining = cls._connections.get(partner_id, 1) - 1
+            if remaining > 0:
+                cls._connections[partner_id] = remaining
+                return False
+            cls._connections.pop(partner_id, None)
+            cls._forget_locked(partner_id)
+            return True
+
+    @classmethod
+    def forget(cls, partner_id):
+        """Drop in-memory state for a partner that went offline"""
+        with cls._lock:
+            cls._forget_locked(partner_id)
+
+    @classmethod
+    def _forget_locked(cls, partner_id):
+        cls._recent.pop(partner_id, None)
+        cls._last_persisted.pop(partner_id, None)
+
+    @classmethod
+    def recent_points(cls, partner_id):
+        """Points held in this process's ring buffer, oldest first"""
+        with cls._lock:
+            return list(cls._recent.get(partner_id, ()))
+
+    @classmethod
+    def latest_position(cls, partner_id):
+        """Latest (timestamp, latitude, longitude) for a partner from any worker"""
+        return cache.get(cls.latest_key(partner_id))
+
+
+atexit.register(LocationTracker.flush)
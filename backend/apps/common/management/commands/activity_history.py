@@ -0,0 +1,34 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from apps.common.activity_store import ActivityEventStore
+
+
+def parse_bound(value):
+    if not value:
+        return None
+    parsed = parse_datetime(value)
+    if parsed is None:
+        raise CommandError(f'Invalid timestamp: {value}')
+    return timezone.make_aware(parsed) if timezone.is_naive(parsed) else parsed
+
+
+class Command(BaseCommand):
+    help = "Print one user's activity history from the activity event store as JSON lines"
+
+    def add_arguments(self, parser):
+        parser.add_argument('mobile_number')
+        parser.add_argument('--since', help='ISO timestamp; only events at or after it')
+        parser.add_argument('--until', help='ISO timestamp; only events at or before it')
+        parser.add_argument('--limit', type=int)
+
+    def handle(self, *args, **options):
+        events = ActivityEventStore.read_user(
+            options['mobile_number'],
+            since=parse_bound(options['since']),
+            until=parse_bound(options['until']),
+            limit=options['limit'],
+        )
+        for event in events:
+            self.stdout.write(json.dumps(event))
@@ -0,0 +1,238 @@
+import json
+import logging
+import random
+import time
+from decimal import Decimal
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, setup_databases, teardown_databases
+from django.utils import timezone
+from apps.authentication.models import User
+from apps.booking.models import Booking
+from apps.chat.models import ChatMessage, ChatRoom
+from apps.common.queries import TRANSACTION_STATEMENTS
+from apps.common.sms import FakeSMSGateway, SMSDispatcher
+from apps.common.user_lookup import UserLookup
+
+SCENARIOS = ['check_user', 'verify_otp', 'dashboard', 'booking_list', 'booking_detail', 'status_update', 'chat_history']
+NEXT_STATUS = {'assigned': 'started', 'started': 'reached', 'reached': 'collected', 'collected': 'delivered',
+               'delivered': 'started'}
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = 'Seed a synthetic dataset in a throwaway database and benchmark the key endpoints'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--customers', type=int, default=50)
+        parser.add_argument('--partners', type=int, default=10)
+        parser.add_argument('--bookings', type=int, default=500)
+        parser.add_argument('--messages', type=int, default=2000)
+        parser.add_argument('--requests', type=int, default=200, help='Requests per endpoint')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--only', nargs='+', choices=SCENARIOS, help='Run only these endpoints')
+        parser.add_argument('--output', help='Write results as JSON (use as a later --baseline)')
+        parser.add_argument('--baseline', help='Compare against a stored JSON result')
+        parser.add_argument('--threshold', type=float, default=0.2,
+                            help='Allowed relative p95/throughput regression before failing')
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.clients = {}
+
+        # Keep SMS and activity output out of the measurements
+        settings.APP_SETTINGS['SMS_GATEWAY_BACKEND'] = 'apps.common.sms.FakeSMSGateway'
+        # Inline delivery puts each OTP in the fake outbox before send-otp returns
+        settings.APP_SETTINGS['SMS_ASYNC'] = False
+        SMSDispatcher._gateway = None
+        logging.getLogger('apps.activity').disabled = True
+
+        old_config = setup_databases(verbosity=0, interactive=False, aliases={'default'})
+        try:
+            started = time.monotonic()
+            self.seed(options)
+            self.stdout.write(f'Seeded dataset in {time.monotonic() - started:.1f}s')
+            results = {}
+            for name in options['only'] or SCENARIOS:
+                results[name] = self.run_scenario(name, options['requests'])
+                self.report(name, results[name])
+        finally:
+            teardown_databases(old_config, verbosity=0)
+
+        output = {
+            'meta': {
+                'seed': options['seed'],
+                'customers': options['customers'],
+                'partners': options['partners'],
+                'bookings': options['bookings'],
+                'messages': options['messages'],
+                'requests': options['requests'],
+                'database': connection.vendor,
+                'recorded_at': timezone.now().isoformat(),
+            },
+            'results': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                json.dump(output, handle, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+        if options['baseline']:
+            self.compare(results, options['baseline'], options['threshold'])
+
+    def seed(self, options):
+        rng = self.rng
+        password = make_password(None)
+
+        def users(prefix, count, role):
+            return User.objects.bulk_create([
+                User(mobile_number=f'{prefix}{i:08d}', username=f'{prefix}{i:08d}', role=role,
+                     is_mobile_verified=True, password=password)
+                for i in range(count)
+            ])
+
+        self.customers = users('90', options['customers'], 'customer')
+        self.partners = users('91', options['partners'], 'delivery_partner')
+        UserLookup.invalidate_filters()
+
+        statuses = ['pending', 'assigned', 'started', 'reached', 'collected', 'delivered']
+        bookings = []
+        for i in range(options['bookings']):
+            status = rng.choice(statuses)
+            customer = rng.choice(self.customers)
+            bookings.append(Booking(
+                customer=customer,
+                delivery_partner=None if status == 'pending' else rng.choice(self.partners),
+                food_items=f'{rng.randint(1, 4)}x Item {rng.randint(1, 50)}',
+                pickup_address=f'{rng.randint(1, 999)} Restaurant Street, Sector {rng.randint(1, 60)}',
+                delivery_address=f'{rng.randint(1, 999)} Customer Lane, Sector {rng.randint(1, 60)}',
+                phone_number=customer.mobile_number,
+                total_amount=Decimal(rng.randint(100, 2000)) / 2,
+                status=status,
+            ))
+        self.bookings = Booking.objects.bulk_create(bookings)
+
+        assigned = [b for b in self.bookings if b.delivery_partner_id]
+        rooms = ChatRoom.objects.bulk_create([ChatRoom(booking=b) for b in assigned])
+        self.rooms = rooms
+        ChatMessage.objects.bulk_create([
+            ChatMessage(
+                chat_room=room,
+                sender_id=rng.choice([room.booking.customer_id, room.booking.delivery_partner_id]),
+                message=f'Message {i}',
+            )
+            for i, room in ((i, rng.choice(rooms)) for i in range(options['messages'] if rooms else 0))
+        ], batch_size=1000)
+
+    def client_for(self, user):
+        client = self.clients.get(user.pk)
+        if client is None:
+            client = self.clients[user.pk] = Client()
+            client.force_login(user)
+        return client
+
+    def prepare(self, name, i):
+        """Return a callable issuing one request; setup work happens here, outside the timing"""
+        rng = self.rng
+        if name == 'check_user':
+            client = Client(REMOTE_ADDR=f'10.1.{i // 256 % 256}.{i % 256}')
+            mobile = rng.choice(self.customers).mobile_number if i % 2 else f'98{rng.randint(0, 10 ** 8 - 1):08d}'
+            return lambda: client.post('/auth/api/check-user/', json.dumps({'mobile_number': mobile}),
+                                       content_type='application/json')
+
+        if name == 'verify_otp':
+            client = Client(REMOTE_ADDR=f'10.2.{i // 256 % 256}.{i % 256}')
+            mobile = f'93{i:08d}'
+            client.post('/auth/api/send-otp/', json.dumps({'mobile_number': mobile}), content_type='application/json')
+            code = FakeSMSGateway.last_code(mobile)
+            return lambda: client.post('/auth/api/verify-otp/', json.dumps({'mobile_number': mobile, 'otp_code': code}),
+                                       content_type='application/json')
+
+        if name in ('dashboard', 'booking_list', 'booking_detail'):
+            booking = rng.choice(self.bookings)
+            client = self.client_for(booking.customer)
+            url = {'dashboard': '/auth/dashboard/', 'booking_list': '/booking/',
+                   'booking_detail': f'/booking/{booking.pk}/'}[name]
+            return lambda: client.get(url)
+
+        if name == 'status_update':
+            booking = rng.choice([b for b in self.bookings if b.delivery_partner_id])
+            booking.status = NEXT_STATUS.get(booking.status, 'started')
+            client = self.client_for(booking.delivery_partner)
+            return lambda: client.post(f'/booking/{booking.pk}/update-status/', {'status': booking.status})
+
+        if name == 'chat_history':
+            room = rng.choice(self.rooms)
+            client = self.client_for(room.booking.customer)
+
+            def request():
+                response = client.get(f'/chat/api/messages/{room.booking_id}/')
+                if response.streaming:
+                    b''.join(response.streaming_content)
+                return response
+            return request
+
+        raise CommandError(f'Unknown scenario {name}')
+
+    def run_scenario(self, name, count):
+        latencies, queries, failures = [], [], 0
+        for i in range(count):
+            request = self.prepare(name, i)
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                response = request()
+                latencies.append(time.perf_counter() - started)
+            queries.append(sum(1 for q in captured if not q['sql'].lstrip().upper().startswith(TRANSACTION_STATEMENTS)))
+            if response.status_code >= 400:
+                failures += 1
+
+        return {
+            'requests': count,
+            'failures': failures,
+            'throughput_rps': round(count / sum(latencies), 1),
+            'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+            'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+            'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+            'queries_per_request': round(sum(queries) / count, 2),
+        }
+
+    def report(self, name, result):
+        line = (f"{name:>15}: {result['throughput_rps']:8.1f} req/s  p50 {result['p50_ms']:7.2f} ms  "
+                f"p95 {result['p95_ms']:7.2f} ms  p99 {result['p99_ms']:7.2f} ms  "
+                f"queries {result['queries_per_request']:5.2f}")
+        if result['failures']:
+            line += f"  failures {result['failures']}"
+        self.stdout.write(line)
+
+    def compare(self, results, baseline_path, threshold):
+        with open(baseline_path) as handle:
+            baseline = json.load(handle)['results']
+
+        regressions = []
+        for name, result in results.items():
+            base = baseline.get(name)
+            if base is None:
+                continue
+            problems = []
+            if result['p95_ms'] > base['p95_ms'] * (1 + threshold):
+                problems.append(f"p95 {base['p95_ms']} -> {result['p95_ms']} ms")
+            if result['throughput_rps'] < base['throughput_rps'] * (1 - threshold):
+                problems.append(f"throughput {base['throughput_rps']} -> {result['throughput_rps']} req/s")
+            if result['queries_per_request'] > base['queries_per_request']:
+                problems.append(f"queries {base['queries_per_request']} -> {result['queries_per_request']}")
+
+            if problems:
+                regressions.append(name)
+                self.stdout.write(self.style.ERROR(f"{name:>15}: REGRESSION {', '.join(problems)}"))
+            else:
+                self.stdout.write(self.style.SUCCESS(f'{name:>15}: ok'))
+
+        if regressions:
+            raise CommandError(f"Regressions against {baseline_path}: {', '.join(regressions)}")
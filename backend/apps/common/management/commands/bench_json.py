@@ -0,0 +1,78 @@
+import time
+from datetime import timedelta
+from decimal import Decimal
+from django.core.management.base import BaseCommand
+from django.http import JsonResponse
+from django.utils import timezone
+from apps.common import encoders
+
+
+def booking_payload(count):
+    now = timezone.now()
+    return {
+        'status': 'success',
+        'message': 'Bookings retrieved',
+        'timestamp': now,
+        'data': {'bookings': [{
+            'id': i,
+            'customer': f'98{i:08d}',
+            'delivery_partner': f'97{i:08d}',
+            'food_items': '2x Paneer Tikka, 1x Garlic Naan, 1x Lassi',
+            'pickup_address': '12 MG Road, Bengaluru 560001',
+            'delivery_address': '45 Residency Road, Bengaluru 560025',
+            'total_amount': Decimal('349.50'),
+            'status': 'assigned',
+            'created_at': now - timedelta(minutes=i),
+            'updated_at': now,
+        } for i in range(count)]},
+    }
+
+
+def chat_payload(count):
+    now = timezone.now()
+    return {'messages': [{
+        'id': i,
+        'message': 'On my way, reaching in 5 minutes',
+        'sender_id': i % 2 + 1,
+        'sender_name': 'Delivery Partner - 9876543210',
+        'timestamp': now - timedelta(seconds=i),
+        'is_read': bool(i % 3),
+    } for i in range(count)]}
+
+
+def legacy_response(payload):
+    """The previous path: pre-formatted timestamps through JsonResponse"""
+    payload = dict(payload, timestamp=payload['timestamp'].isoformat()) if 'timestamp' in payload else payload
+    return JsonResponse(payload)
+
+
+class Command(BaseCommand):
+    help = 'Compare JsonResponse with the fast encoder path for booking and chat payloads'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=200)
+
+    def timed(self, build, payload, iterations):
+        started = time.perf_counter()
+        for _ in range(iterations):
+            response = build(payload)
+        return (time.perf_counter() - started) / iterations * 1e6, len(response.content)
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        encoder = 'stdlib' if encoders.get_encoder() is encoders._dumps_stdlib else 'orjson'
+        self.stdout.write(f'fast encoder: {encoder}')
+
+        cases = [
+            ('booking (1)', booking_payload(1)),
+            ('bookings (50)', booking_payload(50)),
+            ('chat (20)', chat_payload(20)),
+            ('chat (1000)', chat_payload(1000)),
+        ]
+        for name, payload in cases:
+            old_us, old_size = self.timed(legacy_response, payload, iterations)
+            new_us, new_size = self.timed(encoders.FastJsonResponse, payload, iterations)
+            self.stdout.write(
+                f'{name:>14}: JsonResponse {old_us:9.1f} us ({old_size} B), '
+                f'fast {new_us:9.1f} us ({new_size} B), {old_us / new_us:.1f}x'
+            )
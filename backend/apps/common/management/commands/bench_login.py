@@ -0,0 +1,68 @@
+import json
+import logging
+import statistics
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, setup_databases, teardown_databases
+from apps.common.sms import FakeSMSGateway, SMSDispatcher
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = 'Measure verify_otp login latency (p50/p99) and queries per login in a throwaway database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--logins', type=int, default=200, help='Logins per scenario')
+        parser.add_argument('--prefix', default='95', help='Mobile number prefix used for benchmark users')
+
+    def handle(self, *args, **options):
+        # Keep SMS and activity output out of the measurements
+        settings.APP_SETTINGS['SMS_GATEWAY_BACKEND'] = 'apps.common.sms.FakeSMSGateway'
+        # Inline delivery puts each OTP in the fake outbox before send-otp returns
+        settings.APP_SETTINGS['SMS_ASYNC'] = False
+        SMSDispatcher._gateway = None
+        logging.getLogger('apps.activity').disabled = True
+
+        # Benchmark users go into a test database, never the configured one
+        old_config = setup_databases(verbosity=0, interactive=False, aliases={'default'})
+        try:
+            self.run(options['logins'], options['prefix'])
+        finally:
+            teardown_databases(old_config, verbosity=0)
+
+    def run(self, logins, prefix):
+        # First pass creates the users, second pass logs the same users in again
+        for scenario in ('new user', 'existing user'):
+            latencies, queries = [], []
+            for i in range(logins):
+                mobile_number = f'{prefix}{i:08d}'
+                # A distinct client address per login keeps the IP rate limit out of the numbers
+                client = Client(REMOTE_ADDR=f'10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}')
+                client.post('/auth/api/send-otp/', json.dumps({'mobile_number': mobile_number}),
+                            content_type='application/json')
+
+                with CaptureQueriesContext(connection) as captured:
+                    started = time.perf_counter()
+                    response = client.post('/auth/api/verify-otp/', json.dumps({
+                        'mobile_number': mobile_number,
+                        'otp_code': FakeSMSGateway.last_code(mobile_number),
+                    }), content_type='application/json')
+                    latencies.append((time.perf_counter() - started) * 1000)
+
+                if response.status_code != 200:
+                    self.stderr.write(f'Login failed for {mobile_number}: {response.status_code}')
+                queries.append(len(captured))
+
+            self.stdout.write(
+                f'{scenario:>14}: p50 {percentile(latencies, 50):.2f} ms, '
+                f'p99 {percentile(latencies, 99):.2f} ms, '
+                f'queries/login {statistics.mean(queries):.1f}'
+            )
@@ -0,0 +1,30 @@
+import time
+from django.core.management.base import BaseCommand
+from apps.common.ratelimit import RateLimiter
+
+
+class Command(BaseCommand):
+    help = 'Measure per-request rate limiter overhead as the number of tracked keys grows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keys', type=int, nargs='+', default=[100, 1000, 10000, 100000],
+                            help='Distinct client keys to spread requests over')
+        parser.add_argument('--requests', type=int, default=20000, help='Timed requests per run')
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{'keys':>10} {'requests':>10} {'us/request':>12}")
+
+        for key_count in options['keys']:
+            limiter = RateLimiter(f'bench:{key_count}', max_requests=1000, window=60)
+
+            # Warm up so every key already holds state
+            for i in range(key_count):
+                limiter.hit(f'client-{i}')
+
+            requests = options['requests']
+            started = time.perf_counter()
+            for i in range(requests):
+                limiter.hit(f'client-{i % key_count}')
+            elapsed = time.perf_counter() - started
+
+            self.stdout.write(f'{key_count:>10} {requests:>10} {elapsed / requests * 1e6:>12.2f}')
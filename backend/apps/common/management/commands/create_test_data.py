@@ -1,81 +1,80 @@
 # management/commands/create_test_data.py
 
-from django.core.management.base import BaseCommand
-from django.contrib.auth import get_user_model
-from apps.booking.models import Booking, BookingStatusHistory
-from apps.authentication.models import OTP
-import random
+import time
+from datetime import datetime
+from django.core.management.base import BaseCommand, CommandError
+from apps.authentication.models import User
+from apps.booking.models import Booking
+from apps.chat.models import ChatMessage, ChatRoom
+from apps.common.rollups import BookingRollups
+from apps.common.synthetic import MOBILE_REGEX, SyntheticDataGenerator
+from apps.common.user_lookup import UserLookup
 
-User = get_user_model()
 
 class Command(BaseCommand):
-    help = 'Create test data for development'
+    help = 'Generate a reproducible synthetic dataset (users, bookings, chat rooms and messages) at scale'
 
     def add_arguments(self, parser):
-        parser.add_argument('--users', type=int, default=10, help='Number of test users')
-        parser.add_argument('--bookings', type=int, default=20, help='Number of test bookings')
-        parser.add_argument('--clear', action='store_true', help='Clear existing test data first')
+        parser.add_argument('--users', type=int, default=1000, help='Number of users (90%% customers, 9%% partners, 1%% admins)')
+        parser.add_argument('--bookings', type=int, default=5000, help='Number of bookings')
+        parser.add_argument('--messages-per-room', type=float, default=4, help='Mean chat messages per assigned booking')
+        parser.add_argument('--days', type=int, default=90, help='Bookings are spread over this many days')
+        parser.add_argument('--until', help='End of the booking window, YYYY-MM-DD (default: today, UTC)')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=10000)
+        parser.add_argument('--no-copy', action='store_true', help='Use batched INSERTs even on PostgreSQL')
+        parser.add_argument('--clear', action='store_true', help='Delete previously generated data first')
 
     def handle(self, *args, **options):
         if options['clear']:
-            self.stdout.write('Clearing existing test data...')
+            self.stdout.write('Clearing existing synthetic data...')
             self.clear_test_data()
 
-        self.stdout.write('Creating test users...')
-        users = self.create_test_users(options['users'])
-
-        self.stdout.write('Creating test bookings...')
-        self.create_test_bookings(users, options['bookings'])
-
-        self.stdout.write(self.style.SUCCESS('Successfully created test data!'))
+        until = None
+        if options['until']:
+            try:
+                until = datetime.strptime(options['until'], '%Y-%m-%d')
+            except ValueError:
+                raise CommandError('--until must be YYYY-MM-DD')
+
+        users = options['users']
+        admins = users // 100
+        partners = max(1, users * 9 // 100)
+        customers = users - partners - admins
+        if customers < 1:
+            raise CommandError('--users must leave at least one customer')
+
+        generator = SyntheticDataGenerator(
+            seed=options['seed'], until=until, days=options['days'],
+            batch_size=options['batch_size'], use_copy=False if options['no_copy'] else None,
+        )
+        self.reported = {}
+        started = time.monotonic()
+        counts = generator.generate(customers, partners, admins, options['bookings'], options['messages_per_room'],
+                                    progress=self.progress)
+        elapsed = time.monotonic() - started
+        UserLookup.invalidate_filters()
+        # Generated bookings carry historic timestamps; --clear also deleted bookings,
+        # which only a full rebuild drops from the rollups
+        BookingRollups.refresh(full=options['clear'])
+
+        total = sum(counts.values())
+        for model, count in counts.items():
+            self.stdout.write(f'{model.__name__:>12}: {count}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated {total} rows in {elapsed:.1f}s ({total / max(elapsed, 1e-9):,.0f} rows/s)'
+        ))
+
+    def progress(self, model, count):
+        # One line per 100k rows of each table
+        step = count // 100000
+        if step > self.reported.get(model, 0):
+            self.reported[model] = step
+            self.stdout.write(f'  {model.__name__}: {count}')
 
     def clear_test_data(self):
-        User.objects.filter(mobile_number__startswith='test').delete()
-        OTP.objects.filter(mobile_number__startswith='test').delete()
-
-    def create_test_users(self, count):
-        users = {'customers': [], 'delivery_partners': [], 'admins': []}
-
-        for i in range(count):
-            role = 'customer' if i < count * 0.6 else ('delivery_partner' if i < count * 0.9 else 'admin')
-            mobile = f"test{i:06d}"
-
-            user, created = User.objects.get_or_create(
-                mobile_number=mobile,
-                defaults={
-                    'username': f"{role}_{i}",
-                    'role': role,
-                    'is_mobile_verified': True,
-                    'is_active': True
-                }
-            )
-
-            users[f"{role}s"].append(user)
-
-            if created:
-                self.stdout.write(f'Created {role}: {mobile}')
-
-        return users
-
-    def create_test_bookings(self, users, count):
-        customers = users['customers']
-        if not customers:
-            return
-
-        addresses = [
-            'MG Road, Bangalore, Karnataka',
-            'Connaught Place, New Delhi',
-            'Marine Drive, Mumbai, Maharashtra'
-        ]
-
-        for i in range(count):
-            customer = random.choice(customers)
-            booking = Booking.objects.create(
-                customer=customer,
-                pickup_address=random.choice(addresses),
-                delivery_address=random.choice(addresses),
-                customer_phone=customer.mobile_number,
-                estimated_price=random.uniform(50, 500)
-            )
-
-            self.stdout.write(f'Created booking #{booking.id}')
+        synthetic = User.objects.filter(mobile_number__regex=MOBILE_REGEX)
+        ChatMessage.objects.filter(chat_room__booking__customer__in=synthetic).delete()
+        ChatRoom.objects.filter(booking__customer__in=synthetic).delete()
+        Booking.objects.filter(customer__in=synthetic).delete()
+        synthetic.delete()
@@ -0,0 +1,245 @@
+import csv
+import json
+import time
+from contextlib import contextmanager
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from apps.authentication.backends import forget_cached_users
+from apps.authentication.models import User
+from apps.booking.models import Booking, BookingStatusHistory
+from apps.common.rollups import BookingRollups
+from apps.common.user_lookup import UserLookup
+
+USER_UPDATE_FIELDS = ['role', 'first_name', 'last_name', 'email', 'is_mobile_verified', 'updated_at']
+USER_ROLES = {role for role, _ in User.ROLE_CHOICES}
+BOOKING_STATUSES = {status for status, _ in Booking.STATUS_CHOICES}
+
+
+def read_rows(path, file_format, reject):
+    """
+    Yield (row number, dict) per CSV row or JSONL line without loading the file.
+
+    CSV rows are numbered from 1 after the header, JSONL rows by file line.
+    Lines that are not a JSON object go to ``reject(number, reason)``.
+    """
+    with open(path, newline='', encoding='utf-8') as handle:
+        if file_format == 'csv':
+            yield from enumerate(csv.DictReader(handle), start=1)
+            return
+        for number, line in enumerate(handle, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                reject(number, f'invalid JSON ({e})')
+                continue
+            if not isinstance(row, dict):
+                reject(number, 'not a JSON object')
+                continue
+            yield number, row
+
+
+def parse_timestamp(value, default=None):
+    """Parse an ISO timestamp, treating naive values as local time"""
+    if not value:
+        return default
+    parsed = parse_datetime(value)
+    if parsed is None:
+        raise ValueError(f'Invalid timestamp: {value}')
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+@contextmanager
+def keep_supplied_timestamps(model):
+    """Let historic rows keep their own created_at/updated_at during bulk_create"""
+    fields = [f for f in model._meta.fields if getattr(f, 'auto_now', False) or getattr(f, 'auto_now_add', False)]
+    saved = [(f, f.auto_now, f.auto_now_add) for f in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class Command(BaseCommand):
+    help = 'Stream users or historic bookings from CSV/JSONL files into the database in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=['users', 'bookings'])
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help='Defaults to the file extension')
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or ('jsonl' if path.endswith(('.jsonl', '.json')) else 'csv')
+        import_batch = self.import_users if options['kind'] == 'users' else self.import_bookings
+
+        self.mobile_ids = {}
+        self.skipped = 0
+        total = 0
+        started = time.monotonic()
+
+        try:
+            rows = read_rows(path, file_format, self.reject)
+            for batch in batched(rows, options['batch_size']):
+                try:
+                    total += import_batch(batch)
+                except IntegrityError as e:
+                    # A conflicting row was written concurrently, after the batch was checked
+                    raise CommandError(f'Rows {batch[0][0]}-{batch[-1][0]} conflict with existing data: {e}')
+                elapsed = time.monotonic() - started
+                self.stdout.write(f'{total} rows imported ({total / elapsed:,.0f} rows/s)')
+        except (OSError, ValueError) as e:
+            raise CommandError(f'Import stopped after {total} rows: {e}')
+
+        if options['kind'] == 'users':
+            UserLookup.invalidate_filters()
+        else:
+            # Imported bookings keep their historic updated_at; the rollups pick them up by id
+            BookingRollups.refresh()
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {total} {options["kind"]} in {elapsed:.1f}s '
+            f'({total / elapsed if elapsed else total:,.0f} rows/s), skipped {self.skipped}'
+        ))
+
+    def reject(self, line, reason):
+        """Skip one input row and say why"""
+        self.skipped += 1
+        self.stderr.write(f'Row {line} skipped: {reason}')
+
+    def import_users(self, rows):
+        now = timezone.now()
+        # One unusable password per batch; hashing per row would dominate the import
+        unusable_password = make_password(None)
+        users = {}
+        lines = {}
+        usernames = {}
+        for line, row in rows:
+            mobile_number = (row.get('mobile_number') or '').strip()
+            if not mobile_number:
+                self.reject(line, 'no mobile_number')
+                continue
+            username = row.get('username') or mobile_number
+            role = row.get('role') or 'customer'
+            if role not in USER_ROLES:
+                self.reject(line, f'unknown role {role!r}')
+                continue
+
+            # Both columns are unique: the first row claiming a value keeps it
+            if mobile_number in users:
+                self.reject(line, f'mobile_number {mobile_number} repeats row {lines[mobile_number]}')
+                continue
+            if usernames.get(username, mobile_number) != mobile_number:
+                self.reject(line, f'username {username} repeats row {lines[usernames[username]]}')
+                continue
+
+            lines[mobile_number] = line
+            usernames[username] = mobile_number
+            users[mobile_number] = User(
+                mobile_number=mobile_number,
+                username=username,
+                role=role,
+                first_name=row.get('first_name') or '',
+                last_name=row.get('last_name') or '',
+                email=row.get('email') or '',
+                is_mobile_verified=str(row.get('is_mobile_verified', 'true')).lower() in ('1', 'true', 'yes'),
+                password=unusable_password,
+                date_joined=now,
+            )
+
+        # Existing users keep their username, so only other accounts' usernames conflict
+        for username, owner in User.objects.filter(username__in=usernames).values_list('username', 'mobile_number'):
+            mobile_number = usernames[username]
+            if owner != mobile_number:
+                self.reject(lines[mobile_number], f'username {username} belongs to {owner}')
+                del users[mobile_number]
+
+        User.objects.bulk_create(
+            users.values(),
+            update_conflicts=True,
+            unique_fields=['mobile_number'],
+            update_fields=USER_UPDATE_FIELDS,
+        )
+        UserLookup.bulk_changed(users.keys())
+        forget_cached_users(User.objects.filter(mobile_number__in=users.keys()).values_list('id', flat=True))
+        return len(users)
+
+    def resolve_mobiles(self, mobile_numbers):
+        """Fill the mobile -> id map for numbers not seen in earlier batches"""
+        missing = {m for m in mobile_numbers if m and m not in self.mobile_ids}
+        if missing:
+            self.mobile_ids.update(
+                User.objects.filter(mobile_number__in=missing).values_list('mobile_number', 'id')
+            )
+
+    def import_bookings(self, rows):
+        self.resolve_mobiles(
+            mobile for _, row in rows
+            for mobile in (row.get('customer_mobile'), row.get('delivery_partner_mobile'))
+        )
+
+        now = timezone.now()
+        bookings = []
+        for line, row in rows:
+            customer_id = self.mobile_ids.get(row.get('customer_mobile'))
+            if customer_id is None:
+                self.reject(line, f"unknown customer_mobile {row.get('customer_mobile')!r}")
+                continue
+
+            status = row.get('status') or 'delivered'
+            if status not in BOOKING_STATUSES:
+                self.reject(line, f'unknown status {status!r}')
+                continue
+
+            try:
+                created_at = parse_timestamp(row.get('created_at'), now)
+                booking = Booking(
+                    customer_id=customer_id,
+                    delivery_partner_id=self.mobile_ids.get(row.get('delivery_partner_mobile')),
+                    food_items=row.get('food_items', ''),
+                    pickup_address=row.get('pickup_address', ''),
+                    delivery_address=row.get('delivery_address', ''),
+                    phone_number=row.get('phone_number') or row['customer_mobile'],
+                    total_amount=Decimal(str(row.get('total_amount') or 0)),
+                    status=status,
+                    special_instructions=row.get('special_instructions') or None,
+                    created_at=created_at,
+                    updated_at=parse_timestamp(row.get('updated_at'), created_at),
+                    **{field: parse_timestamp(row.get(field)) for field in Booking.STAGE_TIMESTAMPS.values()},
+                )
+            except InvalidOperation:
+                self.reject(line, f"invalid total_amount {row.get('total_amount')!r}")
+                continue
+            except ValueError as e:
+                self.reject(line, str(e))
+                continue
+            booking.compute_stage_durations()
+            bookings.append(booking)
+
+        with keep_supplied_timestamps(Booking):
+            Booking.objects.bulk_create(bookings)
+        # Primary keys are only set where the backend returns them from bulk inserts
+        BookingStatusHistory.objects.bulk_create(
+            [entry for booking in bookings if booking.pk for entry in booking.stamped_history()]
+        )
+        return len(bookings)
@@ -0,0 +1,188 @@
+import asyncio
+import json
+import random
+import resource
+import time
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from django.test.utils import setup_databases, teardown_databases
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from apps.authentication.models import User
+from apps.booking.models import Booking
+from apps.chat.models import ChatRoom
+from apps.chat.routing import websocket_urlpatterns
+
+
+def rss_bytes():
+    """Current resident set size (peak RSS where /proc is unavailable)"""
+    try:
+        with open('/proc/self/statm') as handle:
+            return int(handle.read().split()[1]) * resource.getpagesize()
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = ('Open many in-process WebSocket chat clients against ChatConsumer and measure delivery '
+            'latency, drop rate and memory per connection at increasing message rates')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=1000, help='Connections; two per booking chat room')
+        parser.add_argument('--rates', type=float, nargs='+', default=[0.1, 0.5, 1.0],
+                            help='Messages per second per client; one run per rate')
+        parser.add_argument('--duration', type=float, default=10, help='Seconds each rate is sustained')
+        parser.add_argument('--layer', choices=['memory', 'configured'], default='memory',
+                            help="'memory' uses InMemoryChannelLayer; 'configured' uses CHANNEL_LAYERS (e.g. local Redis)")
+        parser.add_argument('--connect-batch', type=int, default=200)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        layers = {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}
+
+        old_config = setup_databases(verbosity=0, interactive=False, aliases={'default'})
+        try:
+            participants = self.seed(options['clients'])
+            if options['layer'] == 'memory':
+                with override_settings(CHANNEL_LAYERS=layers):
+                    asyncio.run(self.run(participants, options))
+            else:
+                asyncio.run(self.run(participants, options))
+        finally:
+            teardown_databases(old_config, verbosity=0)
+
+    def seed(self, clients):
+        """Create one booking and chat room per pair of clients; return (user, booking_id) per client"""
+        rooms = max(1, clients // 2)
+        password = make_password(None)
+        customers = User.objects.bulk_create([
+            User(mobile_number=f'94{i:08d}', username=f'94{i:08d}', role='customer', password=password)
+            for i in range(rooms)
+        ])
+        partners = User.objects.bulk_create([
+            User(mobile_number=f'95{i:08d}', username=f'95{i:08d}', role='delivery_partner', password=password)
+            for i in range(rooms)
+        ])
+        bookings = Booking.objects.bulk_create([
+            Booking(customer=customer, delivery_partner=partner, status='started', food_items='Load test order',
+                    pickup_address='1 Load Test Street', delivery_address='2 Load Test Street',
+                    phone_number=customer.mobile_number)
+            for customer, partner in zip(customers, partners)
+        ])
+        ChatRoom.objects.bulk_create([ChatRoom(booking=booking) for booking in bookings])
+
+        participants = []
+        for booking in bookings:
+            participants.append((booking.customer, booking.id))
+            participants.append((booking.delivery_partner, booking.id))
+        return participants[:clients]
+
+    async def connect_all(self, participants, batch_size):
+        """Return (participant, communicator) pairs for the clients that connected"""
+        application = URLRouter(websocket_urlpatterns)
+        connected = []
+        for start in range(0, len(participants), batch_size):
+            batch = []
+            for participant in participants[start:start + batch_size]:
+                user, booking_id = participant
+                communicator = WebsocketCommunicator(application, f'/ws/chat/{booking_id}/')
+                communicator.scope['user'] = user
+                batch.append((participant, communicator))
+            results = await asyncio.gather(*(c.connect(timeout=30) for _, c in batch))
+            # Keep each communicator with its own participant; failed connects leave gaps
+            connected.extend(pair for pair, (accepted, _) in zip(batch, results) if accepted)
+        return connected
+
+    async def run(self, participants, options):
+        rss_before = rss_bytes()
+        started = time.perf_counter()
+        connected = await self.connect_all(participants, options['connect_batch'])
+        communicators = [communicator for _, communicator in connected]
+        connect_seconds = time.perf_counter() - started
+        rss_delta = max(rss_bytes() - rss_before, 1)
+
+        members = {}
+        for (_, booking_id), _ in connected:
+            members[booking_id] = members.get(booking_id, 0) + 1
+
+        self.stdout.write(
+            f'{len(communicators)}/{len(participants)} clients connected in {connect_seconds:.1f}s; '
+            f'RSS +{rss_delta / 2 ** 20:.1f} MiB, about {len(communicators) / (rss_delta / 2 ** 30):,.0f} connections/GiB'
+        )
+
+        try:
+            for rate in options['rates']:
+                self.report(rate, len(connected), await self.run_rate(
+                    connected, members, rate, options['duration']
+                ))
+        finally:
+            await asyncio.gather(*(c.disconnect() for c in communicators), return_exceptions=True)
+
+    async def run_rate(self, connected, members, rate, duration):
+        latencies = []
+        stats = {'sent': 0, 'expected': 0, 'received': 0}
+        deadline = time.perf_counter() + duration
+        rng = self.rng
+
+        async def sender(index, participant, communicator):
+            booking_id = participant[1]
+            seq = 0
+            # Random start offset so clients don't send in lockstep
+            await asyncio.sleep(rng.uniform(0, 1 / rate))
+            while time.perf_counter() < deadline:
+                seq += 1
+                await communicator.send_to(text_data=json.dumps({
+                    'message': f'{index}:{seq}:{time.perf_counter()}',
+                }))
+                stats['sent'] += 1
+                stats['expected'] += members[booking_id]
+                await asyncio.sleep(min(rng.expovariate(rate), max(0, deadline - time.perf_counter())))
+
+        async def receiver(communicator):
+            # No short timeout here: a receive timeout cancels the communicator's application
+            while True:
+                raw = await communicator.receive_from(timeout=3600)
+                sent_at = float(json.loads(raw)['message'].rsplit(':', 1)[1])
+                latencies.append(time.perf_counter() - sent_at)
+                stats['received'] += 1
+
+        receivers = [asyncio.ensure_future(receiver(c)) for _, c in connected]
+        started = time.perf_counter()
+        await asyncio.gather(*(sender(i, p, c) for i, (p, c) in enumerate(connected)))
+        # Let in-flight messages drain until everything arrived or nothing moved for a second
+        received = -1
+        while stats['received'] != received and stats['received'] < stats['expected']:
+            received = stats['received']
+            await asyncio.sleep(1)
+        for task in receivers:
+            task.cancel()
+        await asyncio.gather(*receivers, return_exceptions=True)
+
+        stats.update({
+            'offered_rps': stats['sent'] / duration,
+            'delivered_rps': stats['received'] / (time.perf_counter() - started),
+            'drop_rate': 1 - stats['received'] / stats['expected'] if stats['expected'] else 0.0,
+            'p50_ms': percentile(latencies, 50) * 1000,
+            'p95_ms': percentile(latencies, 95) * 1000,
+            'p99_ms': percentile(latencies, 99) * 1000,
+            'max_ms': max(latencies, default=0) * 1000,
+        })
+        return stats
+
+    def report(self, rate, clients, stats):
+        line = (f"rate {rate:g}/s x {clients}: sent {stats['sent']} ({stats['offered_rps']:.0f} msg/s), "
+                f"delivered {stats['received']}/{stats['expected']} ({stats['delivered_rps']:.0f} msg/s), "
+                f"drops {stats['drop_rate']:.1%}, latency p50 {stats['p50_ms']:.1f} ms "
+                f"p95 {stats['p95_ms']:.1f} ms p99 {stats['p99_ms']:.1f} ms max {stats['max_ms']:.1f} ms")
+        saturated = stats['drop_rate'] > 0.01 or stats['p99_ms'] > 1000
+        self.stdout.write(self.style.ERROR(line + '  [saturated]') if saturated else line)
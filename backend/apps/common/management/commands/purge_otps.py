@@ -0,0 +1,46 @@
+import time
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from apps.authentication.models import OTP
+
+
+class Command(BaseCommand):
+    help = 'Delete old OTP rows in small chunks so the table is never locked for long'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than-minutes', type=int, default=60,
+                            help='Only delete rows created before this many minutes ago')
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Rows deleted per statement')
+        parser.add_argument('--sleep', type=float, default=0.05,
+                            help='Seconds to pause between chunks to let other writers through')
+        parser.add_argument('--dry-run', action='store_true', help='Only report how many rows would be deleted')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(minutes=options['older_than_minutes'])
+        queryset = OTP.objects.filter(created_at__lt=cutoff)
+
+        if options['dry_run']:
+            self.stdout.write(f'{queryset.count()} OTP rows older than {cutoff.isoformat()} would be deleted')
+            return
+
+        chunk_size = options['chunk_size']
+        total = 0
+        started = time.monotonic()
+
+        while True:
+            # Delete by primary key so each statement only touches one short range
+            ids = list(queryset.order_by('id').values_list('id', flat=True)[:chunk_size])
+            if not ids:
+                break
+
+            deleted, _ = OTP.objects.filter(id__in=ids).delete()
+            total += deleted
+            self.stdout.write(f'Deleted {total} rows...')
+
+            if len(ids) < chunk_size:
+                break
+            time.sleep(options['sleep'])
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(f'Purged {total} OTP rows in {elapsed:.1f}s'))
@@ -0,0 +1,19 @@
+import time
+from django.core.management.base import BaseCommand
+from apps.common.rollups import BookingRollups
+
+
+class Command(BaseCommand):
+    help = 'Fold bookings changed since the last run into the daily rollup tables (safe to re-run)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true',
+                            help='Rebuild every day from scratch, e.g. after bookings were deleted')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        summary = BookingRollups.refresh(full=options['full'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {summary['status_days']} status days and {summary['partner_days']} partner days "
+            f"in {time.monotonic() - started:.2f}s (watermark {summary['watermark']})"
+        ))
@@ -0,0 +1,43 @@
+from datetime import datetime, time, timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from apps.common.services import BookingSLAService
+
+STAGE_LABELS = {
+    'assign_seconds': 'created -> assigned',
+    'start_seconds': 'assigned -> started',
+    'reach_seconds': 'started -> reached',
+    'collect_seconds': 'reached -> collected',
+    'deliver_seconds': 'collected -> delivered',
+    'fulfil_seconds': 'assigned -> delivered',
+    'total_seconds': 'created -> delivered',
+}
+
+
+class Command(BaseCommand):
+    help = 'Median and p90 stage durations for bookings assigned or delivered in a period'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=7, help='Length of the period in days')
+        parser.add_argument('--until', help='Last day of the period, inclusive, YYYY-MM-DD (default: today)')
+        parser.add_argument('--cohort', choices=['assigned', 'delivered'], default='delivered',
+                            help='Which bookings to measure: those assigned or those delivered in the period')
+
+    def handle(self, *args, **options):
+        until = timezone.localdate()
+        if options['until']:
+            try:
+                until = datetime.strptime(options['until'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError('--until must be YYYY-MM-DD')
+        # --until is inclusive: the period ends at the following midnight
+        end = timezone.make_aware(datetime.combine(until + timedelta(days=1), time.min))
+        start = end - timedelta(days=options['days'])
+
+        stats = BookingSLAService.stage_stats(start, end, cohort=f"{options['cohort']}_at")
+        self.stdout.write(f"Bookings {options['cohort']} {start:%Y-%m-%d} to {until:%Y-%m-%d} (minutes):")
+        self.stdout.write(f"  {'stage':<24}{'count':>8}{'median':>10}{'p90':>10}")
+        for field, label in STAGE_LABELS.items():
+            row = stats[field]
+            median, p90 = (f'{row[name] / 60:.1f}' if row[name] is not None else '-' for name in ('median', 'p90'))
+            self.stdout.write(f"  {label:<24}{row['count']:>8}{median:>10}{p90:>10}")
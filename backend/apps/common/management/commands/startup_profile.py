@@ -0,0 +1,171 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+MARKER = 'STARTUP_PROFILE '
+
+# Runs in a fresh interpreter under -X importtime: load the worker application,
+# then time two GET requests through it (cold, then warm)
+PROBE = r'''
+import asyncio, json, sys, time
+probe_started = time.time()
+kind, path = sys.argv[1], sys.argv[2]
+
+
+def wsgi_request(app):
+    from wsgiref.util import setup_testing_defaults
+    environ = {'PATH_INFO': path, 'REQUEST_METHOD': 'GET'}
+    setup_testing_defaults(environ)
+    status = []
+    body = app(environ, lambda s, headers, exc_info=None: status.append(s))
+    try:
+        for _ in body:
+            pass
+    finally:
+        getattr(body, 'close', lambda: None)()
+    return int(status[0].split()[0])
+
+
+async def asgi_request(app):
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+        'path': path, 'raw_path': path.encode(), 'query_string': b'', 'root_path': '',
+        'headers': [(b'host', b'localhost')], 'client': ('127.0.0.1', 0), 'server': ('localhost', 80),
+    }
+    sent = []
+    body_sent = False
+
+    async def receive():
+        nonlocal body_sent
+        if not body_sent:
+            body_sent = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        await asyncio.Future()
+
+    async def send(message):
+        sent.append(message)
+
+    await app(scope, receive, send)
+    return sent[0]['status']
+
+
+def timed(request):
+    started = time.perf_counter()
+    status = request()
+    return status, (time.perf_counter() - started) * 1000
+
+
+started = time.perf_counter()
+if kind == 'asgi':
+    from food_delivery.asgi import application
+    request = lambda: asyncio.run(asgi_request(application))
+else:
+    from food_delivery.wsgi import application
+    request = lambda: wsgi_request(application)
+load_ms = (time.perf_counter() - started) * 1000
+status, first_ms = timed(request)
+_, second_ms = timed(request)
+print('STARTUP_PROFILE ' + json.dumps({
+    'probe_started': probe_started, 'load_ms': load_ms, 'first_request_ms': first_ms,
+    'second_request_ms': second_ms, 'status': status,
+}))
+'''
+
+
+def parse_importtime(stderr):
+    """Build the import tree from -X importtime output (children are listed before their parent)"""
+    pending = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        level = (len(name) - len(name.lstrip())) // 2
+        node = {'module': name.strip(), 'self_ms': int(self_us) / 1000, 'cumulative_ms': int(cumulative_us) / 1000,
+                'level': level, 'children': []}
+        while pending and pending[-1]['level'] > level:
+            node['children'].insert(0, pending.pop())
+        pending.append(node)
+    return pending
+
+
+def flatten(nodes):
+    for node in nodes:
+        yield node
+        yield from flatten(node['children'])
+
+
+class Command(BaseCommand):
+    help = ('Measure worker cold start in fresh interpreters: import-time tree, application load and '
+            'time to first request')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--app', choices=['asgi', 'wsgi'], default='asgi')
+        parser.add_argument('--path', default='/auth/login/', help='URL requested as the first request')
+        parser.add_argument('--runs', type=int, default=3, help='Fresh interpreters to start; medians are reported')
+        parser.add_argument('--min-ms', type=float, default=5, help='Hide imports cheaper than this (cumulative)')
+        parser.add_argument('--depth', type=int, default=4, help='Levels of the import tree to show')
+        parser.add_argument('--output', help='Write the measurements as JSON for tracking boot time over time')
+
+    def handle(self, *args, **options):
+        runs = [self.run_probe(options['app'], options['path']) for _ in range(options['runs'])]
+        metrics = ['interpreter_ms', 'load_ms', 'first_request_ms', 'second_request_ms', 'time_to_first_request_ms']
+        median = {name: round(statistics.median(run[name] for run in runs), 1) for name in metrics}
+
+        # Show the tree of the run closest to the median time to first request
+        typical = min(runs, key=lambda run: abs(run['time_to_first_request_ms'] - median['time_to_first_request_ms']))
+        self.stdout.write(f"Import tree ({options['app']}, imports >= {options['min_ms']:g} ms cumulative):")
+        self.print_tree(typical['imports'], options['min_ms'], options['depth'])
+
+        self.stdout.write('')
+        self.stdout.write(f"Median of {len(runs)} runs, first request GET {options['path']} -> {typical['status']}:")
+        self.stdout.write(f"  interpreter start      {median['interpreter_ms']:8.1f} ms")
+        self.stdout.write(f"  application load       {median['load_ms']:8.1f} ms")
+        self.stdout.write(f"  first request          {median['first_request_ms']:8.1f} ms")
+        self.stdout.write(f"  second request (warm)  {median['second_request_ms']:8.1f} ms")
+        self.stdout.write(self.style.SUCCESS(f"  time to first request  {median['time_to_first_request_ms']:8.1f} ms"))
+
+        if options['output']:
+            slowest = sorted(flatten(typical['imports']), key=lambda node: node['self_ms'], reverse=True)[:25]
+            with open(options['output'], 'w') as handle:
+                json.dump({
+                    'app': options['app'],
+                    'path': options['path'],
+                    'settings': os.environ.get('DJANGO_SETTINGS_MODULE'),
+                    'median': median,
+                    'runs': [{name: round(run[name], 1) for name in metrics} for run in runs],
+                    'slowest_imports': [{'module': n['module'], 'self_ms': n['self_ms'],
+                                         'cumulative_ms': n['cumulative_ms']} for n in slowest],
+                }, handle, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+
+    def run_probe(self, app, path):
+        spawned = time.time()
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', PROBE, app, path],
+            cwd=settings.BASE_DIR, env=os.environ.copy(), capture_output=True, text=True,
+        )
+        finished = time.time()
+        lines = [line for line in result.stdout.splitlines() if line.startswith(MARKER)]
+        if result.returncode or not lines:
+            raise CommandError(f'Startup probe failed:\n{result.stderr[-3000:]}')
+
+        run = json.loads(lines[-1][len(MARKER):])
+        run['interpreter_ms'] = (run.pop('probe_started') - spawned) * 1000
+        run['time_to_first_request_ms'] = run['interpreter_ms'] + run['load_ms'] + run['first_request_ms']
+        run['wall_ms'] = (finished - spawned) * 1000
+        run['imports'] = parse_importtime(result.stderr)
+        return run
+
+    def print_tree(self, nodes, min_ms, depth, indent=0):
+        for node in sorted(nodes, key=lambda node: node['cumulative_ms'], reverse=True):
+            if node['cumulative_ms'] < min_ms:
+                continue
+            self.stdout.write(f"  {node['cumulative_ms']:8.1f} ms {node['self_ms']:7.1f} self  "
+                              f"{'  ' * indent}{node['module']}")
+            if indent + 1 < depth:
+                self.print_tree(node['children'], min_ms, depth, indent + 1)
@@ -0,0 +1,207 @@
+# In-process request metrics exported in Prometheus text format
+
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+# Per-request counters; a ContextVar follows the request across threads under ASGI
+_current = ContextVar('request_metrics', default=None)
+
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class RequestStats:
+    __slots__ = ('sql_count', 'sql_time', 'template_time')
+
+    def __init__(self):
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+
+
+class Histogram:
+    """Cumulative-bucket histogram, the shape Prometheus expects"""
+
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """
+    Histograms and counters keyed by metric name and label values.
+
+    Each worker process keeps its own registry; Prometheus should scrape
+    every worker (or the values are per-process samples).
+    """
+
+    HISTOGRAMS = {
+        'http_request_duration_seconds': ('Request duration', DURATION_BUCKETS),
+        'http_request_sql_queries': ('SQL queries per request', QUERY_COUNT_BUCKETS),
+        'http_request_sql_seconds': ('Time spent in SQL per request', DURATION_BUCKETS),
+        'http_request_template_seconds': ('Template render time per request', DURATION_BUCKETS),
+    }
+    COUNTERS = {
+        'http_requests_total': 'Requests by view, method and status',
+    }
+
+    _lock = threading.Lock()
+    _histograms = {}
+    _counters = {}
+
+    @classmethod
+    def observe(cls, name, labels, value):
+        key = (name, labels)
+        with cls._lock:
+            histogram = cls._histograms.get(key)
+            if histogram is None:
+                histogram = cls._histograms[key] = Histogram(cls.HISTOGRAMS[name][1])
+            histogram.observe(value)
+
+    @classmethod
+    def increment(cls, name, labels, amount=1):
+        key = (name, labels)
+        with cls._lock:
+            cls._counters[key] = cls._counters.get(key, 0) + amount
+
+    @classmethod
+    def reset(cls):
+        with cls._lock:
+            cls._histograms = {}
+            cls._counters = {}
+
+    @staticmethod
+    def _format_labels(labels, extra=()):
+        pairs = list(labels) + list(extra)
+        if not pairs:
+            return ''
+        escaped = (f'{name}="{_escape_label(value)}"' for name, value in pairs)
+        return '{' + ','.join(escaped) + '}'
+
+    @classmethod
+    def render(cls):
+        """Return every metric in the Prometheus text exposition format"""
+        with cls._lock:
+            histograms = {key: (list(h.counts), h.sum, h.count, h.buckets) for key, h in cls._histograms.items()}
+            counters = dict(cls._counters)
+
+        lines = []
+        for name, help_text in cls.COUNTERS.items():
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+            for (metric, labels), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(f'{name}{cls._format_labels(labels)} {value}')
+
+        for name, (help_text, _) in cls.HISTOGRAMS.items():
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+            for (metric, labels), (counts, total, count, buckets) in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, bucket_count in zip(buckets, counts):
+                    cumulative += bucket_count
+                    lines.append(f'{name}_bucket{cls._format_labels(labels, [("le", bound)])} {cumulative}')
+                lines.append(f'{name}_bucket{cls._format_labels(labels, [("le", "+Inf")])} {count}')
+                lines.append(f'{name}_sum{cls._format_labels(labels)} {total}')
+                lines.append(f'{name}_count{cls._format_labels(labels)} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+def sql_execute_wrapper(execute, sql, params, many, context):
+    """Connection execute wrapper counting queries and SQL time for the current request"""
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.sql_time += time.perf_counter() - started
+        stats.sql_count += 1
+
+
+def install_execute_wrapper(sender, connection, **kwargs):
+    """connection_created receiver: attach the SQL wrapper to every new connection"""
+    if sql_execute_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(sql_execute_wrapper)
+
+
+class MetricsMiddleware:
+    """
+    Records duration, SQL count, SQL time and template render time per
+    URL name. Works as sync or async middleware, so it runs natively under
+    both WSGI and ASGI. Template time covers TemplateResponse rendering
+    (class-based views); views calling ``render()`` count it as view time.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats = RequestStats()
+        token = _current.set(stats)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.record(request, response, stats, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        stats = RequestStats()
+        token = _current.set(stats)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.record(request, response, stats, time.perf_counter() - started)
+        return response
+
+    def process_template_response(self, request, response):
+        stats = _current.get()
+        if stats is not None:
+            # Rendering happens right after template response middleware
+            started = time.perf_counter()
+
+            def measure(rendered):
+                stats.template_time += time.perf_counter() - started
+
+            response.add_post_render_callback(measure)
+        return response
+
+    @staticmethod
+    def record(request, response, stats, duration):
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else 'unmatched'
+        labels = (('view', view), ('method', request.method))
+
+        MetricsRegistry.increment('http_requests_total', labels + (('status', response.status_code),))
+        MetricsRegistry.observe('http_request_duration_seconds', labels, duration)
+        MetricsRegistry.observe('http_request_sql_queries', labels, stats.sql_count)
+        MetricsRegistry.observe('http_request_sql_seconds', labels, stats.sql_time)
+        MetricsRegistry.observe('http_request_template_seconds', labels, stats.template_time)
@@ -0,0 +1,136 @@
+# Response middleware shared by all apps
+
+import random
+import secrets
+import string
+from gzip import GzipFile
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.text import StreamingBuffer, compress_string
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is optional
+    brotli = None
+
+COMPRESSIBLE_TYPES = ('application/json', 'text/csv')
+
+
+def accepted_encodings(request):
+    """Parse Accept-Encoding into {coding: q}"""
+    accepted = {}
+    for part in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        coding, _, params = part.strip().partition(';')
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[coding.strip().lower()] = q
+    return accepted
+
+
+class _GzipCompressor:
+    """
+    Incremental gzip with brotli.Compressor's process()/finish() interface.
+
+    Like Django's gzip helpers, the header carries a random-length file name
+    (up to ``max_random_bytes``) to mitigate BREACH.
+    """
+
+    def __init__(self, max_random_bytes):
+        filename = ''.join(random.choices(string.ascii_letters, k=secrets.randbelow(max_random_bytes)))
+        self.buffer = StreamingBuffer()
+        self.file = GzipFile(filename=filename, mode='wb', compresslevel=6, fileobj=self.buffer, mtime=0)
+
+    def process(self, data):
+        self.file.write(data)
+        return self.buffer.read()
+
+    def finish(self):
+        self.file.close()
+        return self.buffer.read()
+
+
+def _compress_sequence(sequence, compressor):
+    for item in sequence:
+        data = compressor.process(item)
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+async def _acompress_sequence(sequence, compressor):
+    async for item in sequence:
+        data = compressor.process(item)
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Compress JSON and CSV API responses with brotli or gzip.
+
+    The client's Accept-Encoding picks the coding (brotli only when the
+    ``brotli`` package is installed). Responses smaller than
+    ``COMPRESSION_MIN_BYTES`` are left alone; streaming responses, sync or
+    async, are compressed chunk by chunk as they are sent.
+    """
+
+    max_random_bytes = 100
+
+    def choose_encoding(self, request):
+        accepted = accepted_encodings(request)
+        if brotli is not None and accepted.get('br', 0) > 0:
+            return 'br'
+        if accepted.get('gzip', 0) > 0:
+            return 'gzip'
+        return None
+
+    def process_response(self, request, response):
+        content_type = response.get('Content-Type', '').split(';')[0].strip()
+        if content_type not in COMPRESSIBLE_TYPES or response.has_header('Content-Encoding'):
+            return response
+
+        min_bytes = settings.APP_SETTINGS.get('COMPRESSION_MIN_BYTES', 1024)
+        if not response.streaming and len(response.content) < min_bytes:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = self.choose_encoding(request)
+        if encoding is None:
+            return response
+
+        quality = settings.APP_SETTINGS.get('BROTLI_QUALITY', 5)
+        if response.streaming:
+            if encoding == 'br':
+                compressor = brotli.Compressor(quality=quality)
+            else:
+                compressor = _GzipCompressor(self.max_random_bytes)
+            # Async iterators (ASGI streaming) are wrapped with an async generator
+            if response.is_async:
+                response.streaming_content = _acompress_sequence(response.streaming_content, compressor)
+            else:
+                response.streaming_content = _compress_sequence(response.streaming_content, compressor)
+            del response.headers['Content-Length']
+        else:
+            if encoding == 'br':
+                compressed = brotli.compress(response.content, quality=quality)
+            else:
+                compressed = compress_string(response.content, max_random_bytes=self.max_random_bytes)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers['Content-Length'] = str(len(compressed))
+
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = encoding
+        return response
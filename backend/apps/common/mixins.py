@@ -6,7 +6,13 @@ from django.views.generic import View
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
 from django.contrib.auth import get_user_model
+from django.contrib.messages import get_messages
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
 from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
 from .utils import ResponseHandler, PermissionUtils, ValidationUtils, parse_json_safely, log_user_activity
 
 User = get_user_model()
@@ -48,6 +54,38 @@ class BookingAccessMixin:
         except Booking.DoesNotExist:
             return None, ResponseHandler.error("Booking not found", status=404)
 
+class ConditionalGetMixin:
+    """
+    Answer GET with 304 Not Modified when the client's copy is current.
+
+    Views implement ``get_validators()`` returning ``(etag, last_modified)``
+    (either may be None) from one cheap query; it runs before any queryset
+    or template work. Requests with pending flash messages always render.
+    """
+
+    def get_validators(self):
+        raise NotImplementedError
+
+    def get(self, request, *args, **kwargs):
+        if len(get_messages(request)):
+            return super().get(request, *args, **kwargs)
+
+        etag, last_modified = self.get_validators()
+        etag = quote_etag(etag) if etag else None
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+
+        response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+
+        if etag:
+            response['ETag'] = etag
+        if timestamp is not None:
+            response['Last-Modified'] = http_date(timestamp)
+        # Let browsers keep the page but check back every time
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
 @method_decorator(csrf_exempt, name='dispatch')
 class BaseAPIView(JSONResponseMixin, LoginRequiredMixin, View):
     """Base API view with common functionality"""
@@ -59,9 +97,9 @@ class BaseAPIView(JSONResponseMixin, LoginRequiredMixin, View):
         except Exception as e:
             return None
 
-    def log_activity(self, action, details=None):
+    def log_activity(self, action, details=None, event=None):
         """Log user activity"""
-        log_user_activity(self.request.user, action, details)
+        log_user_activity(self.request.user, action, details, event=event)
 
 class CustomerRequiredView(RoleRequiredMixin, BaseAPIView):
     """Base view for customer-only endpoints"""
@@ -155,8 +193,11 @@ class QueryUtils:
 
     @staticmethod
     def get_available_delivery_partners():
-        """Get all available delivery partners"""
+        """Get active delivery partners that are currently connected"""
+        from .presence import PresenceRegistry
+
         return User.objects.filter(
+            id__in=PresenceRegistry.online_partner_ids(),
             role='delivery_partner',
             is_active=True
         )
@@ -170,21 +211,99 @@ class QueryUtils:
             status='start'
         )
 
+class LazyValue:
+    """
+    A template value computed on first access and then reused.
+
+    Django templates call callables when resolving a variable, so a page
+    that never mentions the value never computes it.
+    """
+
+    def __init__(self, func):
+        self.func = func
+        self.computed = False
+        self.value = None
+
+    def __call__(self):
+        if not self.computed:
+            self.value = self.func()
+            self.computed = True
+        return self.value
+
+    def __str__(self):
+        return str(self())
+
+
+class UserContextValues:
+    """Per-user values shown in page chrome, cached briefly (APP_CONTEXT_CACHE_TTL)"""
+
+    KEY_PREFIX = 'app_context'
+
+    @classmethod
+    def _cached(cls, user, name, compute):
+        key = f'{cls.KEY_PREFIX}:{user.pk}:{name}'
+        return cache.get_or_set(key, compute, timeout=settings.APP_SETTINGS.get('APP_CONTEXT_CACHE_TTL', 15))
+
+    @classmethod
+    def unread_messages_count(cls, user):
+        """Unread chat messages from the other participant across the user's bookings"""
+        from apps.chat.models import ChatMessage
+
+        def compute():
+            return ChatMessage.objects.filter(
+                Q(chat_room__booking__customer=user) | Q(chat_room__booking__delivery_partner=user),
+                is_read=False,
+            ).exclude(sender=user).count()
+        return cls._cached(user, 'unread', compute)
+
+    @classmethod
+    def pending_assignments_count(cls, user):
+        """Admins: bookings waiting for a partner; partners: assigned bookings not yet started"""
+        from apps.booking.models import Booking
+
+        if user.role == 'admin':
+            query = Booking.objects.filter(status='pending', delivery_partner__isnull=True)
+        elif user.role == 'delivery_partner':
+            query = Booking.objects.filter(status='assigned', delivery_partner=user)
+        else:
+            return 0
+        return cls._cached(user, 'pending', query.count)
+
+    @staticmethod
+    def partner_online(user):
+        from .presence import PresenceRegistry
+        return user.role == 'delivery_partner' and PresenceRegistry.is_online(user.pk)
+
+
 # Context processors for templates
 def app_context(request):
-    """Add common context data to all templates"""
+    """
+    Add common context data to all templates.
+
+    Anything that needs a query or cache read is a LazyValue, memoized on the
+    request so several renders in one request share it.
+    """
+    user = request.user
+    memo = getattr(request, '_app_context', None)
+    if memo is not None and memo[0] == user.pk:
+        return memo[1]
+
+    now = timezone.now()
     context = {
         'app_name': 'Food Delivery',
         'app_version': '1.0.0',
-        'current_year': timezone.now().year,
-        'timestamp': int(timezone.now().timestamp()),
+        'current_year': now.year,
+        'timestamp': int(now.timestamp()),
     }
 
-    if request.user.is_authenticated:
+    if user.is_authenticated:
         context.update({
-            'user_role': request.user.role,
-            'user_display_name': request.user.mobile_number,
-            'unread_messages_count': 0,  # Can be implemented later
+            'user_role': user.role,
+            'user_display_name': user.mobile_number,
+            'unread_messages_count': LazyValue(lambda: UserContextValues.unread_messages_count(user)),
+            'pending_assignments_count': LazyValue(lambda: UserContextValues.pending_assignments_count(user)),
+            'partner_online': LazyValue(lambda: UserContextValues.partner_online(user)),
         })
 
+    request._app_context = (user.pk, context)
     return context
@@ -0,0 +1,130 @@
+# Pluggable OTP storage with a cache-backed default
+
+import atexit
+import threading
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.module_loading import import_string
+
+
+class OTPAuditBuffer:
+    """Collects OTP audit rows and writes them to the OTP table in batches"""
+
+    _lock = threading.Lock()
+    _pending = []
+    _last_flush = time.monotonic()
+
+    @classmethod
+    def add(cls, mobile_number, otp_code, is_verified=False):
+        from apps.authentication.models import OTP
+
+        config = settings.APP_SETTINGS
+        with cls._lock:
+            cls._pending.append(OTP(
+                mobile_number=mobile_number,
+                otp_code=otp_code,
+                is_verified=is_verified
+            ))
+            due = (len(cls._pending) >= config.get('OTP_AUDIT_BATCH_SIZE', 100) or
+                   time.monotonic() - cls._last_flush >= config.get('OTP_AUDIT_FLUSH_SECONDS', 10))
+        if due:
+            cls.flush()
+
+    @classmethod
+    def flush(cls):
+        with cls._lock:
+            batch, cls._pending = cls._pending, []
+            cls._last_flush = time.monotonic()
+        if batch:
+            from apps.authentication.models import OTP
+            OTP.objects.bulk_create(batch)
+
+
+atexit.register(OTPAuditBuffer.flush)
+
+
+class BaseOTPStore:
+    """Interface for OTP storage backends"""
+
+    def __init__(self):
+        config = settings.APP_SETTINGS
+        self.expiry_seconds = config.get('OTP_EXPIRY_MINUTES', 10) * 60
+        self.audit = config.get('OTP_AUDIT_TO_DB', False)
+
+    def issue(self, mobile_number, otp_code):
+        """Store a fresh OTP, replacing any outstanding one"""
+        raise NotImplementedError
+
+    def verify_and_consume(self, mobile_number, otp_code):
+        """Return True exactly once for a matching, unexpired OTP"""
+        raise NotImplementedError
+
+    def _audit(self, mobile_number, otp_code, is_verified=False):
+        if self.audit:
+            OTPAuditBuffer.add(mobile_number, otp_code, is_verified)
+
+
+class CacheOTPStore(BaseOTPStore):
+    """
+    Keeps one OTP per mobile number in the cache with a native TTL.
+
+    Verification is made single-use by the delete: only the caller whose
+    ``cache.delete`` actually removed the key gets a successful result, so two
+    concurrent verifications of the same code cannot both log in.
+    """
+
+    @staticmethod
+    def _key(mobile_number):
+        return f'otp:{mobile_number}'
+
+    def issue(self, mobile_number, otp_code):
+        cache.set(self._key(mobile_number), otp_code, timeout=self.expiry_seconds)
+        self._audit(mobile_number, otp_code)
+
+    def verify_and_consume(self, mobile_number, otp_code):
+        key = self._key(mobile_number)
+        if cache.get(key) != otp_code:
+            return False
+        if not cache.delete(key):
+            return False
+        self._audit(mobile_number, otp_code, is_verified=True)
+        return True
+
+
+class DatabaseOTPStore(BaseOTPStore):
+    """Legacy storage in the OTP table, kept for deployments without a shared cache"""
+
+    def issue(self, mobile_number, otp_code):
+        from apps.authentication.models import OTP
+        OTP.objects.create(mobile_number=mobile_number, otp_code=otp_code)
+
+    def verify_and_consume(self, mobile_number, otp_code):
+        from datetime import timedelta
+        from django.utils import timezone
+        from apps.authentication.models import OTP
+
+        cutoff = timezone.now() - timedelta(seconds=self.expiry_seconds)
+        latest = OTP.objects.filter(
+            mobile_number=mobile_number,
+            created_at__gte=cutoff,
+            is_verified=False
+        ).order_by('-created_at').values_list('id', 'otp_code').first()
+
+        if not latest or latest[1] != otp_code:
+            return False
+
+        # The conditional update is the consume step; a concurrent verify updates 0 rows
+        return OTP.objects.filter(id=latest[0], is_verified=False).update(is_verified=True) == 1
+
+
+_store = None
+
+
+def get_otp_store():
+    """Return the configured OTP store (APP_SETTINGS['OTP_STORE_BACKEND'])"""
+    global _store
+    if _store is None:
+        backend = settings.APP_SETTINGS.get('OTP_STORE_BACKEND', 'apps.common.otp.CacheOTPStore')
+        _store = import_string(backend)()
+    return _store
@@ -0,0 +1,134 @@
+# Delivery partner presence registry backed by the shared cache
+
+import threading
+import time
+from django.conf import settings
+from django.core.cache import cache
+from .redis_client import get_redis_client
+
+
+class PresenceRegistry:
+    """
+    Tracks which delivery partners currently hold a live WebSocket connection.
+
+    Each heartbeat refreshes a per-partner key whose cache TTL is the presence
+    window, so "is partner X online" is a single cache read and eviction is
+    handled by the cache itself. For "who is online" the registry also keeps a
+    roster of partner id -> last seen timestamp: a Redis sorted set, updated
+    with atomic ZADD/ZREM, or a process-local dict under a lock when the cache
+    is not Redis (such caches are not shared between processes anyway). A
+    partner is only re-announced to the roster every half window, so steady
+    heartbeats cost one cache write and one ``add`` each.
+
+    Partners may hold several sockets at once; a per-partner connection count
+    keeps them online until the last one closes.
+    """
+
+    KEY_PREFIX = 'presence'
+    ROSTER_KEY = f'{KEY_PREFIX}:roster'
+
+    _lock = threading.Lock()
+
+    @staticmethod
+    def ttl():
+        """Seconds a heartbeat keeps a partner online"""
+        return settings.APP_SETTINGS.get('PRESENCE_TTL_SECONDS', 30)
+
+    @classmethod
+    def _partner_key(cls, partner_id):
+        return f'{cls.KEY_PREFIX}:partner:{partner_id}'
+
+    @classmethod
+    def _announce_key(cls, partner_id):
+        return f'{cls.KEY_PREFIX}:announced:{partner_id}'
+
+    @classmethod
+    def _connections_key(cls, partner_id):
+        return f'{cls.KEY_PREFIX}:connections:{partner_id}'
+
+    @classmethod
+    def _update_roster(cls, partner_id, last_seen=None):
+        """Add, refresh or (with last_seen=None) remove a partner in the roster"""
+        ttl = cls.ttl()
+        client = get_redis_client()
+        if client is not None:
+            key = cache.make_key(cls.ROSTER_KEY)
+            pipeline = client.pipeline()
+            if last_seen is None:
+                pipeline.zrem(key, int(partner_id))
+            else:
+                pipeline.zadd(key, {int(partner_id): last_seen})
+            pipeline.zremrangebyscore(key, '-inf', time.time() - ttl)
+            pipeline.expire(key, ttl * 2)
+            pipeline.execute()
+            return
+
+        with cls._lock:
+            now = time.time()
+            roster = cache.get(cls.ROSTER_KEY) or {}
+            roster = {pid: seen for pid, seen in roster.items() if seen + ttl > now}
+            if last_seen is None:
+                roster.pop(int(partner_id), None)
+            else:
+                roster[int(partner_id)] = last_seen
+            cache.set(cls.ROSTER_KEY, roster, timeout=ttl * 2)
+
+    @classmethod
+    def connect(cls, partner_id):
+        """Count a new connection for a partner and mark them online"""
+        key = cls._connections_key(partner_id)
+        cache.add(key, 0, timeout=cls.ttl() * 2)
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Expired between add and incr
+            cache.add(key, 1, timeout=cls.ttl() * 2)
+        cls.heartbeat(partner_id)
+
+    @classmethod
+    def disconnect(cls, partner_id):
+        """Drop one connection; the partner goes offline when it was the last"""
+        key = cls._connections_key(partner_id)
+        try:
+            remaining = cache.decr(key)
+        except ValueError:
+            remaining = 0
+        if remaining <= 0:
+            cache.delete(key)
+            cls.mark_offline(partner_id)
+
+    @classmethod
+    def heartbeat(cls, partner_id):
+        """Mark a partner as online for the next presence window"""
+        ttl = cls.ttl()
+        now = time.time()
+        cache.set(cls._partner_key(partner_id), now, timeout=ttl)
+        # Connection counts live as long as their sockets keep heartbeating
+        cache.touch(cls._connections_key(partner_id), timeout=ttl * 2)
+
+        # Only touch the shared roster once per half window per partner
+        if cache.add(cls._announce_key(partner_id), 1, timeout=max(ttl // 2, 1)):
+            cls._update_roster(partner_id, now)
+
+    @classmethod
+    def mark_offline(cls, partner_id):
+        """Remove a partner immediately, whatever connections they hold"""
+        cache.delete_many([cls._partner_key(partner_id), cls._announce_key(partner_id)])
+        cls._update_roster(partner_id)
+
+    @classmethod
+    def is_online(cls, partner_id):
+        """Check whether a partner has sent a heartbeat within the window"""
+        return cache.get(cls._partner_key(partner_id)) is not None
+
+    @classmethod
+    def online_partner_ids(cls):
+        """Return the set of partner ids seen within the presence window"""
+        cutoff = time.time() - cls.ttl()
+        client = get_redis_client()
+        if client is not None:
+            members = client.zrangebyscore(cache.make_key(cls.ROSTER_KEY), f'({cutoff}', '+inf')
+            return {int(member) for member in members}
+
+        roster = cache.get(cls.ROSTER_KEY) or {}
+        return {pid for pid, seen in roster.items() if seen > cutoff}
@@ -0,0 +1,146 @@
+# Query budgets and N+1 detection per request
+
+import logging
+import re
+import traceback
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from .exceptions import QueryBudgetExceeded
+
+logger = logging.getLogger(__name__)
+
+_current = ContextVar('query_inspection', default=None)
+
+TRANSACTION_STATEMENTS = ('BEGIN', 'COMMIT', 'ROLLBACK', 'SAVEPOINT', 'RELEASE')
+_IN_LIST = re.compile(r'IN \((?:%s, )*%s\)')
+_NUMBER = re.compile(r'\b\d+\b')
+_STRING = re.compile(r"'(?:[^']|'')*'")
+
+
+def normalize_sql(sql):
+    """Reduce a statement to its shape: literals and IN-list lengths removed"""
+    sql = _IN_LIST.sub('IN (...)', sql)
+    sql = _STRING.sub('?', sql)
+    return _NUMBER.sub('?', sql)
+
+
+class QueryLog:
+    """Queries seen during one request, grouped by shape"""
+
+    def __init__(self, repeat_threshold):
+        self.repeat_threshold = repeat_threshold
+        self.count = 0
+        self.shapes = {}
+        self.stacks = {}
+
+    def add(self, sql):
+        if sql.lstrip().upper().startswith(TRANSACTION_STATEMENTS):
+            return
+        self.count += 1
+        shape = normalize_sql(sql)
+        seen = self.shapes.get(shape, 0) + 1
+        self.shapes[shape] = seen
+        if seen == self.repeat_threshold:
+            # Keep one stack per repeated shape to show where the loop is
+            self.stacks[shape] = ''.join(traceback.format_stack(limit=25)[:-3])
+
+    def repeated(self):
+        return {shape: count for shape, count in self.shapes.items() if count >= self.repeat_threshold}
+
+
+def inspection_execute_wrapper(execute, sql, params, many, context):
+    """Connection execute wrapper feeding the current request's QueryLog"""
+    log = _current.get()
+    if log is not None:
+        log.add(sql)
+    return execute(sql, params, many, context)
+
+
+def install_execute_wrapper(sender, connection, **kwargs):
+    """connection_created receiver: attach the inspection wrapper to every new connection"""
+    if inspection_execute_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(inspection_execute_wrapper)
+
+
+def view_budget(request):
+    """Budget declared by the resolved view: ``decorators.query_budget`` or a CBV ``query_budget`` attribute"""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return None
+    func = match.func
+    view_class = getattr(func, 'view_class', None)
+    if view_class is not None:
+        return getattr(view_class, 'query_budget', None)
+    return getattr(func, 'query_budget', None)
+
+
+class QueryInspectionMiddleware:
+    """
+    Enforces query budgets and flags N+1 patterns.
+
+    A shape repeated ``QUERY_REPEAT_THRESHOLD`` times in one request, or a
+    query count above the view's budget, is a violation. With
+    QUERY_INSPECTION='raise' (the default under ``manage.py test``) the
+    request raises QueryBudgetExceeded; with 'log' (staging) it is logged
+    with the stack of the repeated query. 'off' skips inspection entirely.
+    Works as sync or async middleware, like MetricsMiddleware ahead of it.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        mode = settings.APP_SETTINGS.get('QUERY_INSPECTION', 'off')
+        if mode == 'off':
+            return self.get_response(request)
+
+        log = QueryLog(settings.APP_SETTINGS.get('QUERY_REPEAT_THRESHOLD', 5))
+        token = _current.set(log)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.report(request, log, mode)
+        return response
+
+    async def __acall__(self, request):
+        mode = settings.APP_SETTINGS.get('QUERY_INSPECTION', 'off')
+        if mode == 'off':
+            return await self.get_response(request)
+
+        # Sync views run in a thread with a copy of this context, sharing the log
+        log = QueryLog(settings.APP_SETTINGS.get('QUERY_REPEAT_THRESHOLD', 5))
+        token = _current.set(log)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.report(request, log, mode)
+        return response
+
+    def report(self, request, log, mode):
+        problems = self.check(request, log)
+        if problems:
+            message = f'{request.method} {request.path}: ' + '; '.join(problems)
+            if mode == 'raise':
+                raise QueryBudgetExceeded(message)
+            stacks = '\n'.join(log.stacks.get(shape, '') for shape in log.repeated())
+            logger.warning('%s\n%s', message, stacks)
+
+    @staticmethod
+    def check(request, log):
+        problems = []
+        budget = view_budget(request)
+        if budget is not None and log.count > budget:
+            problems.append(f'{log.count} queries exceed the budget of {budget}')
+        for shape, count in log.repeated().items():
+            problems.append(f'possible N+1, {count} x {shape[:200]}')
+        return problems
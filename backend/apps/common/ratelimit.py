@@ -0,0 +1,126 @@
+# Shared rate limiting using GCRA (generic cell rate algorithm)
+
+import math
+import threading
+import time
+from django.conf import settings
+from django.core.cache import caches
+from .redis_client import get_redis_client
+
+# KEYS[1] = state key, ARGV = now, emission interval, period
+GCRA_SCRIPT = """
+local tat = tonumber(redis.call('GET', KEYS[1]) or ARGV[1])
+local now = tonumber(ARGV[1])
+local interval = tonumber(ARGV[2])
+local period = tonumber(ARGV[3])
+if tat < now then tat = now end
+local new_tat = tat + interval
+if new_tat - now > period then
+    return {0, tostring(new_tat - now - period)}
+end
+redis.call('SET', KEYS[1], tostring(new_tat), 'PX', math.ceil((new_tat - now) * 1000))
+return {1, '0'}
+"""
+
+
+class RateLimiter:
+    """
+    Allows ``max_requests`` per ``window`` seconds for each key.
+
+    GCRA stores a single timestamp per key (the theoretical arrival time of
+    the next request), so memory is O(1) per key and each check is one cache
+    round trip. With a Redis cache the check runs as a Lua script and is
+    atomic across all workers; with other cache backends (which are not
+    shared between processes anyway) a process lock makes it atomic.
+    """
+
+    _lock = threading.Lock()
+    _script = None
+
+    def __init__(self, name, max_requests, window):
+        self.name = name
+        self.max_requests = max_requests
+        self.window = window
+        self.interval = window / max_requests
+
+    def _key(self, identifier):
+        return f'ratelimit:{self.name}:{identifier}'
+
+    def hit(self, identifier, now=None):
+        """Record one request; return (allowed, retry_after_seconds)"""
+        now = time.time() if now is None else now
+        key = self._key(identifier)
+
+        backend = caches['default']
+        client = get_redis_client()
+        if client is not None:
+            return self._hit_redis(client, backend.make_key(key), now)
+        return self._hit_local(backend, key, now)
+
+    def _hit_redis(self, client, full_key, now):
+        cls = type(self)
+        if cls._script is None:
+            cls._script = client.register_script(GCRA_SCRIPT)
+        allowed, retry_after = cls._script(keys=[full_key], args=[now, self.interval, self.window])
+        return bool(allowed), float(retry_after)
+
+    def _hit_local(self, backend, key, now):
+        with self._lock:
+            tat = max(backend.get(key, now), now)
+            new_tat = tat + self.interval
+            if new_tat - now > self.window:
+                return False, new_tat - now - self.window
+            backend.set(key, new_tat, timeout=math.ceil(new_tat - now))
+            return True, 0.0
+
+
+def _identify(request, scope):
+    """Resolve the identifier a rule is keyed on"""
+    from .utils import get_client_ip, parse_json_safely
+
+    if scope == 'user':
+        if request.user.is_authenticated:
+            return f'user:{request.user.pk}'
+        return f'ip:{get_client_ip(request)}'
+
+    if scope == 'mobile':
+        try:
+            mobile_number = parse_json_safely(request).get('mobile_number')
+        except Exception:
+            mobile_number = None
+        # Normalise so formatting variations share one bucket; requests
+        # without a mobile number are still covered by their IP rule
+        digits = ''.join(filter(str.isdigit, str(mobile_number or '')))[-10:]
+        return f'mobile:{digits}' if digits else None
+
+    return f'ip:{get_client_ip(request)}'
+
+
+def get_rules(name, max_requests, window, scope):
+    """
+    Build limiters for a view.
+
+    ``settings.RATE_LIMITS[name]`` overrides the decorator arguments with a
+    list of ``{'scope': ..., 'max_requests': ..., 'window': ...}`` rules.
+    """
+    configured = getattr(settings, 'RATE_LIMITS', {}).get(name)
+    if not configured:
+        configured = [{'scope': scope, 'max_requests': max_requests, 'window': window}]
+
+    return [
+        (rule['scope'], RateLimiter(f"{name}:{rule['scope']}", rule['max_requests'], rule['window']))
+        for rule in configured
+    ]
+
+
+def check_request(request, rules):
+    """Apply the rules in order; return the retry-after of the first one that rejects, else 0"""
+    for scope, limiter in rules:
+        identifier = _identify(request, scope)
+        if identifier is None:
+            continue
+        # Later rules are not charged for a request that is turned away anyway
+        allowed, wait = limiter.hit(identifier)
+        if not allowed:
+            return wait
+    return 0.0
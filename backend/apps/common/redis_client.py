@@ -0,0 +1,24 @@
+# Direct Redis access for features that need more than the cache API (sorted sets, Lua)
+
+from functools import lru_cache
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.redis import RedisCache
+
+
+def get_redis_client(alias='default'):
+    """Client for the Redis server behind cache ``alias``, or None when that cache is not Redis"""
+    if not isinstance(caches[alias], RedisCache):
+        return None
+    return _client(alias)
+
+
+@lru_cache(maxsize=None)
+def _client(alias):
+    import redis
+
+    location = settings.CACHES[alias]['LOCATION']
+    if isinstance(location, str):
+        location = location.split(',')
+    # The first server is the primary; RedisCache sends writes there too
+    return redis.Redis.from_url(location[0])
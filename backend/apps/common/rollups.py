@@ -0,0 +1,141 @@
+# Incrementally maintained daily booking rollups for operational reporting
+
+import logging
+from datetime import datetime, time, timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from apps.booking.models import Booking, DailyBookingStats, DailyPartnerStats, RollupWatermark
+
+logger = logging.getLogger(__name__)
+
+
+def day_runs(days):
+    """Group dates into runs of consecutive days: [(first, last), ...]"""
+    runs = []
+    for day in sorted(days):
+        if runs and day - runs[-1][1] == timedelta(days=1):
+            runs[-1][1] = day
+        else:
+            runs.append([day, day])
+    return [tuple(run) for run in runs]
+
+
+def day_bounds(first, last):
+    """Aware [start, end) covering local days first..last"""
+    return (timezone.make_aware(datetime.combine(first, time.min)),
+            timezone.make_aware(datetime.combine(last + timedelta(days=1), time.min)))
+
+
+class BookingRollups:
+    """
+    Daily rollups of bookings per status and deliveries per partner.
+
+    Each refresh finds the bookings whose updated_at passed the watermark,
+    or whose id is above the highest id already seen (bulk loads insert rows
+    with historic updated_at values), then recomputes every local day those bookings touch (by created_at for
+    status counts, by delivered_at for partner deliveries) from Booking and
+    replaces that day's rollup rows. Recomputing whole days rather than
+    applying deltas makes a run idempotent, and lets the watermark trail by
+    ROLLUP_WATERMARK_OVERLAP_SECONDS to catch transactions that committed
+    late with an older updated_at. Reports read only the rollup tables.
+    """
+
+    WATERMARK = 'booking_daily'
+
+    @classmethod
+    def refresh(cls, full=False):
+        """Fold bookings changed since the watermark into the rollups; returns a summary"""
+        overlap = timedelta(seconds=settings.APP_SETTINGS.get('ROLLUP_WATERMARK_OVERLAP_SECONDS', 300))
+
+        with transaction.atomic():
+            # Serialises concurrent runs (e.g. an overlapping beat tick) on PostgreSQL
+            RollupWatermark.objects.get_or_create(name=cls.WATERMARK)
+            watermark = RollupWatermark.objects.select_for_update().get(name=cls.WATERMARK)
+
+            changed = Booking.objects.order_by()
+            if full:
+                # Also drops rollups of deleted bookings, which no watermark can see
+                DailyBookingStats.objects.all().delete()
+                DailyPartnerStats.objects.all().delete()
+            elif watermark.updated_at is not None:
+                since = Q(updated_at__gt=watermark.updated_at - overlap)
+                if watermark.last_id is not None:
+                    since |= Q(pk__gt=watermark.last_id)
+                changed = changed.filter(since)
+
+            highs = changed.aggregate(high=Max('updated_at'), high_id=Max('pk'))
+            high, high_id = highs['high'], highs['high_id']
+            if high is None:
+                return {'status_days': 0, 'partner_days': 0, 'watermark': watermark.updated_at}
+
+            created_days = set(
+                changed.annotate(day=TruncDate('created_at')).values_list('day', flat=True).distinct()
+            )
+            delivered_days = set(
+                changed.filter(delivered_at__isnull=False)
+                .annotate(day=TruncDate('delivered_at')).values_list('day', flat=True).distinct()
+            )
+            for first, last in day_runs(created_days):
+                cls.rebuild_status_days(first, last)
+            for first, last in day_runs(delivered_days):
+                cls.rebuild_partner_days(first, last)
+
+            watermark.updated_at = max(high, watermark.updated_at or high)
+            watermark.last_id = max(high_id, watermark.last_id or high_id)
+            watermark.save()
+
+        logger.info('Booking rollups refreshed: %d status days, %d partner days, watermark %s',
+                    len(created_days), len(delivered_days), watermark.updated_at)
+        return {'status_days': len(created_days), 'partner_days': len(delivered_days),
+                'watermark': watermark.updated_at}
+
+    @staticmethod
+    def rebuild_status_days(first, last):
+        start, end = day_bounds(first, last)
+        rows = (
+            Booking.objects.filter(created_at__gte=start, created_at__lt=end).order_by()
+            .annotate(day=TruncDate('created_at')).values('day', 'status')
+            .annotate(bookings=Count('pk'), revenue=Sum('total_amount'))
+        )
+        DailyBookingStats.objects.filter(day__gte=first, day__lte=last).delete()
+        DailyBookingStats.objects.bulk_create(DailyBookingStats(**row) for row in rows)
+
+    @staticmethod
+    def rebuild_partner_days(first, last):
+        start, end = day_bounds(first, last)
+        rows = (
+            Booking.objects.filter(status='delivered', delivery_partner__isnull=False,
+                                   delivered_at__gte=start, delivered_at__lt=end).order_by()
+            .annotate(day=TruncDate('delivered_at')).values('day', 'delivery_partner')
+            .annotate(deliveries=Count('pk'), revenue=Sum('total_amount'))
+        )
+        DailyPartnerStats.objects.filter(day__gte=first, day__lte=last).delete()
+        DailyPartnerStats.objects.bulk_create(
+            DailyPartnerStats(day=row['day'], partner_id=row['delivery_partner'], deliveries=row['deliveries'],
+                              revenue=row['revenue'])
+            for row in rows
+        )
+
+    @staticmethod
+    def status_report(first, last):
+        """{day: {status: (bookings, revenue)}} for local days first..last, newest first"""
+        report = {}
+        for day, status, bookings, revenue in (
+            DailyBookingStats.objects.filter(day__gte=first, day__lte=last)
+            .values_list('day', 'status', 'bookings', 'revenue')
+        ):
+            report.setdefault(day, {})[status] = (bookings, revenue)
+        return report
+
+    @staticmethod
+    def partner_report(first, last, limit=20):
+        """Top partners by deliveries over local days first..last"""
+        return list(
+            DailyPartnerStats.objects.filter(day__gte=first, day__lte=last)
+            .values('partner', 'partner__mobile_number')
+            .annotate(deliveries=Sum('deliveries'), revenue=Sum('revenue'))
+            .order_by('-deliveries', 'partner')[:limit]
+        )
@@ -1,15 +1,20 @@
 # Service layer with reusable business logic
 
-from django.db import transaction
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Aggregate, Count, FloatField
+from django.db.models.signals import post_save
 from django.utils import timezone
 from django.contrib.auth import get_user_model
 from channels.layers import get_channel_layer
 from asgiref.sync import async_to_sync
 from .utils import OTPHandler, ValidationUtils, log_user_activity
+from .otp import get_otp_store
 from .exceptions import ServiceError
 
 User = get_user_model()
-channel_layer = get_channel_layer()
 
 class AuthenticationService:
     """Reusable authentication service"""
@@ -21,30 +26,30 @@ class AuthenticationService:
             # Validate mobile number
             clean_mobile = ValidationUtils.validate_mobile_number(mobile_number)
 
-            # Generate OTP (static as per requirements)
-            otp_code = '1234'
-
-            # Save OTP to database
+            # Static demo code in development, random otherwise (OTP_STATIC_CODE)
             from apps.authentication.models import OTP
-            otp_obj = OTP.objects.create(
-                mobile_number=clean_mobile,
-                otp_code=otp_code
-            )
+            otp_code = OTP.generate_otp()
 
-            # Send OTP via SMS (mock implementation)
+            # Store OTP with its expiry (cache-backed by default)
+            get_otp_store().issue(clean_mobile, otp_code)
+
+            # Queue the SMS; the request does not wait for the gateway
             OTPHandler.send_otp_sms(clean_mobile, otp_code)
 
             log_user_activity(
                 type('MockUser', (), {'mobile_number': clean_mobile, 'role': role})(), 
-                f"OTP sent for {role} role"
+                f"OTP sent for {role} role",
+                event='otp_sent'
             )
 
-            # Return OTP for demo purposes (remove in production)
-            return {
+            result = {
                 'success': True,
-                'otp': otp_code,  # Remove in production
                 'mobile_number': clean_mobile
             }
+            # The demo code is public anyway; a random code only ever goes out by SMS
+            if settings.APP_SETTINGS.get('OTP_STATIC_CODE'):
+                result['otp'] = otp_code
+            return result
 
         except Exception as e:
             raise ServiceError(f"Failed to send OTP: {str(e)}")
@@ -57,33 +62,14 @@ class AuthenticationService:
             clean_mobile = ValidationUtils.validate_mobile_number(mobile_number)
             clean_otp = ValidationUtils.validate_otp(otp_code)
 
-            # Verify static OTP
-            if clean_otp != '1234':
-                raise ServiceError("Invalid OTP")
-
-            # Create OTP record for tracking
-            from apps.authentication.models import OTP
-            OTP.objects.create(
-                mobile_number=clean_mobile,
-                otp_code=clean_otp,
-                is_verified=True
-            )
+            # Verify and consume the outstanding OTP
+            if not get_otp_store().verify_and_consume(clean_mobile, clean_otp):
+                raise ServiceError("Invalid or expired OTP")
 
-            # Get or create user
-            user, created = User.objects.get_or_create(
-                mobile_number=clean_mobile,
-                defaults={
-                    'username': clean_mobile,
-                    'role': role,
-                    'is_mobile_verified': True
-                }
-            )
-
-            if not created and not user.is_mobile_verified:
-                user.is_mobile_verified = True
-                user.save()
+            # Create or mark the user verified in one statement
+            user, created = AuthenticationService.upsert_verified_user(clean_mobile, role)
 
-            log_user_activity(user, "Successful login")
+            log_user_activity(user, "Successful login", event='login')
 
             return {
                 'success': True,
@@ -96,6 +82,55 @@ class AuthenticationService:
                 raise
             raise ServiceError(f"Login failed: {str(e)}")
 
+    @staticmethod
+    def upsert_verified_user(mobile_number, role='customer'):
+        """
+        Insert or update the user for a verified mobile number in one round trip.
+
+        Uses INSERT ... ON CONFLICT (mobile_number) DO UPDATE ... RETURNING where
+        the database supports it (PostgreSQL, SQLite >= 3.35), which replaces the
+        SELECT + INSERT of get_or_create and the follow-up save(). last_login is
+        written here as well, so the user_logged_in signal can skip its UPDATE.
+        """
+        now = timezone.now()
+        if not connection.features.can_return_rows_from_bulk_insert:
+            user, created = User.objects.get_or_create(
+                mobile_number=mobile_number,
+                defaults={'username': mobile_number, 'role': role, 'is_mobile_verified': True}
+            )
+            if not created and not user.is_mobile_verified:
+                user.is_mobile_verified = True
+                user.save(update_fields=['is_mobile_verified', 'updated_at'])
+            return user, created
+
+        candidate = User(
+            mobile_number=mobile_number,
+            username=mobile_number,
+            role=role,
+            is_mobile_verified=True,
+            last_login=now,
+        )
+        fields = [f for f in User._meta.concrete_fields if not f.primary_key]
+        params = [f.get_db_prep_save(f.pre_save(candidate, add=True), connection) for f in fields]
+
+        qn = connection.ops.quote_name
+        columns = ', '.join(qn(f.column) for f in fields)
+        sql = (
+            f"INSERT INTO {qn(User._meta.db_table)} ({columns}) "
+            f"VALUES ({', '.join(['%s'] * len(fields))}) "
+            f"ON CONFLICT ({qn('mobile_number')}) DO UPDATE SET "
+            f"{qn('is_mobile_verified')} = EXCLUDED.{qn('is_mobile_verified')}, "
+            f"{qn('last_login')} = EXCLUDED.{qn('last_login')} "
+            f"RETURNING {qn('id')}, {columns}"
+        )
+        user = list(User.objects.raw(sql, params))[0]
+        created = user.created_at == candidate.created_at
+        user._last_login_recorded = True
+
+        # The raw statement bypasses Model.save(); keep cache invalidation in step
+        post_save.send(sender=User, instance=user, created=created, update_fields=None, raw=False, using=connection.alias)
+        return user, created
+
 class BookingService:
     """Reusable booking service"""
 
@@ -111,25 +146,19 @@ class BookingService:
                 raise ServiceError("Validation failed", errors)
 
             # Create booking
-            from apps.booking.models import Booking, BookingStatusHistory
+            from apps.booking.models import Booking
             booking = Booking.objects.create(
                 customer=customer,
+                food_items=booking_data.get('food_items', ''),
                 pickup_address=booking_data['pickup_address'],
                 delivery_address=booking_data['delivery_address'],
-                customer_phone=booking_data.get('customer_phone', customer.mobile_number),
-                delivery_notes=booking_data.get('delivery_notes', ''),
-                estimated_price=booking_data.get('estimated_price', 50.00)
-            )
-
-            # Create status history
-            BookingStatusHistory.objects.create(
-                booking=booking,
-                status='start',
-                updated_by=customer,
-                notes='Booking created'
+                phone_number=booking_data.get('customer_phone', customer.mobile_number),
+                special_instructions=booking_data.get('delivery_notes', ''),
+                total_amount=booking_data.get('estimated_price', 50.00)
             )
+            booking.transition('pending', by=customer, notes='Booking created', at=booking.created_at).save()
 
-            log_user_activity(customer, f"Created booking #{booking.id}")
+            log_user_activity(customer, f"Created booking #{booking.id}", event='booking_created')
 
             # Notify admins about new booking
             BookingService.notify_new_booking(booking)
@@ -149,7 +178,7 @@ class BookingService:
     def assign_booking(booking_id, delivery_partner_id, admin_user):
         """Assign booking to delivery partner"""
         try:
-            from apps.booking.models import Booking, BookingStatusHistory
+            from apps.booking.models import Booking
 
             booking = Booking.objects.get(id=booking_id)
             delivery_partner = User.objects.get(
@@ -157,18 +186,18 @@ class BookingService:
                 role='delivery_partner'
             )
 
+            # Only dispatch to partners holding a live connection
+            from .presence import PresenceRegistry
+            if not PresenceRegistry.is_online(delivery_partner.id):
+                raise ServiceError(f"Delivery partner {delivery_partner.mobile_number} is offline")
+
             # Assign delivery partner
             booking.delivery_partner = delivery_partner
-            booking.assigned_at = timezone.now()
+            history = booking.transition('assigned', by=admin_user,
+                                         notes=f'Assigned to {delivery_partner.mobile_number}')
             booking.save()
-
-            # Create status history
-            BookingStatusHistory.objects.create(
-                booking=booking,
-                status='assigned',
-                updated_by=admin_user,
-                notes=f'Assigned to {delivery_partner.mobile_number}'
-            )
+            history.save()
+            transaction.on_commit(lambda: ETAService.notify_bookings_changed(delivery_partner.id))
 
             # Send real-time notification
             BookingService.notify_booking_update(booking, {
@@ -177,7 +206,11 @@ class BookingService:
                 'assigned_to': delivery_partner.mobile_number
             })
 
-            log_user_activity(admin_user, f"Assigned booking #{booking.id} to {delivery_partner.mobile_number}")
+            log_user_activity(
+                admin_user,
+                f"Assigned booking #{booking.id} to {delivery_partner.mobile_number}",
+                event='booking_assigned'
+            )
 
             return {
                 'success': True,
@@ -193,14 +226,15 @@ class BookingService:
     def update_booking_status(booking_id, new_status, user, notes=''):
         """Update booking status"""
         try:
-            from apps.booking.models import Booking, BookingStatusHistory
+            from apps.booking.models import Booking
 
             booking = Booking.objects.get(id=booking_id)
 
             # Validate status transition
             valid_transitions = {
-                'start': ['reached'],
-                'reached': ['collected'], 
+                'assigned': ['started'],
+                'started': ['reached'],
+                'reached': ['collected'],
                 'collected': ['delivered']
             }
 
@@ -210,16 +244,10 @@ class BookingService:
                 user.role != 'admin'):
                 raise ServiceError(f"Invalid status transition from {current_status} to {new_status}")
 
-            # Update booking status
-            booking.update_status(new_status)
-
-            # Create status history
-            BookingStatusHistory.objects.create(
-                booking=booking,
-                status=new_status,
-                updated_by=user,
-                notes=notes
-            )
+            # Update booking status, stage timestamps and durations
+            history = booking.transition(new_status, by=user, notes=notes)
+            booking.save()
+            history.save()
 
             # Send real-time notification
             BookingService.notify_booking_update(booking, {
@@ -230,7 +258,7 @@ class BookingService:
                 'timestamp': timezone.now().isoformat()
             })
 
-            log_user_activity(user, f"Updated booking #{booking.id} status to {new_status}")
+            log_user_activity(user, f"Updated booking #{booking.id} status to {new_status}", event='status_changed')
 
             return {
                 'success': True,
@@ -247,7 +275,7 @@ class BookingService:
     def notify_booking_update(booking, data):
         """Send real-time notification for booking update"""
         try:
-            async_to_sync(channel_layer.group_send)(
+            async_to_sync(get_channel_layer().group_send)(
                 f'booking_{booking.id}',
                 {
                     'type': 'booking_update',
@@ -264,7 +292,7 @@ class BookingService:
     def notify_new_booking(booking):
         """Notify admins about new booking"""
         try:
-            async_to_sync(channel_layer.group_send)(
+            async_to_sync(get_channel_layer().group_send)(
                 'admin_notifications',
                 {
                     'type': 'new_booking',
@@ -278,6 +306,191 @@ class BookingService:
         except Exception as e:
             print(f"Failed to send new booking notification: {e}")
 
+class Percentile(Aggregate):
+    """PostgreSQL ordered-set aggregate: Percentile('total_seconds', fraction=0.9)"""
+    function = 'PERCENTILE_CONT'
+    template = '%(function)s(%(fraction)s) WITHIN GROUP (ORDER BY %(expressions)s)'
+    output_field = FloatField()
+
+
+def percentile_cont(values, fraction):
+    """Interpolated percentile of sorted values, matching PERCENTILE_CONT"""
+    if not values:
+        return None
+    position = (len(values) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+class BookingSLAService:
+    """
+    Stage-duration SLAs from the precomputed Booking *_seconds columns.
+
+    A cohort is the bookings assigned or delivered in a period: one indexed
+    range scan over a timestamp column rather than a history replay. The
+    assigned cohort answers "time to assign today"; the delivered cohort
+    measures every stage over the same completed orders.
+    """
+
+    PERCENTILES = {'median': 0.5, 'p90': 0.9}
+    COHORTS = ['assigned_at', 'delivered_at']
+
+    @classmethod
+    def stage_stats(cls, start, end, cohort='delivered_at'):
+        """{duration field: {'count', 'median', 'p90'}} in seconds for bookings whose ``cohort`` is in [start, end)"""
+        from apps.booking.models import Booking
+
+        if cohort not in cls.COHORTS:
+            raise ServiceError(f"Unknown SLA cohort {cohort}")
+        fields = list(Booking.STAGE_DURATIONS)
+        bookings = Booking.objects.filter(**{f'{cohort}__gte': start, f'{cohort}__lt': end})
+
+        if connection.vendor == 'postgresql':
+            aggregates = {}
+            for field in fields:
+                aggregates[f'{field}__count'] = Count(field)
+                for name, fraction in cls.PERCENTILES.items():
+                    aggregates[f'{field}__{name}'] = Percentile(field, fraction=fraction)
+            row = bookings.aggregate(**aggregates)
+            return {field: {name: row[f'{field}__{name}'] for name in ['count', *cls.PERCENTILES]}
+                    for field in fields}
+
+        columns = list(zip(*bookings.values_list(*fields))) or [()] * len(fields)
+        stats = {}
+        for field, column in zip(fields, columns):
+            values = sorted(value for value in column if value is not None)
+            stats[field] = {'count': len(values)}
+            for name, fraction in cls.PERCENTILES.items():
+                stats[field][name] = percentile_cont(values, fraction)
+        return stats
+
+class ETAService:
+    """
+    Memoized delivery ETA for active bookings.
+
+    Estimates are stored per booking together with the partner, status and
+    position they were computed from, plus an absolute arrival time. Reads
+    only recompute when the partner changed, the status changed or the
+    partner moved further than ETA_RECOMPUTE_DISTANCE_M; otherwise the
+    remaining time is simply arrival time minus now.
+    """
+
+    ETA_STATUSES = ['assigned', 'started', 'reached', 'collected']
+
+    @staticmethod
+    def _cache_key(booking_id):
+        return f'eta:booking:{booking_id}'
+
+    @staticmethod
+    def estimate_seconds(booking, latitude, longitude):
+        """Estimate seconds until delivery from a partner position"""
+        from .location import haversine_m
+
+        config = settings.APP_SETTINGS
+        speed_mps = config.get('ETA_AVERAGE_SPEED_KMPH', 20) * 1000 / 3600
+        road_factor = config.get('ETA_ROAD_FACTOR', 1.3)
+        pickup_seconds = config.get('ETA_PICKUP_HANDLING_SECONDS', 300)
+
+        pickup = (booking.pickup_latitude, booking.pickup_longitude)
+        drop = (booking.delivery_latitude, booking.delivery_longitude)
+
+        if booking.status in ('assigned', 'started'):
+            distance = haversine_m(latitude, longitude, *pickup) + haversine_m(*pickup, *drop)
+            extra = pickup_seconds
+        elif booking.status == 'reached':
+            distance = haversine_m(*pickup, *drop)
+            extra = pickup_seconds
+        elif booking.status == 'collected':
+            distance = haversine_m(latitude, longitude, *drop)
+            extra = 0
+        else:
+            return None
+
+        return distance * road_factor / speed_mps + extra
+
+    @classmethod
+    def refresh(cls, booking, position=None):
+        """
+        Return (entry, recomputed) for a booking.
+
+        position is a (timestamp, latitude, longitude) tuple; when omitted the
+        partner's latest position is read from the location cache.
+        """
+        if (booking.status not in cls.ETA_STATUSES or
+                not booking.delivery_partner_id or not booking.has_coordinates):
+            return None, False
+
+        from .location import LocationTracker, haversine_m
+
+        key = cls._cache_key(booking.id)
+        entry = cache.get(key)
+        if entry and (entry['partner_id'] != booking.delivery_partner_id or
+                      entry['status'] != booking.status):
+            entry = None
+
+        if position is None:
+            position = LocationTracker.latest_position(booking.delivery_partner_id)
+        if position is None:
+            return entry, False
+
+        _, latitude, longitude = position
+        threshold = settings.APP_SETTINGS.get('ETA_RECOMPUTE_DISTANCE_M', 100)
+        if entry and haversine_m(entry['latitude'], entry['longitude'], latitude, longitude) < threshold:
+            return entry, False
+
+        seconds = cls.estimate_seconds(booking, latitude, longitude)
+        entry = {
+            'booking_id': booking.id,
+            'partner_id': booking.delivery_partner_id,
+            'status': booking.status,
+            'latitude': latitude,
+            'longitude': longitude,
+            'arrival_at': time.time() + seconds,
+        }
+        cache.set(key, entry, timeout=settings.APP_SETTINGS.get('ETA_CACHE_TTL_SECONDS', 3600))
+        return entry, True
+
+    @classmethod
+    def remaining_seconds(cls, booking):
+        """Seconds until the booking is expected to be delivered, or None"""
+        entry, _ = cls.refresh(booking)
+        if not entry:
+            return None
+        return max(0, int(entry['arrival_at'] - time.time()))
+
+    @staticmethod
+    def eta_event(entry):
+        """Channel layer (group, message) pair for an ETA entry"""
+        return f"tracking_{entry['booking_id']}", {
+            'type': 'booking_eta',
+            'booking_id': entry['booking_id'],
+            'arrival_at': entry['arrival_at'],
+        }
+
+    @classmethod
+    def notify_eta(cls, entry):
+        """Push a recomputed ETA to the booking's tracking subscribers"""
+        try:
+            async_to_sync(get_channel_layer().group_send)(*cls.eta_event(entry))
+        except Exception as e:
+            print(f"Failed to send ETA update: {e}")
+
+    @staticmethod
+    def partner_group(partner_id):
+        """Channel layer group joined by the partner's location consumer"""
+        return f'partner_location_{partner_id}'
+
+    @classmethod
+    def notify_bookings_changed(cls, partner_id):
+        """Make the partner's location consumer reload its bookings before the next ETA recompute"""
+        try:
+            async_to_sync(get_channel_layer().group_send)(
+                cls.partner_group(partner_id), {'type': 'bookings_changed'}
+            )
+        except Exception as e:
+            print(f"Failed to send bookings update: {e}")
+
 class ChatService:
     """Reusable chat service"""
 
@@ -307,7 +520,7 @@ class ChatService:
                 message=message
             )
 
-            log_user_activity(sender, f"Sent message in booking #{booking_id}")
+            log_user_activity(sender, f"Sent message in booking #{booking_id}", event='chat_message')
 
             return chat_message
 
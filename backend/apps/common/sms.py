@@ -0,0 +1,280 @@
+# SMS delivery: pluggable gateways and a batching background dispatcher
+
+import atexit
+import heapq
+import itertools
+import json
+import logging
+import queue
+import re
+import threading
+import time
+from collections import namedtuple
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+SMSMessage = namedtuple('SMSMessage', ['to', 'body'])
+
+
+class SMSQueueFull(Exception):
+    """The dispatch queue stayed full for longer than the enqueue timeout"""
+
+
+class BaseSMSGateway:
+    """
+    Interface for SMS providers.
+
+    The dispatcher keeps one gateway instance for the life of the process, so
+    a gateway can open its connection once and reuse it for every batch.
+    """
+
+    def send_batch(self, messages):
+        """Submit messages; return the ones that failed and should be retried"""
+        raise NotImplementedError
+
+    def close(self):
+        """Release any connection held by the gateway"""
+
+
+class ConsoleSMSGateway(BaseSMSGateway):
+    """Logs messages instead of sending them (development default); codes are masked unless DEBUG"""
+
+    def send_batch(self, messages):
+        for message in messages:
+            body = message.body if settings.DEBUG else re.sub(r'\d', '*', message.body)
+            logger.info('SMS to %s: %s', message.to, body)
+        return []
+
+
+class FakeSMSGateway(BaseSMSGateway):
+    """In-memory gateway for tests; ``fail_next`` makes the next N batches fail"""
+
+    outbox = []
+    batches = []
+    fail_next = 0
+    _lock = threading.Lock()
+
+    def send_batch(self, messages):
+        cls = type(self)
+        with cls._lock:
+            if cls.fail_next > 0:
+                cls.fail_next -= 1
+                return list(messages)
+            cls.batches.append(list(messages))
+            cls.outbox.extend(messages)
+        return []
+
+    @classmethod
+    def last_code(cls, to):
+        """First number in the latest message delivered to ``to`` (the OTP), or None"""
+        with cls._lock:
+            message = next((message for message in reversed(cls.outbox) if message.to == to), None)
+        match = re.search(r'\d+', message.body) if message else None
+        return match.group() if match else None
+
+    @classmethod
+    def reset(cls):
+        with cls._lock:
+            cls.outbox = []
+            cls.batches = []
+            cls.fail_next = 0
+
+
+class HTTPSMSGateway(BaseSMSGateway):
+    """
+    Posts batches as JSON to ``SMS_GATEWAY_URL`` over one keep-alive connection.
+
+    The payload is ``{"messages": [{"to": ..., "body": ...}]}``; any non-2xx
+    response or connection error fails the whole batch.
+    """
+
+    def __init__(self):
+        from urllib.parse import urlsplit
+
+        config = settings.APP_SETTINGS
+        if not config.get('SMS_GATEWAY_URL'):
+            raise ImproperlyConfigured('HTTPSMSGateway needs SMS_GATEWAY_URL')
+        url = urlsplit(config['SMS_GATEWAY_URL'])
+        self.scheme = url.scheme
+        self.host = url.netloc
+        self.path = url.path or '/'
+        self.api_key = config.get('SMS_GATEWAY_API_KEY', '')
+        self.timeout = config.get('SMS_GATEWAY_TIMEOUT_SECONDS', 10)
+        self._connection = None
+
+    def _get_connection(self):
+        if self._connection is None:
+            import http.client
+
+            connection_class = http.client.HTTPSConnection if self.scheme == 'https' else http.client.HTTPConnection
+            self._connection = connection_class(self.host, timeout=self.timeout)
+        return self._connection
+
+    def send_batch(self, messages):
+        body = json.dumps({'messages': [{'to': m.to, 'body': m.body} for m in messages]})
+        headers = {'Content-Type': 'application/json', 'Authorization': f'Bearer {self.api_key}'}
+        try:
+            connection = self._get_connection()
+            connection.request('POST', self.path, body=body, headers=headers)
+            response = connection.getresponse()
+            response.read()
+        except (OSError, ValueError) as e:
+            logger.warning('SMS gateway request failed: %s', e)
+            self.close()
+            return list(messages)
+
+        if not 200 <= response.status < 300:
+            logger.warning('SMS gateway returned %s for %d messages', response.status, len(messages))
+            return list(messages)
+        return []
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+
+class SMSDispatcher:
+    """
+    Sends SMS from a background thread so requests never wait on the gateway.
+
+    Messages go into a bounded queue. The worker drains up to
+    ``SMS_BATCH_SIZE`` messages (waiting at most ``SMS_BATCH_LINGER_SECONDS``
+    for a batch to fill) and submits them in one gateway call. Failed messages
+    are held back with a due time (exponential backoff) and go out with a later
+    batch, up to ``SMS_MAX_ATTEMPTS`` attempts, so a retry never stalls new
+    messages. With ``SMS_ASYNC`` off, messages are sent inline (useful in scripts).
+    """
+
+    _lock = threading.Lock()
+    _queue = None
+    _worker = None
+    _gateway = None
+
+    @staticmethod
+    def _setting(name, default):
+        return settings.APP_SETTINGS.get(name, default)
+
+    @classmethod
+    def get_gateway(cls):
+        if cls._gateway is None:
+            backend = cls._setting('SMS_GATEWAY_BACKEND', 'apps.common.sms.ConsoleSMSGateway')
+            cls._gateway = import_string(backend)()
+        return cls._gateway
+
+    @classmethod
+    def _start(cls):
+        with cls._lock:
+            if cls._worker is None or not cls._worker.is_alive():
+                if cls._queue is None:
+                    cls._queue = queue.Queue(maxsize=cls._setting('SMS_QUEUE_SIZE', 10000))
+                cls._worker = threading.Thread(target=cls._run, name='sms-dispatcher', daemon=True)
+                cls._worker.start()
+
+    @classmethod
+    def send(cls, to, body):
+        """Queue one message; raises SMSQueueFull if the queue cannot take it"""
+        message = SMSMessage(to, body)
+        if not cls._setting('SMS_ASYNC', True):
+            cls.deliver([message])
+            return
+
+        if cls._worker is None or not cls._worker.is_alive():
+            cls._start()
+        try:
+            cls._queue.put(message, timeout=cls._setting('SMS_ENQUEUE_TIMEOUT_SECONDS', 0.5))
+        except queue.Full:
+            raise SMSQueueFull('SMS queue is full')
+
+    @classmethod
+    def _next_batch(cls, timeout=None):
+        """Wait up to ``timeout`` for the first message, then collect more until the batch is full or the linger expires"""
+        try:
+            batch = [cls._queue.get(timeout=timeout)]
+        except queue.Empty:
+            return []
+        batch_size = cls._setting('SMS_BATCH_SIZE', 50)
+        deadline = time.monotonic() + cls._setting('SMS_BATCH_LINGER_SECONDS', 0.05)
+        while len(batch) < batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(cls._queue.get(timeout=remaining) if remaining > 0 else cls._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    @classmethod
+    def _run(cls):
+        # Messages waiting for a retry: (due, sequence, attempts so far, message).
+        # They stay unfinished in the queue's task count until sent or dropped.
+        retries = []
+        sequence = itertools.count()
+        while True:
+            timeout = max(0.0, retries[0][0] - time.monotonic()) if retries else None
+            batch = [(0, message) for message in cls._next_batch(timeout)]
+
+            batch_size = cls._setting('SMS_BATCH_SIZE', 50)
+            now = time.monotonic()
+            while retries and retries[0][0] <= now and len(batch) < batch_size:
+                _, _, attempts, message = heapq.heappop(retries)
+                batch.append((attempts, message))
+            if not batch:
+                continue
+
+            try:
+                failed = cls.get_gateway().send_batch([message for _, message in batch])
+            except Exception:
+                logger.exception('SMS dispatch failed for %d messages', len(batch))
+                failed = [message for _, message in batch]
+
+            max_attempts = cls._setting('SMS_MAX_ATTEMPTS', 3)
+            backoff = cls._setting('SMS_RETRY_BACKOFF_SECONDS', 0.5)
+            remaining = {}
+            for message in failed:
+                remaining[message] = remaining.get(message, 0) + 1
+            dropped = 0
+            for attempts, message in batch:
+                attempts += 1
+                if remaining.get(message):
+                    remaining[message] -= 1
+                    if attempts < max_attempts:
+                        due = time.monotonic() + backoff * 2 ** (attempts - 1)
+                        heapq.heappush(retries, (due, next(sequence), attempts, message))
+                        continue
+                    dropped += 1
+                cls._queue.task_done()
+            if dropped:
+                logger.error('Dropping %d SMS after %d attempts', dropped, max_attempts)
+
+    @classmethod
+    def deliver(cls, messages):
+        """Send a batch inline through the gateway, sleeping between retries (SMS_ASYNC off)"""
+        gateway = cls.get_gateway()
+        max_attempts = cls._setting('SMS_MAX_ATTEMPTS', 3)
+        backoff = cls._setting('SMS_RETRY_BACKOFF_SECONDS', 0.5)
+
+        pending = list(messages)
+        for attempt in range(max_attempts):
+            if attempt:
+                time.sleep(backoff * 2 ** (attempt - 1))
+            pending = gateway.send_batch(pending)
+            if not pending:
+                return []
+
+        logger.error('Dropping %d SMS after %d attempts', len(pending), max_attempts)
+        return pending
+
+    @classmethod
+    def flush(cls, timeout=5):
+        """Wait (up to ``timeout`` seconds) for queued messages to be sent"""
+        if cls._queue is None or cls._worker is None:
+            return
+        deadline = time.monotonic() + timeout
+        while cls._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+
+atexit.register(SMSDispatcher.flush)
@@ -0,0 +1,314 @@
+# Deterministic synthetic dataset generation for benchmarks and load tests
+
+import io
+import math
+import random
+from bisect import bisect
+from datetime import datetime, timedelta
+from itertools import accumulate
+from statistics import NormalDist
+from django.contrib.auth.hashers import UNUSABLE_PASSWORD_PREFIX
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from apps.authentication.models import User
+from apps.booking.models import Booking, BookingStatusHistory
+from apps.chat.models import ChatMessage, ChatRoom
+
+# Synthetic users get 10-digit numbers starting with 10: no real mobile number starts
+# with 1, and unlike a bare 1 the prefix leaves hand-made test accounts like 1111111111 alone
+MOBILE_PREFIX = '10'
+MOBILE_REGEX = r'^10[0-9]{8}$'
+
+USER_FIELDS = ['id', 'password', 'is_superuser', 'username', 'first_name', 'last_name', 'email', 'is_staff',
+               'is_active', 'date_joined', 'mobile_number', 'role', 'is_mobile_verified', 'created_at', 'updated_at']
+BOOKING_FIELDS = ['id', 'customer', 'delivery_partner', 'food_items', 'pickup_address', 'delivery_address',
+                  'pickup_latitude', 'pickup_longitude', 'delivery_latitude', 'delivery_longitude', 'phone_number',
+                  'total_amount', 'status', 'special_instructions', 'created_at', 'updated_at', 'cancelled_by',
+                  *Booking.STAGE_TIMESTAMPS.values(), *Booking.STAGE_DURATIONS]
+HISTORY_FIELDS = ['id', 'booking', 'status', 'updated_by', 'notes', 'created_at']
+CHAT_ROOM_FIELDS = ['id', 'booking', 'created_at', 'updated_at']
+CHAT_MESSAGE_FIELDS = ['id', 'chat_room', 'sender', 'message', 'created_at', 'is_read']
+
+CITIES = [
+    ('Bangalore', 12.9716, 77.5946, ['MG Road', 'Koramangala', 'Indiranagar', 'Whitefield', 'HSR Layout']),
+    ('Mumbai', 19.0760, 72.8777, ['Bandra', 'Andheri', 'Powai', 'Colaba', 'Lower Parel']),
+    ('New Delhi', 28.6139, 77.2090, ['Connaught Place', 'Saket', 'Dwarka', 'Karol Bagh', 'Vasant Kunj']),
+    ('Hyderabad', 17.3850, 78.4867, ['Banjara Hills', 'Gachibowli', 'Madhapur', 'Kondapur', 'Begumpet']),
+]
+STREETS = ['Main Road', 'Cross Street', 'Park Avenue', 'Lake View Road', 'Temple Street', 'Station Road']
+RESTAURANTS = ['Pizza Palace', 'Spice Garden', 'Dosa Corner', 'Burger Hub', 'Biryani House', 'Wok Express']
+DISHES = ['Pizza Margherita', 'Garlic Bread', 'Masala Dosa', 'Chicken Biryani', 'Paneer Tikka', 'Veg Burger',
+          'Hakka Noodles', 'Butter Naan', 'Dal Makhani', 'Cold Coffee', 'Gulab Jamun', 'Coke']
+INSTRUCTIONS = ['Please ring the doorbell twice', 'Leave at the gate', 'Call on arrival', 'Extra spicy please']
+CUSTOMER_LINES = ['Where are you now?', 'Please call when you reach', 'Gate 2 is open', 'How long will it take?',
+                  'Thanks!', 'I am coming down']
+PARTNER_LINES = ['Picked up your order', 'On the way', 'Reached your building', 'Stuck in traffic, 5 minutes',
+                 'Which floor?', 'Delivered, enjoy your meal']
+
+# Orders per hour of day: lunch and dinner peaks
+HOUR_WEIGHTS = [1, 1, 0, 0, 0, 0, 1, 2, 4, 4, 3, 5, 10, 12, 8, 4, 3, 4, 6, 10, 12, 10, 6, 3]
+# (status reached, median minutes since the previous stage)
+STAGES = [('assigned', 3), ('started', 4), ('reached', 10), ('collected', 5), ('delivered', 18)]
+CANCEL_RATE = 0.08
+# Booking.STAGE_TIMESTAMPS / STAGE_DURATIONS in terms of statuses ('created' for created_at)
+STAMPED_STATUSES = list(Booking.STAGE_TIMESTAMPS)
+DURATION_STATUSES = [(opened[:-len('_at')], closed[:-len('_at')])
+                     for opened, closed in Booking.STAGE_DURATIONS.values()]
+# Standard normal quantiles: table lookups are far cheaper than random.gauss per row
+QUANTILE_COUNT = 1024
+NORMAL_QUANTILES = [NormalDist().inv_cdf((i + 0.5) / QUANTILE_COUNT) for i in range(QUANTILE_COUNT)]
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def synthetic_mobile(user_id):
+    return f'{MOBILE_PREFIX}{user_id % 10 ** 8:08d}'
+
+
+def to_datetime(ts):
+    """Naive UTC datetime for an epoch timestamp, as Django stores datetimes under USE_TZ"""
+    return _EPOCH + timedelta(0, ts)
+
+
+class InsertWriter:
+    """Batched multi-row INSERTs through the Django connection; works on every backend"""
+
+    def __init__(self, model, fields):
+        self.model = model
+        self.fields = [model._meta.get_field(name) for name in fields]
+        quote = connection.ops.quote_name
+        columns = ', '.join(quote(f.column) for f in self.fields)
+        placeholders = ', '.join(['%s'] * len(self.fields))
+        self.sql = f'INSERT INTO {quote(model._meta.db_table)} ({columns}) VALUES ({placeholders})'
+
+    def write(self, rows):
+        with connection.cursor() as cursor:
+            cursor.executemany(self.sql, rows)
+
+
+class CopyWriter(InsertWriter):
+    """PostgreSQL COPY FROM STDIN in text format, several times faster than INSERT"""
+
+    def __init__(self, model, fields):
+        super().__init__(model, fields)
+        quote = connection.ops.quote_name
+        columns = ', '.join(quote(f.column) for f in self.fields)
+        self.sql = f'COPY {quote(model._meta.db_table)} ({columns}) FROM STDIN'
+
+    @staticmethod
+    def encode(value):
+        if value is None:
+            return '\\N'
+        if value is True or value is False:
+            return 't' if value else 'f'
+        if isinstance(value, str):
+            return value.replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+        if isinstance(value, datetime):
+            return f'{value}+00'
+        return str(value)
+
+    def write(self, rows):
+        encode = self.encode
+        buffer = io.StringIO()
+        for row in rows:
+            buffer.write('\t'.join(map(encode, row)))
+            buffer.write('\n')
+        buffer.seek(0)
+        with connection.cursor() as cursor:
+            cursor.copy_expert(self.sql, buffer)
+
+
+def get_writer(model, fields, use_copy=None):
+    if use_copy is None:
+        use_copy = connection.vendor == 'postgresql'
+    return (CopyWriter if use_copy else InsertWriter)(model, fields)
+
+
+class SyntheticDataGenerator:
+    """
+    Seeded generator of users, bookings with their status history, chat rooms
+    and messages.
+
+    Rows are produced as plain tuples with explicit primary keys allocated
+    above the current maximum, so bookings and messages can reference users
+    and rooms without reading them back and nothing is held in memory beyond
+    one batch per table. The same seed, counts and ``until`` on the same
+    starting ids give an identical dataset.
+    """
+
+    def __init__(self, seed=42, until=None, days=90, batch_size=10000, use_copy=None):
+        self.rng = random.Random(seed)
+        until = until or datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+        self.until = (until - _EPOCH).total_seconds()
+        self.start = self.until - days * 86400
+        self.batch_size = batch_size
+        self.use_copy = use_copy
+        self.counts = {}
+
+    def next_ids(self):
+        return {model: (model.objects.aggregate(m=Max('pk'))['m'] or 0) + 1
+                for model in (User, Booking, BookingStatusHistory, ChatRoom, ChatMessage)}
+
+    def generate(self, customers, partners, admins, bookings, messages_per_room, progress=None):
+        """Insert everything in one transaction; returns row counts per model"""
+        with transaction.atomic():
+            if connection.vendor == 'sqlite':
+                # A 256 MB page cache keeps index pages in memory for the length of the load
+                with connection.cursor() as cursor:
+                    cursor.execute('PRAGMA cache_size = -262144')
+            ids = self.next_ids()
+            self.writers = {
+                User: get_writer(User, USER_FIELDS, self.use_copy),
+                Booking: get_writer(Booking, BOOKING_FIELDS, self.use_copy),
+                BookingStatusHistory: get_writer(BookingStatusHistory, HISTORY_FIELDS, self.use_copy),
+                ChatRoom: get_writer(ChatRoom, CHAT_ROOM_FIELDS, self.use_copy),
+                ChatMessage: get_writer(ChatMessage, CHAT_MESSAGE_FIELDS, self.use_copy),
+            }
+            self.buffers = {model: [] for model in self.writers}
+            self.counts = {model: 0 for model in self.writers}
+            self.progress = progress
+
+            first_user = ids[User]
+            self.customer_ids = (first_user, customers)
+            self.partner_ids = (first_user + customers, partners)
+            self.add_users(first_user, customers, partners, admins)
+            self.add_bookings(ids[Booking], ids[BookingStatusHistory], ids[ChatRoom], ids[ChatMessage], bookings,
+                              messages_per_room)
+            self.flush_all()
+
+            with connection.cursor() as cursor:
+                for sql in connection.ops.sequence_reset_sql(no_style(), list(self.writers)):
+                    cursor.execute(sql)
+        return self.counts
+
+    def full(self):
+        return any(len(rows) >= self.batch_size for rows in self.buffers.values())
+
+    def flush(self, model):
+        rows = self.buffers[model]
+        if rows:
+            self.writers[model].write(rows)
+            self.counts[model] += len(rows)
+            rows.clear()
+            if self.progress:
+                self.progress(model, self.counts[model])
+
+    def flush_all(self):
+        # Parents are written first so foreign keys always point at existing rows
+        for model in self.writers:
+            self.flush(model)
+
+    def add_users(self, first_id, customers, partners, admins):
+        random = self.rng.random
+        rows = self.buffers[User]
+        password = UNUSABLE_PASSWORD_PREFIX
+        signup_span = self.until - self.start
+        user_id = first_id
+        for role, count in (('customer', customers), ('delivery_partner', partners), ('admin', admins)):
+            is_staff = role == 'admin'
+            for _ in range(count):
+                mobile = synthetic_mobile(user_id)
+                # Signed up some time before the booking window so every booking follows its customer
+                joined = to_datetime(self.start - signup_span * random())
+                rows.append((user_id, password, False, mobile, '', '', '', is_staff, True, joined,
+                             mobile, role, True, joined, joined))
+                user_id += 1
+                if len(rows) >= self.batch_size:
+                    self.flush(User)
+
+    def add_bookings(self, booking_id, history_id, room_id, message_id, count, messages_per_room):
+        rng = self.rng
+        random, exp = rng.random, math.exp
+        bookings, rooms = self.buffers[Booking], self.buffers[ChatRoom]
+        history = self.buffers[BookingStatusHistory]
+        first_customer, customers = self.customer_ids
+        first_partner, partners = self.partner_ids
+        days = int((self.until - self.start) // 86400)
+        hour_weights = list(accumulate(HOUR_WEIGHTS))
+        total_weight = hour_weights[-1]
+
+        def pick(options):
+            return options[int(random() * len(options))]
+
+        def normal():
+            return NORMAL_QUANTILES[int(random() * QUANTILE_COUNT)]
+
+        def place(name, lat, lng, areas):
+            return (f'{int(random() * 999) + 1} {pick(STREETS)}, {pick(areas)}, {name}',
+                    round(lat + 0.05 * normal(), 6), round(lng + 0.05 * normal(), 6))
+
+        for _ in range(count):
+            # Heavy-tailed: a small share of customers places most orders
+            customer = first_customer + int(customers * random() ** 2)
+            # Order volume grows over the window and peaks at lunch and dinner
+            day = int(days * math.sqrt(random()))
+            hour = bisect(hour_weights, random() * total_weight)
+            created = self.start + day * 86400 + (hour + random()) * 3600
+
+            name, lat, lng, areas = pick(CITIES)
+            pickup, pickup_lat, pickup_lng = place(name, lat, lng, areas)
+            delivery, delivery_lat, delivery_lng = place(name, lat, lng, areas)
+            pickup = f'{pick(RESTAURANTS)}, {pickup}'
+            items = ', '.join(f'{int(random() * 3) + 1}x {pick(DISHES)}' for _ in range(int(random() * 4) + 1))
+            amount = f'{exp(5.85 + 0.5 * normal()):.2f}'
+            instructions = pick(INSTRUCTIONS) if random() < 0.2 else None
+
+            # Walk the delivery stages with log-normal durations until one lies in the future
+            status, updated = 'pending', created
+            partner = cancelled_by = None
+            entered = {'created': created}
+            history.append((history_id, booking_id, 'pending', customer, '', to_datetime(created)))
+            history_id += 1
+            cancel_before = int(random() * 2) if random() < CANCEL_RATE else None
+            for stage, (stage_status, minutes) in enumerate(STAGES):
+                at = updated + 60 * minutes * exp(0.5 * normal())
+                if at > self.until:
+                    break
+                if cancel_before == stage:
+                    stage_status, cancelled_by = 'cancelled', customer
+                elif stage_status == 'assigned':
+                    if not partners:
+                        break
+                    partner = first_partner + int(partners * random())
+                entered[stage_status] = at
+                by = None if stage_status == 'assigned' else (cancelled_by or partner)
+                history.append((history_id, booking_id, stage_status, by, '', to_datetime(at)))
+                history_id += 1
+                status, updated = stage_status, at
+                if cancelled_by:
+                    break
+
+            updated_at = to_datetime(updated)
+            stamps = [to_datetime(entered[name]) if name in entered else None for name in STAMPED_STATUSES]
+            durations = [int(entered[closed] - entered[opened]) if opened in entered and closed in entered else None
+                         for opened, closed in DURATION_STATUSES]
+            bookings.append((booking_id, customer, partner, items, pickup, delivery, pickup_lat, pickup_lng,
+                             delivery_lat, delivery_lng, synthetic_mobile(customer), amount,
+                             status, instructions, to_datetime(created), updated_at, cancelled_by,
+                             *stamps, *durations))
+
+            if partner is not None:
+                rooms.append((room_id, booking_id, stamps[0], updated_at))
+                message_id = self.add_messages(message_id, room_id, customer, partner, entered['assigned'], updated,
+                                               status, messages_per_room)
+                room_id += 1
+            booking_id += 1
+            if self.full():
+                self.flush_all()
+
+    def add_messages(self, message_id, room_id, customer, partner, opened, closed, status, mean):
+        random = self.rng.random
+        rows = self.buffers[ChatMessage]
+        count = int(self.rng.expovariate(1 / mean)) if mean else 0
+        active = status not in ('delivered', 'cancelled')
+        span = max(closed - opened, 1)
+        for at in sorted(opened + span * random() for _ in range(count)):
+            if random() < 0.5:
+                sender, line = partner, PARTNER_LINES[int(random() * len(PARTNER_LINES))]
+            else:
+                sender, line = customer, CUSTOMER_LINES[int(random() * len(CUSTOMER_LINES))]
+            # Messages still in flight on active bookings are unread
+            rows.append((message_id, room_id, sender, line, to_datetime(at), not active or at < closed - 120))
+            message_id += 1
+        return message_id
@@ -0,0 +1,9 @@
+# Celery tasks; only the worker imports this module (see food_delivery/celery.py)
+
+from celery import shared_task
+from .rollups import BookingRollups
+
+
+@shared_task(ignore_result=True)
+def refresh_booking_rollups():
+    BookingRollups.refresh()
@@ -0,0 +1,98 @@
+# Template warm-up and memoized rendering of pure inclusion-tag fragments
+
+import logging
+import time
+from functools import lru_cache, wraps
+from pathlib import Path
+from django.conf import settings
+from django.template import TemplateDoesNotExist, TemplateSyntaxError, engines
+from django.template.backends.django import DjangoTemplates
+from django.template.loader import render_to_string
+
+logger = logging.getLogger(__name__)
+
+_fragment_renderers = []
+_template_version = None
+
+
+def cached_fragment(template_name, maxsize=64):
+    """
+    Render ``template_name`` once per distinct argument tuple.
+
+    For tags whose output depends only on a few hashable arguments, such as
+    ``status_badge(status)``: the decorated function returns the template
+    context and the rendered HTML is memoized. Stack under
+    ``@register.simple_tag``.
+    """
+    def decorator(func):
+        @lru_cache(maxsize=maxsize)
+        def render(*args):
+            return render_to_string(template_name, func(*args))
+
+        _fragment_renderers.append(render)
+
+        @wraps(func)
+        def tag(*args):
+            return render(*args)
+        return tag
+    return decorator
+
+
+def clear_fragment_caches():
+    for render in _fragment_renderers:
+        render.cache_clear()
+
+
+def template_changed(sender, file_path, **kwargs):
+    """autoreload file_changed receiver: re-render memoized fragments after a template edit"""
+    global _template_version
+    if Path(file_path).suffix == '.html':
+        clear_fragment_caches()
+        _template_version = None
+
+
+def _project_templates():
+    for backend in engines.all():
+        if not isinstance(backend, DjangoTemplates):
+            continue
+        # Project DIRS only; app templates (admin etc.) are rarely served by workers
+        for directory in backend.engine.dirs:
+            for path in sorted(Path(directory).rglob('*.html')):
+                yield backend, directory, path
+
+
+def template_version():
+    """
+    Identifies the markup being served, for mixing into ETags.
+
+    APP_SETTINGS['RELEASE_VERSION'] when set, otherwise the newest project
+    template's modification time (read once, and again after a template
+    edit under the autoreloader), so a deploy never answers 304 for a page
+    rendered by the old templates.
+    """
+    global _template_version
+    if _template_version is None:
+        release = settings.APP_SETTINGS.get('RELEASE_VERSION')
+        if not release:
+            release = str(max((path.stat().st_mtime_ns for _, _, path in _project_templates()), default=0))
+        _template_version = release
+    return _template_version
+
+
+def warm_template_cache():
+    """Compile every project template into the cached loader (APP_SETTINGS['TEMPLATE_WARMUP'])"""
+    if not settings.APP_SETTINGS.get('TEMPLATE_WARMUP', False):
+        return 0
+
+    started = time.perf_counter()
+    count = 0
+    for backend, directory, path in _project_templates():
+        name = path.relative_to(directory).as_posix()
+        try:
+            backend.get_template(name)
+            count += 1
+        except (TemplateDoesNotExist, TemplateSyntaxError) as e:
+            logger.warning('Template warm-up skipped %s: %s', name, e)
+
+    logger.info('Warmed %d templates in %.1f ms', count, (time.perf_counter() - started) * 1000)
+    return count
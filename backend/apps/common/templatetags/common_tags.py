@@ -2,6 +2,7 @@
 
 from django import template
 from django.utils import timezone
+from apps.common.template_cache import cached_fragment
 from apps.common.utils import DateTimeUtils
 
 register = template.Library()
@@ -22,11 +23,13 @@ def time_since(value):
 def status_badge_class(status):
     """Get Bootstrap class for status badge"""
     status_classes = {
-        'start': 'bg-secondary',
+        'pending': 'bg-secondary',
+        'assigned': 'bg-primary',
+        'started': 'bg-secondary',
         'reached': 'bg-warning',
-        'collected': 'bg-info', 
+        'collected': 'bg-info',
         'delivered': 'bg-success',
-        'assigned': 'bg-primary'
+        'cancelled': 'bg-danger',
     }
     return status_classes.get(status, 'bg-secondary')
 
@@ -70,7 +73,19 @@ def booking_progress_percentage(booking):
     }
     return status_progress.get(booking.status, 0)
 
-@register.inclusion_tag('components/status_badge.html')
+@register.simple_tag
+def booking_eta_minutes(booking):
+    """Minutes until delivery from the memoized ETA, or None if unknown"""
+    from apps.common.services import ETAService
+
+    seconds = ETAService.remaining_seconds(booking)
+    if seconds is None:
+        return None
+    return max(1, round(seconds / 60))
+
+# Badges and avatars depend only on a status or role, so each variant is rendered once per worker
+@register.simple_tag
+@cached_fragment('components/status_badge.html')
 def status_badge(status):
     """Render status badge component"""
     return {
@@ -79,13 +94,16 @@ def status_badge(status):
         'status_display': status.replace('_', ' ').title()
     }
 
-@register.inclusion_tag('components/user_avatar.html')
+@register.simple_tag
 def user_avatar(user, size='sm'):
     """Render user avatar component"""
+    return _role_avatar(getattr(user, 'role', 'customer'), size)
+
+@cached_fragment('components/user_avatar.html')
+def _role_avatar(role, size):
     return {
-        'user': user,
         'size': size,
-        'icon': user_role_icon(user.role if hasattr(user, 'role') else 'customer')
+        'icon': user_role_icon(role)
     }
 
 @register.inclusion_tag('components/booking_card.html')
@@ -0,0 +1,167 @@
+# Cached "does this mobile number have an account" lookups
+
+import hashlib
+import logging
+import math
+import threading
+import time
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings using double hashing"""
+
+    def __init__(self, capacity, error_rate=0.01):
+        capacity = max(capacity, 1)
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, value):
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hash_count))
+
+    def add(self, value):
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, value):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+
+class UserLookup:
+    """
+    Answers "which user (if any) owns this mobile number" for the login screen.
+
+    Lookups go cache -> Bloom filter -> database. The cache holds positive and
+    negative results; the per-process Bloom filter of every known mobile number
+    answers most misses without touching the database. Filters are only ever
+    built in a background thread, one worker at a time; until a worker has a
+    current filter its misses go to the database. Signups write a
+    positive cache entry that outlives the filter's rebuild interval, so other
+    workers see the new account before their filter is rebuilt.
+    """
+
+    MISSING = 'missing'
+    GENERATION_KEY = 'user_lookup:generation'
+    REBUILD_LOCK_KEY = 'user_lookup:rebuild_lock'
+
+    _lock = threading.Lock()
+    _bloom = None
+    _built_at = 0
+    _generation = None
+    _rebuilding = False
+
+    @staticmethod
+    def _key(mobile_number):
+        return f'user_lookup:{mobile_number}'
+
+    @staticmethod
+    def _setting(name, default):
+        return settings.APP_SETTINGS.get(name, default)
+
+    @classmethod
+    def build_filter(cls, generation=None):
+        """Load every mobile number into a fresh Bloom filter"""
+        from apps.authentication.models import User
+
+        capacity = int(User.objects.count() * 1.5) + 10000
+        bloom = BloomFilter(capacity, cls._setting('USER_BLOOM_ERROR_RATE', 0.01))
+        for mobile_number in User.objects.values_list('mobile_number', flat=True).iterator(chunk_size=10000):
+            bloom.add(mobile_number)
+
+        with cls._lock:
+            cls._bloom = bloom
+            cls._built_at = time.monotonic()
+            cls._generation = generation
+        return bloom
+
+    @classmethod
+    def _get_filter(cls, generation=None):
+        """Return a usable filter or None, refreshing it in the background"""
+        interval = cls._setting('USER_BLOOM_REBUILD_SECONDS', 3600)
+        age = time.monotonic() - cls._built_at
+        # A filter older than the signup cache entries could hide new users, and
+        # a bulk import announces a new generation; neither may answer misses
+        usable = cls._bloom is not None and generation == cls._generation and age <= interval * 2
+        if not usable or age > interval:
+            cls._start_rebuild(generation)
+        return cls._bloom if usable else None
+
+    @classmethod
+    def _start_rebuild(cls, generation):
+        """Rebuild in a background thread unless this worker or another one already is"""
+        with cls._lock:
+            if cls._rebuilding:
+                return
+            # One worker at a time scans the users table; the rest keep using
+            # the database until they win the lock on a later miss
+            if not cache.add(cls.REBUILD_LOCK_KEY, 1, timeout=cls._setting('USER_BLOOM_REBUILD_LOCK_SECONDS', 300)):
+                return
+            cls._rebuilding = True
+        threading.Thread(target=cls._rebuild_in_background, args=(generation,), daemon=True).start()
+
+    @classmethod
+    def _rebuild_in_background(cls, generation):
+        from django.db import connection
+
+        try:
+            cls.build_filter(generation)
+        except Exception:
+            logger.exception('Rebuilding the user Bloom filter failed')
+        finally:
+            cls._rebuilding = False
+            cache.delete(cls.REBUILD_LOCK_KEY)
+            connection.close()
+
+    @classmethod
+    def get(cls, mobile_number):
+        """Return {'id', 'role'} for the owner of mobile_number, or None"""
+        key = cls._key(mobile_number)
+        values = cache.get_many([key, cls.GENERATION_KEY])
+        cached = values.get(key)
+        if cached == cls.MISSING:
+            return None
+        if cached is not None:
+            return cached
+
+        bloom = cls._get_filter(values.get(cls.GENERATION_KEY))
+        if bloom is not None and mobile_number not in bloom:
+            return None
+
+        from apps.authentication.models import User
+        user = User.objects.filter(mobile_number=mobile_number).values('id', 'role').first()
+        if user is None:
+            cache.set(cls._key(mobile_number), cls.MISSING, timeout=cls._setting('USER_LOOKUP_NEGATIVE_TTL', 60))
+        else:
+            cache.set(cls._key(mobile_number), user, timeout=cls._setting('USER_LOOKUP_TTL', 300))
+        return user
+
+    @classmethod
+    def user_saved(cls, user):
+        """Record a signup or change in this worker's filter and for every other worker via the cache"""
+        with cls._lock:
+            if cls._bloom is not None:
+                cls._bloom.add(user.mobile_number)
+
+        timeout = cls._setting('USER_BLOOM_REBUILD_SECONDS', 3600) * 2
+        cache.set(cls._key(user.mobile_number), {'id': user.id, 'role': user.role}, timeout=timeout)
+
+    @classmethod
+    def user_deleted(cls, user):
+        cache.set(cls._key(user.mobile_number), cls.MISSING, timeout=cls._setting('USER_LOOKUP_NEGATIVE_TTL', 60))
+
+    @classmethod
+    def bulk_changed(cls, mobile_numbers):
+        """Forget cached results for numbers written without signals (bulk imports)"""
+        cache.delete_many([cls._key(mobile_number) for mobile_number in mobile_numbers])
+
+    @classmethod
+    def invalidate_filters(cls):
+        """Make every worker rebuild its Bloom filter on its next miss"""
+        cache.set(cls.GENERATION_KEY, time.time(), timeout=None)
@@ -1,13 +1,15 @@
 # Common utility functions for the Food Delivery App
 
+import logging
 import random
 import string
 from datetime import datetime, timedelta
+from django.conf import settings
 from django.utils import timezone
-from django.http import JsonResponse
 from django.core.exceptions import ValidationError
 from django.contrib.auth import get_user_model
 import json
+from .encoders import FastJsonResponse
 
 User = get_user_model()
 
@@ -20,11 +22,11 @@ class ResponseHandler:
         response = {
             'status': 'success',
             'message': message,
-            'timestamp': timezone.now().isoformat()
+            'timestamp': timezone.now()
         }
         if data:
             response['data'] = data
-        return JsonResponse(response, status=status)
+        return FastJsonResponse(response, status=status)
 
     @staticmethod
     def error(message="Error occurred", errors=None, status=400):
@@ -32,11 +34,11 @@ class ResponseHandler:
         response = {
             'status': 'error',
             'message': message,
-            'timestamp': timezone.now().isoformat()
+            'timestamp': timezone.now()
         }
         if errors:
             response['errors'] = errors
-        return JsonResponse(response, status=status)
+        return FastJsonResponse(response, status=status)
 
     @staticmethod
     def validation_error(errors, status=400):
@@ -66,9 +68,9 @@ class OTPHandler:
 
     @staticmethod
     def send_otp_sms(mobile_number, otp_code):
-        """Send OTP via SMS (mock implementation)"""
-        # In production, integrate with SMS service like Twilio, AWS SNS, etc.
-        print(f"SMS: Your OTP is {otp_code}. Valid for 10 minutes.")
+        """Queue the OTP SMS; delivery happens on the SMS dispatcher thread"""
+        from .sms import SMSDispatcher
+        SMSDispatcher.send(mobile_number, f"Your OTP is {otp_code}. Valid for 10 minutes.")
         return True
 
 class ValidationUtils:
@@ -182,19 +184,48 @@ def parse_json_safely(request):
         raise ValidationError("Invalid JSON format")
 
 def get_client_ip(request):
-    """Get client IP address from request"""
+    """
+    Get client IP address from request.
+
+    X-Forwarded-For is client-controlled except for the entries our own
+    proxies appended, so with APP_SETTINGS['TRUSTED_PROXY_COUNT'] = N the
+    address is the N-th entry from the right; with 0 it is REMOTE_ADDR.
+    """
+    proxies = settings.APP_SETTINGS.get('TRUSTED_PROXY_COUNT', 0)
     x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-    if x_forwarded_for:
-        ip = x_forwarded_for.split(',')[0]
-    else:
-        ip = request.META.get('REMOTE_ADDR')
-    return ip
-
-def log_user_activity(user, action, details=None):
-    """Log user activity (can be extended with proper logging)"""
-    log_message = f"User {user.mobile_number} ({user.role}): {action}"
-    if details:
-        log_message += f" - {details}"
-
-    print(f"[{timezone.now()}] {log_message}")
-    # In production, use proper logging framework
+    if proxies and x_forwarded_for:
+        hops = [hop.strip() for hop in x_forwarded_for.split(',')]
+        if len(hops) >= proxies:
+            return hops[-proxies]
+    return request.META.get('REMOTE_ADDR')
+
+def log_user_activity(user, action, details=None, event=None):
+    """
+    Log a structured user activity event.
+
+    ``event`` names the kind of activity for sampling: rates come from
+    APP_SETTINGS['ACTIVITY_LOG_SAMPLE_RATES'] with ACTIVITY_LOG_SAMPLE_RATE
+    as the default. Records are formatted off the request thread by the
+    handler configured for the ``apps.activity`` logger.
+    """
+    from .activity import activity_logger
+
+    if not activity_logger.isEnabledFor(logging.INFO):
+        return
+
+    config = settings.APP_SETTINGS
+    rate = config.get('ACTIVITY_LOG_SAMPLE_RATES', {}).get(event, config.get('ACTIVITY_LOG_SAMPLE_RATE', 1.0))
+    if rate < 1 and random.random() >= rate:
+        return
+
+    # Build the record directly: Logger.info would also walk the stack to find the caller
+    record = activity_logger.makeRecord(activity_logger.name, logging.INFO, '', 0, action, None, None, extra={
+        'activity': {
+            'event': event,
+            'user': user.mobile_number,
+            'role': user.role,
+            'action': action,
+            'details': details,
+        }
+    })
+    activity_logger.handle(record)
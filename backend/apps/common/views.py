@@ -0,0 +1,17 @@
+import hmac
+from django.conf import settings
+from django.http import HttpResponse
+from .metrics import MetricsRegistry
+from .utils import PermissionUtils, ResponseHandler
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint for admins or a bearer METRICS_TOKEN"""
+    token = settings.APP_SETTINGS.get('METRICS_TOKEN')
+    authorization = request.META.get('HTTP_AUTHORIZATION', '')
+    token_ok = bool(token) and hmac.compare_digest(authorization, f'Bearer {token}')
+
+    if not token_ok and not PermissionUtils.check_user_role(request.user, ['admin']):
+        return ResponseHandler.error("Insufficient permissions", status=403)
+
+    return HttpResponse(MetricsRegistry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -1,20 +1,22 @@
 import os
-import django
 from django.core.asgi import get_asgi_application
-from channels.routing import ProtocolTypeRouter, URLRouter
-from channels.auth import AuthMiddlewareStack
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'food_delivery.settings.base')
 
-# Initialize Django
-django.setup()
+# Sets up Django; routing and consumers import models, so they come after
+django_asgi_app = get_asgi_application()
+
+from channels.routing import ProtocolTypeRouter, URLRouter
+from channels.auth import AuthMiddlewareStack
+from apps.booking.routing import websocket_urlpatterns as booking_websocket_urlpatterns
+from apps.chat.routing import websocket_urlpatterns as chat_websocket_urlpatterns
+from apps.common.template_cache import warm_template_cache
 
-# Import after Django setup
-from apps.chat.routing import websocket_urlpatterns
+warm_template_cache()
 
 application = ProtocolTypeRouter({
-    "http": get_asgi_application(),
+    "http": django_asgi_app,
     "websocket": AuthMiddlewareStack(
-        URLRouter(websocket_urlpatterns)
+        URLRouter(booking_websocket_urlpatterns + chat_websocket_urlpatterns)
     ),
 })
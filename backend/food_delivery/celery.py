@@ -0,0 +1,13 @@
+# Celery application for the worker and beat:
+#   celery -A food_delivery worker
+#   celery -A food_delivery beat
+# Web processes never import this module, so celery stays out of their startup.
+
+import os
+from celery import Celery
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'food_delivery.settings.worker')
+
+app = Celery('food_delivery')
+app.config_from_object('django.conf:settings', namespace='CELERY')
+app.autodiscover_tasks()
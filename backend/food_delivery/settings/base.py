@@ -1,6 +1,7 @@
 # Improved settings with reusable configurations
 
 import os
+import sys
 from pathlib import Path
 import environ
 
@@ -17,6 +18,7 @@ if READ_DOT_ENV_FILE:
 # Security settings
 SECRET_KEY = env('SECRET_KEY', default='django-insecure-change-in-production')
 DEBUG = env.bool('DEBUG', default=True)
+TESTING = sys.argv[1:2] == ['test']
 ALLOWED_HOSTS = env.list('ALLOWED_HOSTS', default=['*'])
 
 # Application definition
@@ -29,8 +31,10 @@ DJANGO_APPS = [
     'django.contrib.staticfiles',
 ]
 
+# rest_framework is used only for serializers, which don't need the app installed;
+# as an installed app its template tag library pulls DRF's heavy optional
+# imports into the first template render of every worker
 THIRD_PARTY_APPS = [
-    'rest_framework',
     'corsheaders',
     'channels',
 ]
@@ -46,9 +50,12 @@ INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + LOCAL_APPS
 
 # Middleware configuration
 MIDDLEWARE = [
+    'apps.common.metrics.MetricsMiddleware',
+    'apps.common.queries.QueryInspectionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'apps.common.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -64,8 +71,15 @@ TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [BASE_DIR.parent / 'frontend' / 'templates'],
-        'APP_DIRS': True,
         'OPTIONS': {
+            # Cached in every environment, DEBUG included; runserver's autoreloader
+            # still resets it when a template file changes
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -106,6 +120,17 @@ CHANNEL_LAYERS = {
 # Custom user model
 AUTH_USER_MODEL = 'authentication.User'
 
+# Authentication backends: the cached backend resolves request users without a
+# DB query; ModelBackend stays listed so sessions created before it still load
+AUTHENTICATION_BACKENDS = [
+    'apps.authentication.backends.CachedModelBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+
+# Sessions are read from the cache and written through to the database; the
+# custom store defers the row insert on login to the end of the request
+SESSION_ENGINE = env('SESSION_ENGINE', default='apps.authentication.sessions')
+
 # Login URL configuration
 LOGIN_URL = '/auth/login/'
 LOGIN_REDIRECT_URL = '/auth/dashboard/'
@@ -146,21 +171,6 @@ MEDIA_ROOT = BASE_DIR / 'media'
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
-# REST Framework configuration
-REST_FRAMEWORK = {
-    'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.SessionAuthentication',
-    ],
-    'DEFAULT_PERMISSION_CLASSES': [
-        'rest_framework.permissions.IsAuthenticated',
-    ],
-    'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
-    ],
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
-    'PAGE_SIZE': 20,
-}
-
 # CORS configuration
 CORS_ALLOWED_ORIGINS = env.list('CORS_ALLOWED_ORIGINS', default=['http://localhost:3000', 'http://127.0.0.1:8000'])
 CORS_ALLOW_ALL_ORIGINS = env.bool('CORS_ALLOW_ALL_ORIGINS', default=True)
@@ -189,6 +199,11 @@ LOGGING = {
             'filename': BASE_DIR / 'logs' / 'django.log',
             'formatter': 'verbose',
         },
+        'activity': {
+            # JSON lines written by a background listener thread
+            'class': 'apps.common.activity.AsyncActivityHandler',
+            'store': True,
+        },
     },
     'root': {
         'handlers': ['console'],
@@ -205,15 +220,110 @@ LOGGING = {
             'level': 'DEBUG' if DEBUG else 'INFO',
             'propagate': False,
         },
+        'apps.activity': {
+            'handlers': ['activity'],
+            'level': 'INFO',
+            'propagate': False,
+        },
     },
 }
 
 # Custom application settings
 APP_SETTINGS = {
+    # Reverse proxies in front of the app; their X-Forwarded-For entries are the only trusted ones
+    'TRUSTED_PROXY_COUNT': env.int('TRUSTED_PROXY_COUNT', default=0),
     'OTP_EXPIRY_MINUTES': env.int('OTP_EXPIRY_MINUTES', default=10),
+    'OTP_STATIC_CODE': env('OTP_STATIC_CODE', default='1234' if DEBUG else ''),
+    'OTP_STORE_BACKEND': env('OTP_STORE_BACKEND', default='apps.common.otp.CacheOTPStore'),
+    'OTP_AUDIT_TO_DB': env.bool('OTP_AUDIT_TO_DB', default=False),
+    'OTP_AUDIT_BATCH_SIZE': env.int('OTP_AUDIT_BATCH_SIZE', default=100),
+    'OTP_AUDIT_FLUSH_SECONDS': env.int('OTP_AUDIT_FLUSH_SECONDS', default=10),
+    # 'auto' uses orjson when installed; 'stdlib' forces the json module
+    'JSON_ENCODER': env('JSON_ENCODER', default='auto'),
+    # Bearer token for Prometheus scrapes of /metrics (admins can always view it)
+    'METRICS_TOKEN': env('METRICS_TOKEN', default=''),
+    # Query budgets / N+1 detection: 'raise' (tests), 'log' (staging) or 'off'
+    'QUERY_INSPECTION': env('QUERY_INSPECTION', default='raise' if TESTING else 'off'),
+    'QUERY_REPEAT_THRESHOLD': env.int('QUERY_REPEAT_THRESHOLD', default=5),
+    'COMPRESSION_MIN_BYTES': env.int('COMPRESSION_MIN_BYTES', default=1024),
+    'BROTLI_QUALITY': env.int('BROTLI_QUALITY', default=5),
+    'STREAMING_CHUNK_SIZE': env.int('STREAMING_CHUNK_SIZE', default=500),
+    # Compile all project templates when a worker starts instead of on first use
+    'TEMPLATE_WARMUP': env.bool('TEMPLATE_WARMUP', default=False),
+    # Mixed into page ETags; defaults to the newest template's modification time
+    'RELEASE_VERSION': env('RELEASE_VERSION', default=''),
+    # Seconds per-user page-chrome counts (unread messages, pending assignments) are cached
+    'APP_CONTEXT_CACHE_TTL': env.int('APP_CONTEXT_CACHE_TTL', default=15),
+    # Daily booking rollups: beat interval, and how far each run re-reads behind its
+    # watermark to catch bookings committed late with an older updated_at
+    'ROLLUP_INTERVAL_SECONDS': env.int('ROLLUP_INTERVAL_SECONDS', default=300),
+    'ROLLUP_WATERMARK_OVERLAP_SECONDS': env.int('ROLLUP_WATERMARK_OVERLAP_SECONDS', default=300),
+    'ACTIVITY_LOG_SAMPLE_RATE': env.float('ACTIVITY_LOG_SAMPLE_RATE', default=1.0),
+    # Per-event overrides, e.g. ACTIVITY_LOG_SAMPLE_RATES=api_call=0.1,chat_message=0.5
+    'ACTIVITY_LOG_SAMPLE_RATES': env.dict('ACTIVITY_LOG_SAMPLE_RATES', cast={'value': float}, default={}),
+    'ACTIVITY_STORE_DIR': env('ACTIVITY_STORE_DIR', default=str(BASE_DIR / 'logs' / 'activity')),
+    'ACTIVITY_SEGMENT_MAX_EVENTS': env.int('ACTIVITY_SEGMENT_MAX_EVENTS', default=5000),
+    'ACTIVITY_SEGMENT_MAX_SECONDS': env.int('ACTIVITY_SEGMENT_MAX_SECONDS', default=300),
+    # Segments whose newest event is older than this are deleted (0 keeps them forever)
+    'ACTIVITY_RETENTION_DAYS': env.int('ACTIVITY_RETENTION_DAYS', default=90),
+    'ACTIVITY_PRUNE_INTERVAL_SECONDS': env.int('ACTIVITY_PRUNE_INTERVAL_SECONDS', default=3600),
+    'SMS_GATEWAY_BACKEND': env('SMS_GATEWAY_BACKEND', default='apps.common.sms.ConsoleSMSGateway'),
+    'SMS_GATEWAY_URL': env('SMS_GATEWAY_URL', default=''),
+    'SMS_GATEWAY_API_KEY': env('SMS_GATEWAY_API_KEY', default=''),
+    'SMS_GATEWAY_TIMEOUT_SECONDS': env.int('SMS_GATEWAY_TIMEOUT_SECONDS', default=10),
+    'SMS_ASYNC': env.bool('SMS_ASYNC', default=True),
+    'SMS_QUEUE_SIZE': env.int('SMS_QUEUE_SIZE', default=10000),
+    'SMS_ENQUEUE_TIMEOUT_SECONDS': env.float('SMS_ENQUEUE_TIMEOUT_SECONDS', default=0.5),
+    'SMS_BATCH_SIZE': env.int('SMS_BATCH_SIZE', default=50),
+    'SMS_BATCH_LINGER_SECONDS': env.float('SMS_BATCH_LINGER_SECONDS', default=0.05),
+    'SMS_MAX_ATTEMPTS': env.int('SMS_MAX_ATTEMPTS', default=3),
+    'SMS_RETRY_BACKOFF_SECONDS': env.float('SMS_RETRY_BACKOFF_SECONDS', default=0.5),
     'MAX_BOOKING_DISTANCE_KM': env.int('MAX_BOOKING_DISTANCE_KM', default=50),
     'DEFAULT_BOOKING_PRICE': env.float('DEFAULT_BOOKING_PRICE', default=50.00),
     'PAGINATION_SIZE': env.int('PAGINATION_SIZE', default=10),
+    'USER_LOOKUP_TTL': env.int('USER_LOOKUP_TTL', default=300),
+    'USER_LOOKUP_NEGATIVE_TTL': env.int('USER_LOOKUP_NEGATIVE_TTL', default=60),
+    'USER_BLOOM_REBUILD_SECONDS': env.int('USER_BLOOM_REBUILD_SECONDS', default=3600),
+    'USER_BLOOM_ERROR_RATE': env.float('USER_BLOOM_ERROR_RATE', default=0.01),
+    'USER_BLOOM_REBUILD_LOCK_SECONDS': env.int('USER_BLOOM_REBUILD_LOCK_SECONDS', default=300),
+    'AUTH_USER_CACHE_TTL': env.int('AUTH_USER_CACHE_TTL', default=60),
+    # Fills booking coordinates the client did not send, in the background after commit.
+    # Off by default: NominatimGeocoder sends customer addresses to GEOCODER_URL
+    'GEOCODER_BACKEND': env('GEOCODER_BACKEND', default='apps.common.geocoding.NullGeocoder'),
+    'GEOCODER_URL': env('GEOCODER_URL', default='https://nominatim.openstreetmap.org/search'),
+    'GEOCODER_USER_AGENT': env('GEOCODER_USER_AGENT', default='food-delivery-lite'),
+    'GEOCODER_TIMEOUT_SECONDS': env.float('GEOCODER_TIMEOUT_SECONDS', default=3),
+    'GEOCODER_CACHE_TTL': env.int('GEOCODER_CACHE_TTL', default=86400),
+    'GEOCODER_MIN_INTERVAL_SECONDS': env.float('GEOCODER_MIN_INTERVAL_SECONDS', default=1),
+    'GEOCODER_QUEUE_SIZE': env.int('GEOCODER_QUEUE_SIZE', default=1000),
+    'PRESENCE_TTL_SECONDS': env.int('PRESENCE_TTL_SECONDS', default=30),
+    'LOCATION_BUFFER_SIZE': env.int('LOCATION_BUFFER_SIZE', default=20),
+    'LOCATION_PERSIST_INTERVAL_SECONDS': env.int('LOCATION_PERSIST_INTERVAL_SECONDS', default=30),
+    'LOCATION_PERSIST_DISTANCE_M': env.int('LOCATION_PERSIST_DISTANCE_M', default=50),
+    'LOCATION_FLUSH_BATCH_SIZE': env.int('LOCATION_FLUSH_BATCH_SIZE', default=500),
+    'LOCATION_FLUSH_INTERVAL_SECONDS': env.int('LOCATION_FLUSH_INTERVAL_SECONDS', default=5),
+    'LOCATION_LATEST_TTL_SECONDS': env.int('LOCATION_LATEST_TTL_SECONDS', default=300),
+    'ETA_AVERAGE_SPEED_KMPH': env.float('ETA_AVERAGE_SPEED_KMPH', default=20.0),
+    'ETA_ROAD_FACTOR': env.float('ETA_ROAD_FACTOR', default=1.3),
+    'ETA_PICKUP_HANDLING_SECONDS': env.int('ETA_PICKUP_HANDLING_SECONDS', default=300),
+    'ETA_RECOMPUTE_DISTANCE_M': env.int('ETA_RECOMPUTE_DISTANCE_M', default=100),
+    'ETA_CACHE_TTL_SECONDS': env.int('ETA_CACHE_TTL_SECONDS', default=3600),
+}
+
+# Rate limits per view (see apps.common.decorators.rate_limit)
+RATE_LIMITS = {
+    'check_user': [
+        {'scope': 'ip', 'max_requests': env.int('RATE_LIMIT_CHECK_USER_IP', default=30), 'window': 60},
+        {'scope': 'mobile', 'max_requests': env.int('RATE_LIMIT_CHECK_USER_MOBILE', default=10), 'window': 60},
+    ],
+    'send_otp': [
+        {'scope': 'ip', 'max_requests': env.int('RATE_LIMIT_SEND_OTP_IP', default=20), 'window': 60},
+        {'scope': 'mobile', 'max_requests': env.int('RATE_LIMIT_SEND_OTP_MOBILE', default=3), 'window': 60},
+    ],
+    'verify_otp': [
+        {'scope': 'ip', 'max_requests': env.int('RATE_LIMIT_VERIFY_OTP_IP', default=30), 'window': 60},
+        {'scope': 'mobile', 'max_requests': env.int('RATE_LIMIT_VERIFY_OTP_MOBILE', default=5), 'window': 300},
+    ],
 }
 
 # Security settings for production
@@ -1,4 +1,7 @@
+from django.core.exceptions import ImproperlyConfigured
+
 from .base import *  # noqa: F403
+from .base import APP_SETTINGS
 from .base import DATABASES
 from .base import REDIS_URL
 from .base import env
@@ -12,6 +15,17 @@ DEBUG = env.bool('DJANGO_DEBUG', default=False)
 SECRET_KEY = env('DJANGO_SECRET_KEY', default='django-insecure-change-in-production')
 ALLOWED_HOSTS = env.list('DJANGO_ALLOWED_HOSTS', default=['*'])
 
+# Served behind one reverse proxy (nginx) that appends the client address
+APP_SETTINGS['TRUSTED_PROXY_COUNT'] = env.int('TRUSTED_PROXY_COUNT', default=1)
+
+# OTPs must really be sent; the console gateway is for development only
+APP_SETTINGS['SMS_GATEWAY_BACKEND'] = env('SMS_GATEWAY_BACKEND', default='apps.common.sms.HTTPSMSGateway')
+if APP_SETTINGS['SMS_GATEWAY_BACKEND'] == 'apps.common.sms.HTTPSMSGateway' and not APP_SETTINGS['SMS_GATEWAY_URL']:
+    raise ImproperlyConfigured('Set SMS_GATEWAY_URL, or SMS_GATEWAY_BACKEND to another real gateway')
+
+# Random OTPs unless a static code is explicitly configured
+APP_SETTINGS['OTP_STATIC_CODE'] = env('OTP_STATIC_CODE', default='')
+
 # DATABASES
 # ------------------------------------------------------------------------------
 # Connection pooling for production
@@ -54,6 +68,7 @@ MEDIA_ROOT = BASE_DIR / 'media'
 # ------------------------------------------------------------------------------
 import os
 LOG_DIR = env('LOG_DIR', default='/home/ubuntu/others/foodyLite/backend/logs')
+APP_SETTINGS['ACTIVITY_STORE_DIR'] = env('ACTIVITY_STORE_DIR', default=os.path.join(LOG_DIR, 'activity'))
 
 LOGGING = {
     'version': 1,
@@ -80,6 +95,14 @@ LOGGING = {
             'class': 'logging.StreamHandler',
             'formatter': 'simple',
         },
+        'activity': {
+            'class': 'apps.common.activity.AsyncActivityHandler',
+            'filename': os.path.join(LOG_DIR, 'activity.log'),
+            'maxBytes': 1024*1024*50,  # 50MB
+            'backupCount': 10,
+            'queue_size': 50000,
+            'store': True,
+        },
     },
     'root': {
         'handlers': ['file'],
@@ -96,6 +119,11 @@ LOGGING = {
             'level': 'INFO',
             'propagate': False,
         },
+        'apps.activity': {
+            'handlers': ['activity'],
+            'level': 'INFO',
+            'propagate': False,
+        },
     },
 }
 
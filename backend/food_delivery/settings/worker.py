@@ -0,0 +1,19 @@
+from .production import *  # noqa: F403
+from .production import APP_SETTINGS
+from .production import INSTALLED_APPS
+
+# Celery worker and beat only: django_celery_beat (and celery with it) adds
+# ~150 ms to process start, so web workers leave it out of INSTALLED_APPS.
+# Run its migrations with DJANGO_SETTINGS_MODULE=food_delivery.settings.worker.
+INSTALLED_APPS = INSTALLED_APPS + ['django_celery_beat']
+
+# Entries are synced into django_celery_beat's tables when beat starts
+CELERY_BEAT_SCHEDULER = 'django_celery_beat.schedulers:DatabaseScheduler'
+CELERY_BEAT_SCHEDULE = {
+    'refresh-booking-rollups': {
+        'task': 'apps.common.tasks.refresh_booking_rollups',
+        'schedule': APP_SETTINGS['ROLLUP_INTERVAL_SECONDS'],
+        # A skipped tick is harmless: the next run picks up from the watermark
+        'options': {'expire_seconds': APP_SETTINGS['ROLLUP_INTERVAL_SECONDS']},
+    },
+}
@@ -3,6 +3,7 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 from django.shortcuts import redirect
+from apps.common.views import metrics_view
 
 def home_redirect(request):
     if request.user.is_authenticated:
@@ -15,6 +16,7 @@ urlpatterns = [
     path('auth/', include('apps.authentication.urls')),
     path('booking/', include('apps.booking.urls')),
     path('chat/', include('apps.chat.urls')),
+    path('metrics', metrics_view, name='metrics'),
 ]
 
 if settings.DEBUG:
@@ -3,3 +3,7 @@ from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'food_delivery.settings.base')
 application = get_wsgi_application()
+
+from apps.common.template_cache import warm_template_cache
+
+warm_template_cache()
@@ -81,6 +81,22 @@ const AppUtils = {
         };
 
         return $.ajax($.extend(defaults, options));
+    },
+
+    // Keep delivery partners online in the presence registry
+    startPresenceHeartbeat: function(intervalMs = 10000) {
+        const scheme = window.location.protocol === 'https:' ? 'wss://' : 'ws://';
+        const socket = new WebSocket(scheme + window.location.host + '/ws/presence/');
+        let timer = null;
+
+        socket.onopen = function() {
+            timer = setInterval(() => socket.send(JSON.stringify({'type': 'heartbeat'})), intervalMs);
+        };
+
+        socket.onclose = function() {
+            clearInterval(timer);
+            setTimeout(() => AppUtils.startPresenceHeartbeat(intervalMs), intervalMs);
+        };
     }
 };
 
@@ -95,6 +111,10 @@ $(document).ready(function() {
     // Auto-hide alerts
     setTimeout(() => $('.alert').fadeOut('slow'), 5000);
 
+    if (document.body.dataset.userRole === 'delivery_partner') {
+        AppUtils.startPresenceHeartbeat();
+    }
+
     console.log('🍕 Food Delivery App initialized with reusable components!');
 });
 